@@ -0,0 +1,21 @@
+-- Slim rows for the history list: short previews instead of the full texts,
+-- and no justification. The full record is fetched when a card is opened.
+CREATE OR REPLACE VIEW public.beforest_transformation_previews AS
+SELECT
+    id,
+    created_at,
+    content_type,
+    target_audience,
+    LEFT(original_content, 200) AS original_preview,
+    LEFT(transformed_content, 200) AS transformed_preview,
+    original_length,
+    transformed_length,
+    length_change_percent,
+    processing_time_ms,
+    api_model_used,
+    user_email
+FROM public.beforest_transformations;
+
+-- Add comment to document the view
+COMMENT ON VIEW public.beforest_transformation_previews
+IS 'History list rows with 200-character previews; keyset pagination uses idx_beforest_transformations_created_at_id';
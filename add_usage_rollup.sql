@@ -0,0 +1,320 @@
+-- Daily usage rollup: one row per UTC day x content_type x target_audience,
+-- kept current by statement-level triggers on beforest_transformations, so
+-- get_beforest_usage_stats reads at most days_back x N rollup rows instead of
+-- scanning every transformation in the window.
+--
+-- Run once, after supabase_schema_fixed.sql. Existing rows are backfilled;
+-- inserts wait on a table lock until the script commits, so none are missed.
+
+BEGIN;
+
+LOCK TABLE public.beforest_transformations IN SHARE ROW EXCLUSIVE MODE;
+
+-- Lower bounds (ms) of the processing time buckets. Bucket 0 holds times
+-- below the first bound, bucket i times in [bounds[i], bounds[i + 1]).
+-- Changing the bounds requires rebuilding the rollup with the backfill below.
+CREATE OR REPLACE FUNCTION public.beforest_processing_time_bounds()
+RETURNS INTEGER[] AS $$
+    SELECT ARRAY[500, 1000, 2000, 5000, 10000, 20000, 30000, 60000];
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Rows per processing time bucket for a set of processing_time_ms values
+CREATE OR REPLACE FUNCTION public.beforest_processing_time_histogram(times INTEGER[])
+RETURNS BIGINT[] AS $$
+    SELECT ARRAY(
+        SELECT COUNT(t.ms) FILTER (WHERE width_bucket(t.ms, public.beforest_processing_time_bounds()) = b)
+        FROM generate_series(0, array_length(public.beforest_processing_time_bounds(), 1)) AS b
+        LEFT JOIN unnest(times) AS t(ms) ON TRUE
+        GROUP BY b
+        ORDER BY b
+    );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Element-wise a + sign * b
+CREATE OR REPLACE FUNCTION public.beforest_add_counts(a BIGINT[], b BIGINT[], sign INTEGER DEFAULT 1)
+RETURNS BIGINT[] AS $$
+    SELECT ARRAY(
+        SELECT COALESCE(x, 0) + sign * COALESCE(y, 0)
+        FROM unnest(a, b) WITH ORDINALITY AS t(x, y, n)
+        ORDER BY n
+    );
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE TABLE IF NOT EXISTS public.beforest_usage_daily (
+    day DATE NOT NULL,
+    content_type VARCHAR(100) NOT NULL,
+    target_audience VARCHAR(100) NOT NULL,
+    transformation_count BIGINT NOT NULL DEFAULT 0,
+    original_length_sum BIGINT NOT NULL DEFAULT 0,
+    transformed_length_sum BIGINT NOT NULL DEFAULT 0,
+    length_change_percent_sum NUMERIC NOT NULL DEFAULT 0,
+    -- Rows with a processing time, and the sum of those times
+    processing_time_count BIGINT NOT NULL DEFAULT 0,
+    processing_time_ms_sum BIGINT NOT NULL DEFAULT 0,
+    processing_time_buckets BIGINT[] NOT NULL,
+    PRIMARY KEY (day, content_type, target_audience)
+);
+
+-- Distinct sessions cannot be summed across days, so each day keeps a
+-- HyperLogLog sketch: 1024 one-byte registers, about 3% standard error.
+-- Sketches merge by taking the per-register maximum.
+CREATE TABLE IF NOT EXISTS public.beforest_usage_daily_sessions (
+    day DATE PRIMARY KEY,
+    registers BYTEA NOT NULL DEFAULT decode(repeat('00', 1024), 'hex')
+);
+
+-- Register index and rank for a session id: the low 10 bits of a 64-bit hash
+-- pick the register, and the rank is 1 + the leading zeros of the other 54
+CREATE OR REPLACE FUNCTION public.beforest_session_register(session_id TEXT, OUT idx INTEGER, OUT rank INTEGER) AS $$
+    SELECT (h & 1023)::INTEGER,
+           55 - length(ltrim(((h >> 10) & ((1::BIGINT << 54) - 1))::BIT(54)::TEXT, '0'))
+    FROM (SELECT hashtextextended(session_id, 0) AS h) AS hashed;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Fold a statement's inserted (or deleted) rows into the rollup. Runs once per
+-- statement, so a batched insert costs one upsert per (day, type, audience).
+CREATE OR REPLACE FUNCTION public.rollup_beforest_usage()
+RETURNS TRIGGER AS $$
+DECLARE
+    reg RECORD;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO public.beforest_usage_daily AS d (
+            day, content_type, target_audience, transformation_count,
+            original_length_sum, transformed_length_sum, length_change_percent_sum,
+            processing_time_count, processing_time_ms_sum, processing_time_buckets
+        )
+        SELECT
+            (n.created_at AT TIME ZONE 'UTC')::DATE,
+            n.content_type,
+            n.target_audience,
+            COUNT(*),
+            SUM(n.original_length),
+            SUM(n.transformed_length),
+            COALESCE(SUM(n.length_change_percent), 0),
+            COUNT(n.processing_time_ms),
+            COALESCE(SUM(n.processing_time_ms), 0),
+            public.beforest_processing_time_histogram(array_agg(n.processing_time_ms))
+        FROM new_rows n
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, content_type, target_audience) DO UPDATE SET
+            transformation_count = d.transformation_count + EXCLUDED.transformation_count,
+            original_length_sum = d.original_length_sum + EXCLUDED.original_length_sum,
+            transformed_length_sum = d.transformed_length_sum + EXCLUDED.transformed_length_sum,
+            length_change_percent_sum = d.length_change_percent_sum + EXCLUDED.length_change_percent_sum,
+            processing_time_count = d.processing_time_count + EXCLUDED.processing_time_count,
+            processing_time_ms_sum = d.processing_time_ms_sum + EXCLUDED.processing_time_ms_sum,
+            processing_time_buckets = public.beforest_add_counts(d.processing_time_buckets, EXCLUDED.processing_time_buckets);
+
+        FOR reg IN
+            SELECT (n.created_at AT TIME ZONE 'UTC')::DATE AS day, r.idx, MAX(r.rank) AS rank
+            FROM new_rows n, public.beforest_session_register(n.session_id) AS r
+            WHERE n.session_id IS NOT NULL
+            GROUP BY 1, 2
+        LOOP
+            INSERT INTO public.beforest_usage_daily_sessions (day) VALUES (reg.day) ON CONFLICT (day) DO NOTHING;
+            UPDATE public.beforest_usage_daily_sessions
+            SET registers = set_byte(registers, reg.idx, GREATEST(get_byte(registers, reg.idx), reg.rank))
+            WHERE day = reg.day;
+        END LOOP;
+    ELSE
+        -- Deleted rows come out of the counts; the session sketches cannot
+        -- forget a session, so they keep counting it
+        UPDATE public.beforest_usage_daily AS d SET
+            transformation_count = d.transformation_count - o.transformation_count,
+            original_length_sum = d.original_length_sum - o.original_length_sum,
+            transformed_length_sum = d.transformed_length_sum - o.transformed_length_sum,
+            length_change_percent_sum = d.length_change_percent_sum - o.length_change_percent_sum,
+            processing_time_count = d.processing_time_count - o.processing_time_count,
+            processing_time_ms_sum = d.processing_time_ms_sum - o.processing_time_ms_sum,
+            processing_time_buckets = public.beforest_add_counts(d.processing_time_buckets, o.processing_time_buckets, -1)
+        FROM (
+            SELECT
+                (r.created_at AT TIME ZONE 'UTC')::DATE AS day,
+                r.content_type,
+                r.target_audience,
+                COUNT(*) AS transformation_count,
+                SUM(r.original_length) AS original_length_sum,
+                SUM(r.transformed_length) AS transformed_length_sum,
+                COALESCE(SUM(r.length_change_percent), 0) AS length_change_percent_sum,
+                COUNT(r.processing_time_ms) AS processing_time_count,
+                COALESCE(SUM(r.processing_time_ms), 0) AS processing_time_ms_sum,
+                public.beforest_processing_time_histogram(array_agg(r.processing_time_ms)) AS processing_time_buckets
+            FROM old_rows r
+            GROUP BY 1, 2, 3
+        ) AS o
+        WHERE d.day = o.day AND d.content_type = o.content_type AND d.target_audience = o.target_audience;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS rollup_beforest_usage_insert ON public.beforest_transformations;
+CREATE TRIGGER rollup_beforest_usage_insert
+    AFTER INSERT ON public.beforest_transformations
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.rollup_beforest_usage();
+
+DROP TRIGGER IF EXISTS rollup_beforest_usage_delete ON public.beforest_transformations;
+CREATE TRIGGER rollup_beforest_usage_delete
+    AFTER DELETE ON public.beforest_transformations
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.rollup_beforest_usage();
+
+-- Backfill from the rows already stored (safe to rerun)
+TRUNCATE public.beforest_usage_daily, public.beforest_usage_daily_sessions;
+
+INSERT INTO public.beforest_usage_daily (
+    day, content_type, target_audience, transformation_count,
+    original_length_sum, transformed_length_sum, length_change_percent_sum,
+    processing_time_count, processing_time_ms_sum, processing_time_buckets
+)
+SELECT
+    (t.created_at AT TIME ZONE 'UTC')::DATE,
+    t.content_type,
+    t.target_audience,
+    COUNT(*),
+    SUM(t.original_length),
+    SUM(t.transformed_length),
+    COALESCE(SUM(t.length_change_percent), 0),
+    COUNT(t.processing_time_ms),
+    COALESCE(SUM(t.processing_time_ms), 0),
+    public.beforest_processing_time_histogram(array_agg(t.processing_time_ms))
+FROM public.beforest_transformations t
+GROUP BY 1, 2, 3;
+
+INSERT INTO public.beforest_usage_daily_sessions (day, registers)
+SELECT days.day, decode(string_agg(lpad(to_hex(COALESCE(ranks.rank, 0)), 2, '0'), '' ORDER BY i), 'hex')
+FROM (
+    SELECT DISTINCT (created_at AT TIME ZONE 'UTC')::DATE AS day
+    FROM public.beforest_transformations
+    WHERE session_id IS NOT NULL
+) AS days
+CROSS JOIN generate_series(0, 1023) AS i
+LEFT JOIN (
+    SELECT (t.created_at AT TIME ZONE 'UTC')::DATE AS day, r.idx, MAX(r.rank) AS rank
+    FROM public.beforest_transformations t, public.beforest_session_register(t.session_id) AS r
+    WHERE t.session_id IS NOT NULL
+    GROUP BY 1, 2
+) AS ranks ON ranks.day = days.day AND ranks.idx = i
+GROUP BY days.day;
+
+-- The analytics view reads the rollup too
+DROP VIEW IF EXISTS public.beforest_transformation_analytics;
+CREATE VIEW public.beforest_transformation_analytics AS
+SELECT
+    day AS date,
+    content_type,
+    target_audience,
+    transformation_count,
+    original_length_sum::NUMERIC / NULLIF(transformation_count, 0) AS avg_original_length,
+    transformed_length_sum::NUMERIC / NULLIF(transformation_count, 0) AS avg_transformed_length,
+    length_change_percent_sum / NULLIF(transformation_count, 0) AS avg_length_change,
+    processing_time_ms_sum::NUMERIC / NULLIF(processing_time_count, 0) AS avg_processing_time
+FROM public.beforest_usage_daily
+WHERE transformation_count > 0
+ORDER BY date DESC, transformation_count DESC;
+
+-- Usage stats from the rollup. The window is the last days_back UTC calendar
+-- days, today included.
+DROP FUNCTION IF EXISTS public.get_beforest_usage_stats(INTEGER);
+CREATE FUNCTION public.get_beforest_usage_stats(days_back INTEGER DEFAULT 7)
+RETURNS TABLE (
+    total_transformations BIGINT,
+    unique_sessions BIGINT,
+    most_common_content_type TEXT,
+    most_common_audience TEXT,
+    avg_original_length NUMERIC,
+    avg_transformed_length NUMERIC,
+    total_processing_time_hours NUMERIC,
+    avg_processing_time_ms NUMERIC,
+    processing_time_histogram JSONB
+) AS $$
+DECLARE
+    first_day DATE := (NOW() AT TIME ZONE 'UTC')::DATE - days_back + 1;
+    common_content_type TEXT;
+    common_audience TEXT;
+    session_estimate BIGINT;
+    histogram JSONB;
+BEGIN
+    SELECT d.content_type INTO common_content_type
+    FROM public.beforest_usage_daily d
+    WHERE d.day >= first_day
+    GROUP BY d.content_type
+    HAVING SUM(d.transformation_count) > 0
+    ORDER BY SUM(d.transformation_count) DESC
+    LIMIT 1;
+
+    SELECT d.target_audience INTO common_audience
+    FROM public.beforest_usage_daily d
+    WHERE d.day >= first_day
+    GROUP BY d.target_audience
+    HAVING SUM(d.transformation_count) > 0
+    ORDER BY SUM(d.transformation_count) DESC
+    LIMIT 1;
+
+    -- HyperLogLog estimate over the merged daily sketches, with the
+    -- linear counting correction for small cardinalities
+    SELECT CASE
+        WHEN sketch.registers = 0 THEN 0
+        WHEN sketch.raw_estimate <= 2.5 * 1024 AND sketch.zeros > 0 THEN round(1024 * ln(1024.0 / sketch.zeros))
+        ELSE round(sketch.raw_estimate)
+    END INTO session_estimate
+    FROM (
+        SELECT
+            COUNT(*) AS registers,
+            0.7213 / (1 + 1.079 / 1024) * 1024 * 1024 / SUM(power(2::NUMERIC, -merged.rank)) AS raw_estimate,
+            COUNT(*) FILTER (WHERE merged.rank = 0) AS zeros
+        FROM (
+            SELECT MAX(get_byte(s.registers, i)) AS rank
+            FROM public.beforest_usage_daily_sessions s
+            CROSS JOIN generate_series(0, 1023) AS i
+            WHERE s.day >= first_day
+            GROUP BY i
+        ) AS merged
+    ) AS sketch;
+
+    SELECT jsonb_agg(jsonb_build_object(
+        'min_ms', CASE WHEN b = 0 THEN 0 ELSE bounds[b] END,
+        'max_ms', bounds[b + 1],
+        'count', counts.total
+    ) ORDER BY b) INTO histogram
+    FROM (
+        SELECT b, COALESCE(SUM(d.processing_time_buckets[b + 1]), 0) AS total
+        FROM generate_series(0, array_length(public.beforest_processing_time_bounds(), 1)) AS b
+        LEFT JOIN public.beforest_usage_daily d ON d.day >= first_day
+        GROUP BY b
+    ) AS counts,
+    (SELECT public.beforest_processing_time_bounds() AS bounds) AS limits;
+
+    RETURN QUERY
+    SELECT
+        COALESCE(SUM(d.transformation_count), 0)::BIGINT,
+        COALESCE(session_estimate, 0),
+        COALESCE(common_content_type, 'N/A'),
+        COALESCE(common_audience, 'N/A'),
+        COALESCE(SUM(d.original_length_sum)::NUMERIC / NULLIF(SUM(d.transformation_count), 0), 0),
+        COALESCE(SUM(d.transformed_length_sum)::NUMERIC / NULLIF(SUM(d.transformation_count), 0), 0),
+        COALESCE(SUM(d.processing_time_ms_sum) / 1000.0 / 3600.0, 0),
+        COALESCE(SUM(d.processing_time_ms_sum)::NUMERIC / NULLIF(SUM(d.processing_time_count), 0), 0),
+        histogram
+    FROM public.beforest_usage_daily d
+    WHERE d.day >= first_day;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+ALTER TABLE public.beforest_usage_daily ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.beforest_usage_daily_sessions ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Allow reads on beforest_usage_daily" ON public.beforest_usage_daily;
+CREATE POLICY "Allow reads on beforest_usage_daily" ON public.beforest_usage_daily
+    FOR SELECT USING (true);
+DROP POLICY IF EXISTS "Allow reads on beforest_usage_daily_sessions" ON public.beforest_usage_daily_sessions;
+CREATE POLICY "Allow reads on beforest_usage_daily_sessions" ON public.beforest_usage_daily_sessions
+    FOR SELECT USING (true);
+
+COMMENT ON TABLE public.beforest_usage_daily IS 'Daily usage rollup of beforest_transformations, maintained by rollup_beforest_usage triggers';
+COMMENT ON TABLE public.beforest_usage_daily_sessions IS 'Per-day HyperLogLog sketch of distinct session_id values';
+
+COMMIT;
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - Write-behind analytics buffer
+Queues beforest_transformations rows in memory and writes them to Supabase in
+multi-row batches from a background thread, so no request waits on the
+database. Batches that cannot be written are spilled to a local append-only
+file and replayed once the database accepts writes again.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SpillFile:
+    """Append-only JSONL file of rows waiting to be written, shared by all workers on the host.
+
+    Rows carry user emails, IPs and content and are replayed in full, so the
+    file is readable by its owner only.
+    """
+
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        if os.path.exists(path):
+            # A file left by an earlier version may have been created world-readable
+            os.chmod(path, 0o600)
+
+    def _open_append(self):
+        return os.fdopen(os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600), 'ab')
+
+    def append(self, rows: List[Dict[str, Any]]):
+        data = ''.join(json.dumps(row, default=str) + '\n' for row in rows).encode('utf-8')
+        with self._open_append() as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def replay(self, write_rows: Callable[[List[Dict[str, Any]]], None], batch_size: int) -> int:
+        """Write spilled rows in batches. Returns the number replayed.
+
+        Stops at the first failed batch and keeps it and everything after it.
+        The file is locked throughout, so only one worker replays at a time.
+        """
+        if not self.size():
+            return 0
+
+        replayed = 0
+        with open(self.path, 'r+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                offset = 0
+                try:
+                    while True:
+                        batch, batch_end = [], offset
+                        f.seek(offset)
+                        for line in f:
+                            batch_end += len(line)
+                            try:
+                                batch.append(json.loads(line))
+                            except ValueError:
+                                # A blank line, or a write torn by a crash
+                                if line.strip():
+                                    logger.warning("Skipping unreadable line in analytics spill file")
+                            if len(batch) >= batch_size:
+                                break
+                        if not batch:
+                            offset = batch_end
+                            break
+                        try:
+                            write_rows(batch)
+                        except Exception as e:
+                            logger.warning(f"Analytics replay stopped after {replayed} rows: {str(e)}")
+                            break
+                        replayed += len(batch)
+                        offset = batch_end
+                finally:
+                    self._discard_prefix(f, offset)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return replayed
+
+    def _discard_prefix(self, f, offset: int):
+        # Shift the unreplayed tail to the start in place; replacing the file
+        # would strand appends from workers that already opened it
+        if offset == 0:
+            return
+        read_pos, write_pos = offset, 0
+        while True:
+            f.seek(read_pos)
+            chunk = f.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            f.seek(write_pos)
+            f.write(chunk)
+            read_pos += len(chunk)
+            write_pos += len(chunk)
+        f.truncate(write_pos)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class AnalyticsWriter:
+    """Background batcher for analytics rows.
+
+    Rows submitted together are never split across inserts. A batch is written
+    once it reaches batch_size rows or its oldest row has waited
+    flush_interval seconds.
+    """
+
+    def __init__(self,
+                 write_rows: Callable[[List[Dict[str, Any]]], None],
+                 spill_path: str,
+                 batch_size: int = 50,
+                 flush_interval: float = 2.0,
+                 max_queue: int = 10000,
+                 replay_interval: float = 30.0):
+        self.write_rows = write_rows
+        self.spill = SpillFile(spill_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.replay_interval = replay_interval
+        self._queue: 'queue.Queue[List[Dict[str, Any]]]' = queue.Queue(maxsize=max_queue)
+        self._depth = 0
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._last_replay_attempt = 0.0
+        self._stats = {
+            'rows_written': 0,
+            'rows_spilled': 0,
+            'rows_replayed': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'last_flush_ms': None,
+            'max_flush_ms': 0,
+            'total_flush_ms': 0,
+            'last_error': None
+        }
+
+    def submit(self, rows: List[Dict[str, Any]]):
+        """Queue rows for writing. Never blocks on the database."""
+        if not rows:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(rows)
+            with self._lock:
+                self._depth += len(rows)
+        except queue.Full:
+            # Keep the request fast; the rows are written on the next replay
+            self._spill(rows)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything queued so far has been written or spilled"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._lock:
+                if self._depth == 0:
+                    return True
+            time.sleep(0.05)
+        return False
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = self._depth
+        flushes = stats['flushes'] or 1
+        stats['avg_flush_ms'] = round(stats.pop('total_flush_ms') / flushes, 1)
+        stats['spill_bytes'] = self.spill.size()
+        return stats
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so a preloaded app starts one per worker
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='analytics-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+            elif self.spill.size() and time.time() - self._last_replay_attempt >= self.replay_interval:
+                self._replay()
+
+    def _next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        try:
+            batch = list(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return None
+
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.extend(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        start_time = time.time()
+        try:
+            self.write_rows(batch)
+            elapsed_ms = int((time.time() - start_time) * 1000)
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['rows_written'] += len(batch)
+                self._stats['last_flush_ms'] = elapsed_ms
+                self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed_ms)
+                self._stats['total_flush_ms'] += elapsed_ms
+            # The database is reachable, so catch up on anything spilled earlier
+            if self.spill.size():
+                self._replay()
+        except Exception as e:
+            logger.warning(f"Analytics flush of {len(batch)} rows failed, spilling to disk: {str(e)}")
+            with self._lock:
+                self._stats['failed_flushes'] += 1
+                self._stats['last_error'] = str(e)
+            self._spill(batch)
+        finally:
+            with self._lock:
+                self._depth -= len(batch)
+
+    def _spill(self, rows: List[Dict[str, Any]]):
+        try:
+            self.spill.append(rows)
+            with self._lock:
+                self._stats['rows_spilled'] += len(rows)
+        except Exception as e:
+            logger.error(f"Failed to spill {len(rows)} analytics rows: {str(e)}")
+
+    def _replay(self):
+        self._last_replay_attempt = time.time()
+        try:
+            replayed = self.spill.replay(self.write_rows, self.batch_size)
+            if replayed:
+                logger.info(f"Replayed {replayed} spilled analytics rows")
+        except Exception as e:
+            logger.error(f"Failed to replay analytics spill file: {str(e)}")
+            replayed = 0
+        with self._lock:
+            self._stats['rows_replayed'] += replayed
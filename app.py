@@ -5,11 +5,13 @@ A sophisticated brand voice transformation service using Azure OpenAI
 """
 
 import os
+import asyncio
 import logging
 import uuid
 import time
-from typing import Dict, Any, Optional
-from flask import Flask, request, jsonify, render_template, send_from_directory, session
+import threading
+from typing import Dict, Any, Optional, Iterator, AsyncIterator
+from flask import Flask, Response, abort, request, jsonify, render_template, send_from_directory, session
 from flask_cors import CORS
 import openai
 from datetime import datetime
@@ -17,6 +19,22 @@ import json
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import hashlib
+import atexit
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from jobs import JustificationJobStore, PENDING, RUNNING, COMPLETE
+from cache import (ResultCache, VersionCounter, create_backend, make_cache_key, settings_fingerprint, track_lookups,
+                   record_lookup, observe_lookups)
+from similarity import NearDuplicateIndex
+from analytics import AnalyticsWriter
+from supabase_rest import SupabaseRestClient
+from settings_store import SettingsFile
+from prompts import (CompiledPrompts, PromptTemplate, TemplateError, TRANSFORM_FIELDS, JUSTIFICATION_FIELDS)
+from assets import ASSET_FILES, ENCODINGS, PAGE_FILES, accepted_encodings, build_assets, compress
+import metrics
+import tracing
+from tracing import TraceSink
 
 # Load environment variables from .env file
 load_dotenv()
@@ -36,14 +54,189 @@ CORS(app)  # Enable CORS for frontend integration
 SETTINGS_FILE = 'settings.json'
 DEFAULT_PASSKEY_HASH = '8d969eef6ecad3c29a3a629280e686cf0c3f5d5a86aff3ca12020c923adc6c92'  # SHA-256 of '123456'
 
+# Transform pipelines: separate transform + justification calls, or one structured call
+PIPELINE_TWO_CALL = 'two_call'
+PIPELINE_SINGLE_CALL = 'single_call'
+PIPELINES = [PIPELINE_TWO_CALL, PIPELINE_SINGLE_CALL]
+
+SINGLE_CALL_INSTRUCTIONS = """
+
+Respond with a single JSON object and nothing else. Use this exact structure:
+{
+    "transformed_content": "The full transformed content",
+    "key_changes": [
+        "Brief description of main change 1",
+        "Brief description of main change 2",
+        "Brief description of main change 3"
+    ],
+    "brand_voice_improvements": [
+        "How change aligns with calm self-assurance",
+        "How change removes superlatives/drama",
+        "How change respects audience intelligence"
+    ],
+    "audience_adaptation": "How the transformation was tailored for the target audience",
+    "overall_strategy": "One sentence explaining the overall transformation approach"
+}
+
+Keep each analysis point concise (under 50 words). Focus only on the most significant changes."""
+
+# Local state shared by the worker processes on this host: the result cache,
+# deferred jobs and the analytics spill file. It holds user content and
+# contact details, so it must live outside the directory the app serves.
+STATIC_ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_DIR = os.getenv('STATE_DIR') or os.path.join(
+    os.getenv('XDG_STATE_HOME') or os.path.expanduser('~/.local/state'), 'beforest-brand-voice'
+)
+
+def check_state_dir(path: str) -> str:
+    """Create the state directory, refusing any path under the served root"""
+    state_dir, static_root = os.path.realpath(path), os.path.realpath(STATIC_ROOT)
+    if os.path.commonpath([state_dir, static_root]) == static_root:
+        raise RuntimeError(f"STATE_DIR {state_dir} is inside the served directory {static_root}; "
+                           f"set STATE_DIR to a path outside it")
+    os.makedirs(state_dir, mode=0o700, exist_ok=True)
+    return state_dir
+
+STATE_DIR = check_state_dir(STATE_DIR)
+
+# Result cache: 'sqlite' is shared by all workers on the host, 'memory' is per process
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite')
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 2000))  # 0 disables caching
+TRANSFORM_CACHE_TTL = int(os.getenv('TRANSFORM_CACHE_TTL', 21600))  # 6 hours
+USAGE_STATS_CACHE_TTL = int(os.getenv('USAGE_STATS_CACHE_TTL', 60))
+# Stats older than USAGE_STATS_CACHE_TTL are still served for this long while one
+# worker refreshes them in the background
+USAGE_STATS_STALE_TTL = int(os.getenv('USAGE_STATS_STALE_TTL', 3600))
+USAGE_STATS_REFRESH_TIMEOUT = int(os.getenv('USAGE_STATS_REFRESH_TIMEOUT', 30))
+HISTORY_CACHE_TTL = int(os.getenv('HISTORY_CACHE_TTL', 30))
+
+# History total count: 'exact', or PostgREST's 'planned' (planner estimate) or
+# 'estimated' (exact while small, planner estimate once large). The cached
+# count is bumped on every save and recomputed when its TTL runs out.
+HISTORY_COUNT_MODE = os.getenv('HISTORY_COUNT_MODE', 'exact')
+HISTORY_COUNT_TTL = int(os.getenv('HISTORY_COUNT_TTL', 300))
+
+# Deferred justification jobs
+JUSTIFICATION_WORKERS = int(os.getenv('JUSTIFICATION_WORKERS', 4))
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', 300))  # Re-run jobs whose worker went quiet
+JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', 86400))
+
+# Write-behind analytics: rows are queued and inserted in batches by a background thread
+ANALYTICS_WRITE_BEHIND = os.getenv('ANALYTICS_WRITE_BEHIND', 'true').lower() == 'true'
+ANALYTICS_BATCH_SIZE = int(os.getenv('ANALYTICS_BATCH_SIZE', 50))
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv('ANALYTICS_FLUSH_INTERVAL', 2.0))  # Seconds a row may wait for a batch
+ANALYTICS_MAX_QUEUE = int(os.getenv('ANALYTICS_MAX_QUEUE', 10000))  # Submissions beyond this go straight to disk
+
+# Static assets: 'memory' serves fingerprinted, precompressed copies from an
+# in-memory table built at startup; 'disk' reads each file per request
+STATIC_ASSETS = os.getenv('STATIC_ASSETS', 'memory')
+
+# JSON responses at least this large are gzip/brotli compressed for clients that accept it
+RESPONSE_COMPRESSION = os.getenv('RESPONSE_COMPRESSION', 'true').lower() == 'true'
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))  # gzip scale, 1-9
+
+# Per-request trace records (spans, model, token counts) appended to a JSONL
+# file that rotates by size. Empty disables the sink; Server-Timing is always sent.
+TRACE_LOG = os.getenv('TRACE_LOG', '')
+TRACE_LOG_MAX_BYTES = int(os.getenv('TRACE_LOG_MAX_BYTES', 10 * 1024 * 1024))
+TRACE_LOG_BACKUPS = int(os.getenv('TRACE_LOG_BACKUPS', 5))
+
+# Startup: the engine serves from settings.json at once and connects to
+# Supabase in the background. Requests that need the database wait up to
+# SUPABASE_CONNECT_WAIT seconds for the connection, then carry on without it.
+SUPABASE_CONNECT_WAIT = float(os.getenv('SUPABASE_CONNECT_WAIT', 10))
+# Under gunicorn --preload the engine is built once in the master and inherited
+# by the workers. gunicorn.conf.py sets this so the master opens no connections
+# and starts no threads; each worker calls brand_voice.start() after the fork.
+CONNECT_AFTER_FORK = os.getenv('CONNECT_AFTER_FORK', 'false').lower() == 'true'
+
+# Batch transforms
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 200))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 8))  # Upstream calls in flight per worker
+
+# Near-duplicate reuse: 'reuse' returns the prior result, 'draft' asks for a
+# low-effort revision of it, 'off' disables the index
+NEAR_DUPLICATE_OFF = 'off'
+NEAR_DUPLICATE_REUSE = 'reuse'
+NEAR_DUPLICATE_DRAFT = 'draft'
+NEAR_DUPLICATE_MODE = os.getenv('NEAR_DUPLICATE_MODE', NEAR_DUPLICATE_OFF)
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.9))  # Estimated Jaccard similarity
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv('NEAR_DUPLICATE_MAX_ENTRIES', 5000))
+
+REVISION_INSTRUCTIONS = """
+
+This content is a light edit of content that was already transformed. The earlier transformation is below. Revise it so it reflects the content above, changing only what the edits require, and return only the revised content.
+
+EARLIER TRANSFORMATION:
+{draft}"""
+
 class BeforestBrandVoice:
     """Brand voice transformation engine for Beforest"""
     
     def __init__(self):
+        init_start = time.perf_counter()
+        self.cache_backend = create_backend(CACHE_BACKEND, STATE_DIR, CACHE_MAX_ENTRIES)
+        self.cache = ResultCache(self.cache_backend, 'results', TRANSFORM_CACHE_TTL)
+        self.stats_cache = ResultCache(self.cache_backend, 'usage_stats', USAGE_STATS_CACHE_TTL + USAGE_STATS_STALE_TTL)
+        self.history_cache = ResultCache(self.cache_backend, 'history', HISTORY_CACHE_TTL)
+        self.count_cache = ResultCache(self.cache_backend, 'counts', HISTORY_COUNT_TTL)
+        self.record_cache = ResultCache(self.cache_backend, 'records', TRANSFORM_CACHE_TTL)
+        # Content versions behind the history ETags. A per-process backend cannot see
+        # other workers' bumps, so its versions only live as long as a cached page
+        self.versions = VersionCounter(
+            self.cache_backend, HISTORY_COUNT_TTL if self.cache_backend.shared else HISTORY_CACHE_TTL
+        )
+        self.near_duplicates = NearDuplicateIndex(
+            NEAR_DUPLICATE_THRESHOLD,
+            NEAR_DUPLICATE_MAX_ENTRIES if NEAR_DUPLICATE_MODE != NEAR_DUPLICATE_OFF else 0
+        )
         self.setup_azure_openai()
-        self.setup_supabase()
+        self._supabase = None
+        self.analytics_writer = None
+        # Set once Supabase is connected or given up on; ready once settings are reconciled too
+        self.connected = threading.Event()
+        self.ready = threading.Event()
+        self.startup: Dict[str, Any] = {'supabase': 'connecting'}
+        self.settings_file = SettingsFile(SETTINGS_FILE)
+        self.settings_version = 0
+        self._compiled: Optional[CompiledPrompts] = None
         self.load_settings()
         self.brand_voice_prompt = self.create_brand_voice_prompt()
+        self.compiled_prompts()
+        self.startup['init_ms'] = round((time.perf_counter() - init_start) * 1000, 1)
+        if not CONNECT_AFTER_FORK:
+            self.start(init_start)
+    
+    def start(self, since: Optional[float] = None):
+        """Connect in the background. Startup timings count from ``since``, or from now."""
+        since = since if since is not None else time.perf_counter()
+        threading.Thread(target=self.connect, args=(since,), name='engine-startup', daemon=True).start()
+    
+    @property
+    def supabase(self):
+        """The Supabase client, waiting for the startup connection if it is still being made"""
+        if not self.connected.is_set():
+            self.connected.wait(SUPABASE_CONNECT_WAIT)
+        return self._supabase
+    
+    def connect(self, since: float):
+        """Connect to Supabase and reconcile settings with the database, off the startup path"""
+        try:
+            self.setup_supabase()
+            self.setup_analytics_writer()
+        finally:
+            self.startup['supabase_ms'] = round((time.perf_counter() - since) * 1000, 1)
+            self.connected.set()
+        try:
+            self.sync_database_settings()
+            self.start_near_duplicate_rebuild()
+        finally:
+            ready_seconds = time.perf_counter() - since
+            self.startup['ready_ms'] = round(ready_seconds * 1000, 1)
+            metrics.observe_stage('startup', ready_seconds)
+            self.ready.set()
+            logger.info(f"Engine ready in {self.startup['ready_ms']} ms (supabase: {self.startup['supabase']})")
     
     def setup_azure_openai(self):
         """Configure Azure OpenAI client"""
@@ -79,41 +272,75 @@ class BeforestBrandVoice:
             if not self.supabase_url or not self.supabase_key:
                 logger.warning("Supabase credentials not found in environment variables")
                 logger.info("Analytics tracking will be disabled")
-                self.supabase = None
+                self.startup['supabase'] = 'not_configured'
                 return
             
-            # Initialize Supabase client with multiple fallback methods
-            self.supabase = None
+            # Initialize Supabase client with multiple fallback methods. The usual
+            # one is tried first; if it fails the rest are built and tested concurrently
             initialization_methods = [
                 self._init_supabase_method_1,
                 self._init_supabase_method_2, 
                 self._init_supabase_method_3,
                 self._init_minimal_client
             ]
+            results = [self._try_supabase_method(1, initialization_methods[0])]
+            if not results[0][1]:
+                with ThreadPoolExecutor(max_workers=len(initialization_methods) - 1,
+                                        thread_name_prefix='supabase-init') as pool:
+                    results += pool.map(self._try_supabase_method,
+                                        range(2, len(initialization_methods) + 1), initialization_methods[1:])
             
-            for i, method in enumerate(initialization_methods, 1):
-                try:
-                    self.supabase = method()
-                    if self.supabase:
-                        logger.info(f"Supabase initialized successfully with method {i}")
-                        # Test connection
-                        try:
-                            test = self.supabase.table('beforest_transformations').select("id").limit(1).execute()
-                            logger.info("Supabase connection tested successfully")
-                            break
-                        except:
-                            logger.debug(f"Method {i} client created but connection test failed")
-                            continue
-                except Exception as e:
-                    logger.debug(f"Supabase initialization method {i} failed: {str(e)}")
-                    continue
+            for i, (client, tested) in enumerate(results, 1):
+                if client and tested:
+                    logger.info(f"Supabase initialized successfully with method {i}")
+                    self._supabase = client
+                    self.startup['supabase'] = 'connected'
+                    return
+                if client:
+                    # As before, an untested client is kept if nothing passes the test
+                    self._supabase = client
             
-            if not self.supabase:
+            if self._supabase:
+                self.startup['supabase'] = 'untested'
+            else:
+                self.startup['supabase'] = 'unavailable'
                 logger.warning("All Supabase initialization methods failed - analytics will be disabled")
             
         except Exception as e:
             logger.error(f"Failed to setup Supabase: {str(e)}")
-            self.supabase = None
+            self._supabase = None
+            self.startup['supabase'] = 'unavailable'
+
+    def _try_supabase_method(self, i: int, method):
+        """Build a client with one method and test its connection. Returns (client, tested)."""
+        try:
+            client = method()
+        except Exception as e:
+            logger.debug(f"Supabase initialization method {i} failed: {str(e)}")
+            return None, False
+        if not client:
+            return None, False
+        try:
+            client.table('beforest_transformations').select("id").limit(1).execute()
+            return client, True
+        except Exception:
+            logger.debug(f"Method {i} client created but connection test failed")
+            return client, False
+
+    def setup_analytics_writer(self):
+        """Create the write-behind buffer for analytics rows"""
+        if not self._supabase or not ANALYTICS_WRITE_BEHIND:
+            return
+        
+        self.analytics_writer = AnalyticsWriter(
+            self.insert_transformations,
+            os.path.join(STATE_DIR, 'analytics-spill.jsonl'),
+            batch_size=ANALYTICS_BATCH_SIZE,
+            flush_interval=ANALYTICS_FLUSH_INTERVAL,
+            max_queue=ANALYTICS_MAX_QUEUE
+        )
+        # Give queued rows a chance to reach the database on shutdown
+        atexit.register(self.analytics_writer.flush)
 
     def _init_supabase_method_1(self):
         """Standard Supabase initialization"""
@@ -146,118 +373,122 @@ class BeforestBrandVoice:
             return None
 
     def _init_minimal_client(self):
-        """Create a minimal Supabase client as fallback"""
+        """Create a minimal Supabase REST client as fallback"""
         try:
-            # Try to create a basic client with minimal configuration
-            import requests
-            
-            class MinimalSupabaseClient:
-                def __init__(self, url, key):
-                    self.url = url.rstrip('/')
-                    self.key = key
-                    self.headers = {
-                        'apikey': self.key,
-                        'Authorization': f'Bearer {self.key}',
-                        'Content-Type': 'application/json'
-                    }
-                
-                def table(self, table_name):
-                    return MinimalTable(self.url, table_name, self.headers)
-                
-                def rpc(self, function_name, params=None):
-                    url = f"{self.url}/rest/v1/rpc/{function_name}"
-                    response = requests.post(url, json=params or {}, headers=self.headers)
-                    return MinimalResponse(response.json() if response.status_code == 200 else [])
-            
-            class MinimalTable:
-                def __init__(self, base_url, table_name, headers):
-                    self.url = f"{base_url}/rest/v1/{table_name}"
-                    self.headers = headers
-                
-                def insert(self, data):
-                    response = requests.post(self.url, json=data, headers=self.headers)
-                    return MinimalResponse(response.json() if response.status_code == 201 else None)
-                
-                def select(self, columns="*"):
-                    response = requests.get(f"{self.url}?select={columns}", headers=self.headers)
-                    return MinimalQuery(self.url, self.headers)
-            
-            class MinimalQuery:
-                def __init__(self, url, headers):
-                    self.url = url
-                    self.headers = headers
-                
-                def limit(self, count):
-                    return self
-                
-                def execute(self):
-                    response = requests.get(f"{self.url}?select=id&limit=1", headers=self.headers)
-                    return MinimalResponse(response.json() if response.status_code == 200 else [])
-            
-            class MinimalResponse:
-                def __init__(self, data):
-                    self.data = data if isinstance(data, list) else [data] if data else []
-            
-            return MinimalSupabaseClient(self.supabase_url, self.supabase_key)
-            
+            return SupabaseRestClient(self.supabase_url, self.supabase_key)
         except Exception as e:
             logger.error(f"Failed to create minimal Supabase client: {str(e)}")
             return None
     
     def load_settings(self):
-        """Load settings from database or file fallback"""
+        """Load settings from the settings.json snapshot, or the defaults until the database is read"""
         try:
-            # Try to load from database first
-            if self.supabase:
-                try:
-                    result = self.supabase.table('beforest_settings').select('*').execute()
-                    if result.data:
-                        self.settings = {}
-                        for row in result.data:
-                            self.settings[row['setting_key']] = row['setting_value']
-                        logger.info("Settings loaded from database")
-                        return
-                except Exception as db_error:
-                    logger.warning(f"Failed to load settings from database: {str(db_error)}")
-            
-            # Fallback to file
-            if os.path.exists(SETTINGS_FILE):
-                with open(SETTINGS_FILE, 'r') as f:
-                    self.settings = json.load(f)
-                    logger.info("Settings loaded from file")
-            else:
-                self.settings = self.get_default_settings()
-                self.save_settings()
+            file_settings, file_version = self.settings_file.read()
+            if file_settings:
+                self.settings, self.settings_version = file_settings, file_version
+                self.startup['settings'] = 'file'
+                logger.info(f"Settings loaded from file (version {file_version})")
+                return
         except Exception as e:
             logger.error(f"Failed to load settings: {str(e)}")
-            self.settings = self.get_default_settings()
+        self.settings = self.get_default_settings()
+        self.startup['settings'] = 'defaults'
+    
+    def sync_database_settings(self):
+        """Adopt the database settings if they are newer than the snapshot this worker started from"""
+        try:
+            db_settings, db_version = self.load_database_settings()
+            if db_settings and db_version >= self.settings_version:
+                # The database wins ties, as it did before settings were versioned
+                if any(self.settings.get(key) != value for key, value in db_settings.items()):
+                    # The passkey is never stored in the database
+                    if 'passkey_hash' in self.settings:
+                        db_settings.setdefault('passkey_hash', self.settings['passkey_hash'])
+                    self.apply_settings(db_settings, db_version)
+                    # Refresh the snapshot, so workers started later begin from these settings
+                    with self.settings_file.locked():
+                        if self.settings_file.disk_version() <= db_version:
+                            self.settings_file.write(db_settings, db_version)
+                self.startup['settings'] = 'database'
+                logger.info(f"Settings loaded from database (version {db_version})")
+            elif self.startup['settings'] == 'defaults' and not db_settings:
+                # First start anywhere: store the defaults in both places
+                self.save_settings()
+        except Exception as e:
+            logger.error(f"Failed to load settings from database: {str(e)}")
+    
+    def load_database_settings(self):
+        """Settings rows from beforest_settings. Returns (settings, version), or (None, 0)."""
+        if not self.supabase:
+            return None, 0
+        try:
+            result = self.supabase.table('beforest_settings').select('setting_key, setting_value').execute()
+        except Exception as db_error:
+            logger.warning(f"Failed to load settings from database: {str(db_error)}")
+            return None, 0
+        settings = {row['setting_key']: row['setting_value'] for row in result.data or []}
+        version = int(settings.pop('version', 0) or 0)
+        return settings or None, version
+    
+    def refresh_settings(self):
+        """Pick up settings another worker saved. Costs one stat() unless settings.json changed."""
+        if not self.settings_file.changed():
+            return
+        try:
+            settings, version = self.settings_file.read()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to reload settings: {str(e)}")
+            return
+        if settings is None or version <= self.settings_version:
+            return
+        
+        self.apply_settings(settings, version)
+        logger.info(f"Settings reloaded (version {version})")
+    
+    def apply_settings(self, settings: Dict[str, Any], version: int):
+        """Switch to settings saved elsewhere"""
+        self.settings, self.settings_version = settings, version
+        self._compiled = None
+        self.brand_voice_prompt = settings.get('prompts', {}).get('main', self.create_brand_voice_prompt())
+        # Near-duplicate matches were produced under the old prompts
+        self.near_duplicates.clear()
     
     def save_settings(self):
-        """Save current settings to database and file"""
+        """Save current settings to the database and settings.json under a new version"""
+        # The caller changed self.settings, so the compiled prompts are stale even if the save fails
+        self._compiled = None
         try:
-            # Save to database if available
-            if self.supabase:
-                try:
-                    for key, value in self.settings.items():
-                        if key != 'passkey_hash':  # Don't save passkey to DB
-                            self.supabase.rpc('update_setting', {
-                                'p_key': key,
-                                'p_value': value,
-                                'p_updated_by': 'admin'
-                            }).execute()
-                    logger.info("Settings saved to database")
-                except Exception as db_error:
-                    logger.warning(f"Failed to save settings to database: {str(db_error)}")
-            
-            # Always save to file as backup
-            with open(SETTINGS_FILE, 'w') as f:
-                json.dump(self.settings, f, indent=2)
-            logger.info("Settings saved to file")
+            # Saves from different workers are serialized, so versions never repeat
+            with self.settings_file.locked():
+                version = max(self.settings_file.disk_version(), self.settings_version) + 1
+                self.save_database_settings(version)
+                # The file is what every worker on this host watches, so it is always written
+                self.settings_file.write(self.settings, version)
+                self.settings_version = version
+            logger.info(f"Settings saved (version {version})")
             return True
         except Exception as e:
             logger.error(f"Failed to save settings: {str(e)}")
             return False
     
+    def save_database_settings(self, version: int):
+        """Upsert every setting, and the version, in one request"""
+        if not self.supabase:
+            return
+        updated_at = datetime.now().astimezone().isoformat()
+        rows = [
+            {'setting_key': key, 'setting_value': value, 'updated_at': updated_at, 'updated_by': 'admin'}
+            for key, value in self.settings.items()
+            if key != 'passkey_hash'  # Don't save passkey to DB
+        ]
+        rows.append({'setting_key': 'version', 'setting_value': version, 'updated_at': updated_at,
+                     'updated_by': 'admin'})
+        try:
+            self.supabase.table('beforest_settings').upsert(rows, on_conflict='setting_key').execute()
+            logger.info("Settings saved to database")
+        except Exception as db_error:
+            logger.warning(f"Failed to save settings to database: {str(db_error)}")
+    
     def get_default_settings(self):
         """Get default settings structure"""
         return {
@@ -270,7 +501,8 @@ class BeforestBrandVoice:
                 'deployment': self.deployment_name,
                 'max_tokens': 2000,
                 'reasoning_effort': 'medium',
-                'api_version': self.api_version
+                'api_version': self.api_version,
+                'pipeline': PIPELINE_TWO_CALL
             },
             'passkey_hash': DEFAULT_PASSKEY_HASH
         }
@@ -385,60 +617,531 @@ AUDIENCE-SPECIFIC ADAPTATIONS:
 
 Transform the provided content to strictly follow Beforest's brand voice: calm self-assurance, authenticity, respect for audience intelligence, simple factual sentences, and complete avoidance of superlatives, hyperbole, poetry, and drama. Let data and insights lead, using copy only to spark curiosity."""
 
+    def compile_prompts(self, settings: Dict[str, Any], version: int) -> CompiledPrompts:
+        """Parse the prompt templates and build everything a request needs from settings.
+
+        Raises TemplateError if a template cannot be rendered.
+        """
+        prompts = settings.get('prompts', {})
+        model_settings = settings.get('model', {})
+        deployment = model_settings.get('deployment', self.deployment_name)
+
+        transform = PromptTemplate('transform', prompts.get('transform') or self.get_default_transform_prompt(),
+                                   TRANSFORM_FIELDS, required=('original_content',))
+        justification = PromptTemplate('justification',
+                                       prompts.get('justification') or self.get_default_justification_prompt(),
+                                       JUSTIFICATION_FIELDS, required=('transformed_content',))
+
+        transform_params = {'engine': deployment, 'max_completion_tokens': model_settings.get('max_tokens', 2000)}
+        transform_params.update(self._model_params(deployment, model_settings))
+        justification_params = {'engine': deployment, 'max_completion_tokens': 800}
+        justification_params.update(self._model_params(deployment, model_settings, justification=True))
+
+        return CompiledPrompts(
+            version=version,
+            fingerprint=settings_fingerprint(settings),
+            transform=transform,
+            justification=justification,
+            system_message={"role": "system", "content": prompts.get('main', self.brand_voice_prompt)},
+            transform_params=transform_params,
+            justification_params=justification_params,
+            pipeline=model_settings.get('pipeline')
+        )
+
+    def compiled_prompts(self) -> CompiledPrompts:
+        """Prompts compiled for the current settings version, recompiled only when it changes"""
+        compiled = self._compiled
+        if compiled is not None and compiled.version == self.settings_version:
+            return compiled
+        try:
+            compiled = self.compile_prompts(self.settings, self.settings_version)
+        except TemplateError as e:
+            # Templates saved before they were validated; keep serving with the defaults
+            logger.error(f"Stored prompt templates are invalid, using the defaults: {str(e)}")
+            prompts = dict(self.settings.get('prompts', {}), transform=None, justification=None)
+            compiled = self.compile_prompts(dict(self.settings, prompts=prompts), self.settings_version)
+        self._compiled = compiled
+        return compiled
+
+    def _model_params(self, deployment: str, model_settings: Dict[str, Any], justification: bool = False) -> Dict[str, Any]:
+        """Get model-specific API parameters for the configured deployment"""
+        if 'o3' in deployment.lower():
+            # o3-mini only supports reasoning_effort
+            reasoning_effort = model_settings.get('reasoning_effort', 'medium')
+            if reasoning_effort in ['low', 'medium', 'high']:
+                return {'reasoning_effort': reasoning_effort}
+            return {}
+        if justification:
+            return {
+                'temperature': 0.3,  # Lower for more consistent JSON
+                'top_p': 0.9
+            }
+        # Traditional models support temperature, top_p, etc.
+        return {
+            'temperature': model_settings.get('temperature', 0.7),
+            'top_p': model_settings.get('top_p', 0.9),
+            'frequency_penalty': model_settings.get('frequency_penalty', 0),
+            'presence_penalty': model_settings.get('presence_penalty', 0)
+        }
+
+    @metrics.timed('prompt')
+    def build_transform_params(self,
+                               original_content: str,
+                               content_type: str,
+                               target_audience: str,
+                               additional_context: str = "") -> Dict[str, Any]:
+        """Build the Azure OpenAI request parameters for a transformation"""
+        prompts = self.compiled_prompts()
+        user_prompt = prompts.transform.render(
+            original_content=original_content,
+            content_type=content_type,
+            target_audience=target_audience,
+            additional_context=additional_context if additional_context else "None provided"
+        )
+        # The shared parameters are copied; only the user message is new per request
+        return dict(prompts.transform_params,
+                    messages=[prompts.system_message, {"role": "user", "content": user_prompt}])
+
+    @metrics.timed('prompt')
+    def build_justification_params(self,
+                                   original_content: str,
+                                   transformed_content: str,
+                                   content_type: str,
+                                   target_audience: str) -> Dict[str, Any]:
+        """Build the Azure OpenAI request parameters for a justification"""
+        prompts = self.compiled_prompts()
+        justification_prompt = prompts.justification.render(
+            original_content=original_content,
+            transformed_content=transformed_content,
+            content_type=content_type,
+            target_audience=target_audience
+        )
+        return dict(prompts.justification_params,
+                    messages=[prompts.justification_system_message, {"role": "user", "content": justification_prompt}])
+
+    def create_completion(self, stage: str, api_params: Dict[str, Any]):
+        """Call Azure OpenAI, timed as one stage of the request"""
+        with metrics.stage(stage):
+            try:
+                response = openai.ChatCompletion.create(**api_params)
+            except Exception as e:
+                metrics.count_upstream_error(stage, e)
+                raise
+        tracing.record_call(stage, api_params, response)
+        return response
+
+    async def acreate_completion(self, stage: str, api_params: Dict[str, Any]):
+        """Async variant of create_completion"""
+        with metrics.stage(stage):
+            try:
+                response = await openai.ChatCompletion.acreate(**api_params)
+            except Exception as e:
+                metrics.count_upstream_error(stage, e)
+                raise
+        tracing.record_call(stage, api_params, response)
+        return response
+
+    def parse_justification(self, justification_text: str) -> Optional[dict]:
+        """Parse the model's justification JSON, or None if it is not valid JSON"""
+        try:
+            return json.loads(justification_text)
+        except json.JSONDecodeError:
+            metrics.count_parse_fallback('justification')
+            return None
+
+    def unstructured_justification(self, target_audience: str) -> dict:
+        """Justification returned when the analysis is not valid JSON"""
+        return {
+            "key_changes": [
+                "Enhanced clarity and directness",
+                "Removed promotional language",
+                "Added factual precision"
+            ],
+            "brand_voice_improvements": [
+                "Adopted calm, confident tone",
+                "Eliminated superlatives and hype",
+                "Maintained respect for audience intelligence"
+            ],
+            "audience_adaptation": f"Tailored language and formality level for {target_audience}",
+            "overall_strategy": "Transformed content to match Beforest's authentic, data-driven communication style"
+        }
+
+    def fallback_justification(self, target_audience: str) -> dict:
+        """Justification returned when the analysis call fails"""
+        return {
+            "key_changes": [
+                "Enhanced clarity and directness",
+                "Aligned with brand voice guidelines",
+                "Improved professional tone"
+            ],
+            "brand_voice_improvements": [
+                "Applied calm self-assurance principle",
+                "Removed dramatic or promotional language",
+                "Maintained factual, science-based approach"
+            ],
+            "audience_adaptation": f"Adapted tone and content for {target_audience}",
+            "overall_strategy": "Transformed to match Beforest's authentic, data-driven brand voice"
+        }
+
+    def transform_cache_key(self,
+                            original_content: str,
+                            content_type: str,
+                            target_audience: str,
+                            additional_context: str = "") -> str:
+        """Cache key for a transformation under the active prompts and model settings"""
+        return make_cache_key(
+            'transform', self.compiled_prompts().fingerprint,
+            original_content=original_content,
+            content_type=content_type,
+            target_audience=target_audience,
+            additional_context=additional_context
+        )
+
+    def justification_cache_key(self,
+                                original_content: str,
+                                transformed_content: str,
+                                content_type: str,
+                                target_audience: str) -> str:
+        """Cache key for a justification under the active prompts and model settings"""
+        return make_cache_key(
+            'justification', self.compiled_prompts().fingerprint,
+            original_content=original_content,
+            transformed_content=transformed_content,
+            content_type=content_type,
+            target_audience=target_audience
+        )
+
+    def build_single_call_params(self,
+                                 original_content: str,
+                                 content_type: str,
+                                 target_audience: str,
+                                 additional_context: str = "") -> Dict[str, Any]:
+        """Build request parameters that ask for the transformation and justification as one JSON object"""
+        api_params = self.build_transform_params(
+            original_content, content_type, target_audience, additional_context
+        )
+        api_params['messages'][-1]['content'] += SINGLE_CALL_INSTRUCTIONS
+        # Room for the analysis on top of the transformed text
+        api_params['max_completion_tokens'] += 800
+        api_params['response_format'] = {'type': 'json_object'}
+        return api_params
+
+    def parse_single_call_output(self, output_text: str):
+        """Validate a single-call response and split it into (transformed_content, justification).
+
+        Raises ValueError when the output does not match the expected schema.
+        """
+        try:
+            output = json.loads(output_text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Response is not valid JSON: {str(e)}")
+        
+        if not isinstance(output, dict):
+            raise ValueError("Response is not a JSON object")
+        
+        transformed_content = output.get('transformed_content')
+        if not isinstance(transformed_content, str) or not transformed_content.strip():
+            raise ValueError("transformed_content must be a non-empty string")
+        
+        for field in ('key_changes', 'brand_voice_improvements'):
+            value = output.get(field)
+            if not isinstance(value, list) or not value or not all(isinstance(item, str) for item in value):
+                raise ValueError(f"{field} must be a non-empty list of strings")
+        
+        for field in ('audience_adaptation', 'overall_strategy'):
+            if not isinstance(output.get(field), str):
+                raise ValueError(f"{field} must be a string")
+        
+        justification = {
+            'key_changes': output['key_changes'],
+            'brand_voice_improvements': output['brand_voice_improvements'],
+            'audience_adaptation': output['audience_adaptation'],
+            'overall_strategy': output['overall_strategy']
+        }
+        return transformed_content.strip(), justification
+
+    def cached_pair(self,
+                    original_content: str,
+                    content_type: str,
+                    target_audience: str,
+                    additional_context: str = ""):
+        """Return a cached (transformed_content, justification) pair, or None"""
+        transformed_content = self.cache.get(
+            self.transform_cache_key(original_content, content_type, target_audience, additional_context),
+            'transform'
+        )
+        if transformed_content is None:
+            return None
+        
+        justification = self.cache.get(
+            self.justification_cache_key(original_content, transformed_content, content_type, target_audience),
+            'justification'
+        )
+        if justification is None:
+            return transformed_content, None
+        return transformed_content, justification
+
+    def cache_result_pair(self,
+                          original_content: str,
+                          content_type: str,
+                          target_audience: str,
+                          additional_context: str,
+                          result):
+        """Store both halves of a (transformed_content, justification) result"""
+        transformed_content, justification = result
+        self.cache.set(
+            self.transform_cache_key(original_content, content_type, target_audience, additional_context),
+            transformed_content
+        )
+        self.cache.set(
+            self.justification_cache_key(original_content, transformed_content, content_type, target_audience),
+            justification
+        )
+
+    async def acached_pair(self,
+                           original_content: str,
+                           content_type: str,
+                           target_audience: str,
+                           additional_context: str = ""):
+        """Async variant of cached_pair. SQLite lookups can wait on locks, so they run off the event loop."""
+        return await asyncio.to_thread(
+            self.cached_pair, original_content, content_type, target_audience, additional_context
+        )
+
+    async def acache_result_pair(self,
+                                 original_content: str,
+                                 content_type: str,
+                                 target_audience: str,
+                                 additional_context: str,
+                                 result):
+        """Async variant of cache_result_pair, run off the event loop"""
+        await asyncio.to_thread(
+            self.cache_result_pair, original_content, content_type, target_audience, additional_context, result
+        )
+
+    def start_near_duplicate_rebuild(self):
+        """Refill the near-duplicate index from saved transformations without blocking startup"""
+        if NEAR_DUPLICATE_MODE == NEAR_DUPLICATE_OFF or not self.supabase:
+            return
+        threading.Thread(target=self.rebuild_near_duplicates, name='near-duplicate-rebuild', daemon=True).start()
+
+    def rebuild_near_duplicates(self):
+        """Rebuild the near-duplicate index from the most recent rows in beforest_transformations"""
+        try:
+            result = self.supabase.table('beforest_transformations') \
+                .select('id, original_content, content_type, target_audience, additional_context, '
+                        'transformed_content, justification') \
+                .order('created_at', desc=True) \
+                .limit(NEAR_DUPLICATE_MAX_ENTRIES) \
+                .execute()
+            self.near_duplicates.rebuild(result.data or [])
+            logger.info(f"Near-duplicate index rebuilt with {len(self.near_duplicates)} transformations")
+        except Exception as e:
+            logger.warning(f"Failed to rebuild near-duplicate index: {str(e)}")
+
+    def remember_result(self,
+                        original_content: str,
+                        content_type: str,
+                        target_audience: str,
+                        additional_context: str,
+                        result,
+                        entry_id: str = None):
+        """Add a finished (transformed_content, justification) result to the near-duplicate index"""
+        transformed_content, justification = result
+        self.near_duplicates.add(
+            entry_id or self.transform_cache_key(original_content, content_type, target_audience, additional_context),
+            original_content, content_type, target_audience, additional_context,
+            transformed_content, justification
+        )
+
+    async def aremember_result(self,
+                               original_content: str,
+                               content_type: str,
+                               target_audience: str,
+                               additional_context: str,
+                               result):
+        """Async variant of remember_result"""
+        # Signing runs here too, so it is kept off the event loop like the lookup
+        await asyncio.to_thread(
+            self.remember_result, original_content, content_type, target_audience, additional_context, result
+        )
+
+    def find_near_duplicate(self,
+                            original_content: str,
+                            content_type: str,
+                            target_audience: str,
+                            additional_context: str = "") -> Optional[Dict[str, Any]]:
+        """Look up a prior result for a lightly edited version of this content"""
+        if NEAR_DUPLICATE_MODE not in (NEAR_DUPLICATE_REUSE, NEAR_DUPLICATE_DRAFT):
+            return None
+        
+        match = self.near_duplicates.find(original_content, content_type, target_audience, additional_context)
+        record_lookup('near_duplicate', match is not None)
+        if match:
+            logger.info(f"Near-duplicate of {match['id']} found - Similarity: {match['similarity']}")
+        return match
+
+    def build_revision_params(self,
+                              original_content: str,
+                              content_type: str,
+                              target_audience: str,
+                              additional_context: str,
+                              draft: str) -> Dict[str, Any]:
+        """Build request parameters that revise an earlier transformation instead of starting over"""
+        api_params = self.build_transform_params(
+            original_content, content_type, target_audience, additional_context
+        )
+        api_params['messages'][-1]['content'] += REVISION_INSTRUCTIONS.format(draft=draft)
+        if 'reasoning_effort' in api_params:
+            # Editing a draft needs far less reasoning than a fresh transformation
+            api_params['reasoning_effort'] = 'low'
+        return api_params
+
+    def near_duplicate_pair(self,
+                            original_content: str,
+                            content_type: str,
+                            target_audience: str,
+                            additional_context: str = ""):
+        """Return a (transformed_content, justification) pair derived from a near-duplicate, or None"""
+        match = self.find_near_duplicate(original_content, content_type, target_audience, additional_context)
+        if not match:
+            return None
+        
+        transformed_content = match['transformed_content']
+        if NEAR_DUPLICATE_MODE == NEAR_DUPLICATE_DRAFT:
+            try:
+                api_params = self.build_revision_params(
+                    original_content, content_type, target_audience, additional_context, transformed_content
+                )
+                response = self.create_completion('transform_call', api_params)
+                transformed_content = response.choices[0].message.content.strip()
+            except Exception as e:
+                logger.warning(f"Draft revision failed, running a full transformation: {str(e)}")
+                return None
+        
+        # The edits are small enough that the earlier analysis still describes the changes
+        justification = match['justification'] or self.generate_justification(
+            original_content, transformed_content, content_type, target_audience
+        )
+        result = (transformed_content, justification)
+        self.cache_result_pair(original_content, content_type, target_audience, additional_context, result)
+        return result
+
+    async def anear_duplicate_pair(self,
+                                   original_content: str,
+                                   content_type: str,
+                                   target_audience: str,
+                                   additional_context: str = ""):
+        """Async variant of near_duplicate_pair"""
+        # Signing a long text takes tens of milliseconds, too long to hold the event loop
+        match = await asyncio.to_thread(
+            self.find_near_duplicate, original_content, content_type, target_audience, additional_context
+        )
+        if not match:
+            return None
+        
+        transformed_content = match['transformed_content']
+        if NEAR_DUPLICATE_MODE == NEAR_DUPLICATE_DRAFT:
+            try:
+                api_params = self.build_revision_params(
+                    original_content, content_type, target_audience, additional_context, transformed_content
+                )
+                response = await self.acreate_completion('transform_call', api_params)
+                transformed_content = response.choices[0].message.content.strip()
+            except Exception as e:
+                logger.warning(f"Draft revision failed, running a full transformation: {str(e)}")
+                return None
+        
+        justification = match['justification'] or await self.agenerate_justification(
+            original_content, transformed_content, content_type, target_audience
+        )
+        result = (transformed_content, justification)
+        await self.acache_result_pair(original_content, content_type, target_audience, additional_context, result)
+        return result
+
+    def transform_with_justification(self,
+                                     original_content: str,
+                                     content_type: str,
+                                     target_audience: str,
+                                     additional_context: str = "",
+                                     use_cache: bool = True):
+        """Transform content and generate its justification using the configured pipeline.
+
+        Returns a (transformed_content, justification) tuple. The single-call
+        pipeline falls back to two calls if its response fails validation.
+        """
+        cached = self.cached_pair(original_content, content_type, target_audience, additional_context) if use_cache else None
+        if cached and cached[1] is not None:
+            return cached
+        
+        if cached:
+            # Transformation cached, justification expired or evicted
+            justification = self.generate_justification(
+                original_content, cached[0], content_type, target_audience, use_cache=False
+            )
+            return cached[0], justification
+        
+        near_duplicate = self.near_duplicate_pair(
+            original_content, content_type, target_audience, additional_context
+        ) if use_cache else None
+        if near_duplicate:
+            return near_duplicate
+        
+        if self.compiled_prompts().pipeline == PIPELINE_SINGLE_CALL:
+            try:
+                api_params = self.build_single_call_params(
+                    original_content, content_type, target_audience, additional_context
+                )
+                response = self.create_completion('single_call', api_params)
+                result = self.parse_single_call_output(response.choices[0].message.content.strip())
+                self.cache_result_pair(original_content, content_type, target_audience, additional_context, result)
+                self.remember_result(original_content, content_type, target_audience, additional_context, result)
+                logger.info(f"Single-call transformation succeeded - Length: {len(result[0])} chars")
+                return result
+            except ValueError as e:
+                metrics.count_parse_fallback('single_call')
+                logger.warning(f"Single-call response failed validation, falling back to two calls: {str(e)}")
+            except Exception as e:
+                logger.warning(f"Single-call transformation failed, falling back to two calls: {str(e)}")
+        
+        # Lookups already happened above, so go straight to the upstream calls
+        transformed_content = self.transform_content(
+            original_content, content_type, target_audience, additional_context, use_cache=False
+        )
+        justification = self.generate_justification(
+            original_content, transformed_content, content_type, target_audience, use_cache=False
+        )
+        self.remember_result(original_content, content_type, target_audience, additional_context,
+                             (transformed_content, justification))
+        return transformed_content, justification
+
     def transform_content(self, 
                          original_content: str, 
                          content_type: str, 
                          target_audience: str, 
-                         additional_context: str = "") -> str:
+                         additional_context: str = "",
+                         use_cache: bool = True) -> str:
         """Transform content using Azure OpenAI"""
         
         try:
-            # Create user prompt with context using template
-            transform_template = self.settings['prompts'].get('transform', self.get_default_transform_prompt())
-            user_prompt = transform_template.format(
-                original_content=original_content,
-                content_type=content_type,
-                target_audience=target_audience,
-                additional_context=additional_context if additional_context else "None provided"
-            )
-
-            # Get model settings
-            model_settings = self.settings.get('model', {})
-            
-            # Prepare API call parameters based on model type
-            deployment = model_settings.get('deployment', self.deployment_name)
-            
-            # Base parameters for all models
-            api_params = {
-                'engine': deployment,
-                'messages': [
-                    {"role": "system", "content": self.settings['prompts'].get('main', self.brand_voice_prompt)},
-                    {"role": "user", "content": user_prompt}
-                ],
-                'max_completion_tokens': model_settings.get('max_tokens', 2000)
-            }
+            cache_key = self.transform_cache_key(original_content, content_type, target_audience, additional_context)
+            if use_cache:
+                cached = self.cache.get(cache_key, 'transform')
+                if cached is not None:
+                    logger.info(f"Content transformation served from cache - Length: {len(cached)} chars")
+                    return cached
             
-            # Add model-specific parameters
-            if 'o3' in deployment.lower():
-                # o3-mini only supports reasoning_effort
-                reasoning_effort = model_settings.get('reasoning_effort', 'medium')
-                if reasoning_effort in ['low', 'medium', 'high']:
-                    api_params['reasoning_effort'] = reasoning_effort
-            else:
-                # Traditional models support temperature, top_p, etc.
-                api_params.update({
-                    'temperature': model_settings.get('temperature', 0.7),
-                    'top_p': model_settings.get('top_p', 0.9),
-                    'frequency_penalty': model_settings.get('frequency_penalty', 0),
-                    'presence_penalty': model_settings.get('presence_penalty', 0)
-                })
+            api_params = self.build_transform_params(
+                original_content, content_type, target_audience, additional_context
+            )
             
             # Call Azure OpenAI
-            response = openai.ChatCompletion.create(**api_params)
+            response = self.create_completion('transform_call', api_params)
             
             transformed_content = response.choices[0].message.content.strip()
             logger.info(f"Content transformed successfully - Length: {len(transformed_content)} chars")
             
+            self.cache.set(cache_key, transformed_content)
             return transformed_content
             
         except Exception as e:
@@ -449,179 +1152,828 @@ Transform the provided content to strictly follow Beforest's brand voice: calm s
                              original_content: str, 
                              transformed_content: str, 
                              content_type: str, 
-                             target_audience: str) -> dict:
+                             target_audience: str,
+                             use_cache: bool = True) -> dict:
         """Generate justification for transformation changes"""
         
         try:
-            # Use justification template from settings
-            justification_template = self.settings['prompts'].get('justification', self.get_default_justification_prompt())
-            justification_prompt = justification_template.format(
-                original_content=original_content,
-                transformed_content=transformed_content,
-                content_type=content_type,
-                target_audience=target_audience
-            )
-
-            # Get model settings for justification
-            model_settings = self.settings.get('model', {})
-            deployment = model_settings.get('deployment', self.deployment_name)
+            cache_key = self.justification_cache_key(original_content, transformed_content, content_type, target_audience)
+            if use_cache:
+                cached = self.cache.get(cache_key, 'justification')
+                if cached is not None:
+                    logger.info("Justification served from cache")
+                    return cached
             
-            # Prepare API call parameters
-            api_params = {
-                'engine': deployment,
-                'messages': [
-                    {"role": "system", "content": "You are an expert content analyst specializing in Beforest's brand voice. Provide precise, factual analysis in the requested JSON format."},
-                    {"role": "user", "content": justification_prompt}
-                ],
-                'max_completion_tokens': 800
-            }
-            
-            # Add model-specific parameters
-            if 'o3' in deployment.lower():
-                reasoning_effort = model_settings.get('reasoning_effort', 'medium')
-                if reasoning_effort in ['low', 'medium', 'high']:
-                    api_params['reasoning_effort'] = reasoning_effort
-            else:
-                api_params.update({
-                    'temperature': 0.3,  # Lower for more consistent JSON
-                    'top_p': 0.9
-                })
+            api_params = self.build_justification_params(
+                original_content, transformed_content, content_type, target_audience
+            )
             
             # Call Azure OpenAI for justification
-            response = openai.ChatCompletion.create(**api_params)
+            response = self.create_completion('justification_call', api_params)
             
             justification_text = response.choices[0].message.content.strip()
             
             # Try to parse as JSON, fallback to structured text if needed
-            try:
-                import json
-                justification = json.loads(justification_text)
-            except json.JSONDecodeError:
-                # Fallback: create structured response from text
-                justification = {
-                    "key_changes": [
-                        "Enhanced clarity and directness",
-                        "Removed promotional language",
-                        "Added factual precision"
-                    ],
-                    "brand_voice_improvements": [
-                        "Adopted calm, confident tone",
-                        "Eliminated superlatives and hype",
-                        "Maintained respect for audience intelligence"
-                    ],
-                    "audience_adaptation": f"Tailored language and formality level for {target_audience}",
-                    "overall_strategy": "Transformed content to match Beforest's authentic, data-driven communication style"
-                }
+            justification = self.parse_justification(justification_text)
+            if justification is None:
+                return self.unstructured_justification(target_audience)
             
+            # Only real analyses are cached, never the fallbacks
+            self.cache.set(cache_key, justification)
             logger.info("Justification generated successfully")
             return justification
             
         except Exception as e:
             logger.error(f"Justification generation failed: {str(e)}")
             # Return fallback justification
-            return {
-                "key_changes": [
-                    "Enhanced clarity and directness",
-                    "Aligned with brand voice guidelines",
-                    "Improved professional tone"
-                ],
-                "brand_voice_improvements": [
-                    "Applied calm self-assurance principle",
-                    "Removed dramatic or promotional language",
-                    "Maintained factual, science-based approach"
-                ],
-                "audience_adaptation": f"Adapted tone and content for {target_audience}",
-                "overall_strategy": "Transformed to match Beforest's authentic, data-driven brand voice"
-            }
+            return self.fallback_justification(target_audience)
 
-    def save_transformation(self, 
-                          original_content: str,
-                          transformed_content: str,
-                          content_type: str,
-                          target_audience: str,
-                          additional_context: str,
-                          justification: dict,
-                          processing_time_ms: int,
-                          user_email: str = None,
-                          user_ip: str = None,
-                          user_agent: str = None,
-                          session_id: str = None) -> bool:
-        """Save transformation data to Supabase for analytics"""
-        
-        if not self.supabase:
-            logger.debug("Supabase not configured, skipping analytics tracking")
-            return False
+    def stream_transform_content(self,
+                                 original_content: str,
+                                 content_type: str,
+                                 target_audience: str,
+                                 additional_context: str = "",
+                                 use_cache: bool = True) -> Iterator[str]:
+        """Transform content, yielding text deltas as Azure OpenAI produces them"""
         
         try:
-            # Calculate metrics
-            original_length = len(original_content)
-            transformed_length = len(transformed_content)
-            length_change_percent = ((transformed_length - original_length) / original_length * 100) if original_length > 0 else 0
+            cache_key = self.transform_cache_key(original_content, content_type, target_audience, additional_context)
+            if use_cache:
+                cached = self.cache.get(cache_key, 'transform')
+                if cached is not None:
+                    yield cached
+                    return
             
-            # Prepare data for insertion
-            transformation_data = {
-                'original_content': original_content,
-                'transformed_content': transformed_content,
-                'content_type': content_type,
-                'target_audience': target_audience,
-                'additional_context': additional_context or '',
-                'original_length': original_length,
-                'transformed_length': transformed_length,
-                'length_change_percent': round(length_change_percent, 2),
-                'justification': justification,
-                'processing_time_ms': processing_time_ms,
-                'api_model_used': self.deployment_name,
-                'user_email': user_email,
-                'user_ip': user_ip,
-                'user_agent': user_agent,
-                'session_id': session_id or str(uuid.uuid4())
-            }
+            api_params = self.build_transform_params(
+                original_content, content_type, target_audience, additional_context
+            )
             
-            # Insert into Supabase
-            result = self.supabase.table('beforest_transformations').insert(transformation_data).execute()
+            chunks = []
+            # The stage covers the whole stream, not just the time to the first chunk
+            stream_start = time.perf_counter()
+            for chunk in openai.ChatCompletion.create(stream=True, **api_params):
+                # Azure sends content-filter chunks without choices
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].get('delta', {}).get('content')
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+            
+            transformed_content = ''.join(chunks).strip()
+            metrics.observe_stage('transform_call', time.perf_counter() - stream_start, stream_start)
+            logger.info(f"Content streamed successfully - Length: {len(transformed_content)} chars")
+            self.cache.set(cache_key, transformed_content)
             
-            if result.data:
-                logger.info(f"Transformation saved successfully with ID: {result.data[0].get('id', 'unknown')}")
-                return True
-            else:
-                logger.warning("Failed to save transformation - no data returned")
-                return False
-                
         except Exception as e:
-            logger.error(f"Failed to save transformation to Supabase: {str(e)}")
-            return False
+            logger.error(f"Content transformation stream failed: {str(e)}")
+            metrics.count_upstream_error('transform_call', e)
+            raise
 
-    def get_usage_stats(self, days_back: int = 7) -> Dict[str, Any]:
-        """Get usage statistics from Supabase"""
-        
-        if not self.supabase:
-            return {"error": "Supabase not configured"}
+    async def atransform_content(self,
+                                 original_content: str,
+                                 content_type: str,
+                                 target_audience: str,
+                                 additional_context: str = "",
+                                 use_cache: bool = True) -> str:
+        """Transform content using the async Azure OpenAI client"""
         
         try:
-            # Call the stored function for usage stats
-            result = self.supabase.rpc('get_beforest_usage_stats', {'days_back': days_back}).execute()
+            cache_key = self.transform_cache_key(original_content, content_type, target_audience, additional_context)
+            if use_cache:
+                cached = await asyncio.to_thread(self.cache.get, cache_key, 'transform')
+                if cached is not None:
+                    return cached
             
-            if result.data:
-                return result.data[0]
-            else:
-                return {"error": "No data returned"}
-                
-        except Exception as e:
-            logger.error(f"Failed to get usage stats from Supabase: {str(e)}")
-            return {"error": str(e)}
+            api_params = self.build_transform_params(
+                original_content, content_type, target_audience, additional_context
+            )
+            
+            # Call Azure OpenAI without blocking the event loop
+            response = await self.acreate_completion('transform_call', api_params)
+            
+            transformed_content = response.choices[0].message.content.strip()
+            logger.info(f"Content transformed successfully - Length: {len(transformed_content)} chars")
+            
+            await asyncio.to_thread(self.cache.set, cache_key, transformed_content)
+            return transformed_content
+            
+        except Exception as e:
+            logger.error(f"Content transformation failed: {str(e)}")
+            raise
+
+    async def atransform_with_justification(self,
+                                            original_content: str,
+                                            content_type: str,
+                                            target_audience: str,
+                                            additional_context: str = "",
+                                            use_cache: bool = True):
+        """Async variant of transform_with_justification"""
+        cached = await self.acached_pair(
+            original_content, content_type, target_audience, additional_context
+        ) if use_cache else None
+        if cached and cached[1] is not None:
+            return cached
+        
+        if cached:
+            # Transformation cached, justification expired or evicted
+            justification = await self.agenerate_justification(
+                original_content, cached[0], content_type, target_audience, use_cache=False
+            )
+            return cached[0], justification
+        
+        near_duplicate = await self.anear_duplicate_pair(
+            original_content, content_type, target_audience, additional_context
+        ) if use_cache else None
+        if near_duplicate:
+            return near_duplicate
+        
+        if self.compiled_prompts().pipeline == PIPELINE_SINGLE_CALL:
+            try:
+                api_params = self.build_single_call_params(
+                    original_content, content_type, target_audience, additional_context
+                )
+                response = await self.acreate_completion('single_call', api_params)
+                result = self.parse_single_call_output(response.choices[0].message.content.strip())
+                await self.acache_result_pair(original_content, content_type, target_audience, additional_context, result)
+                await self.aremember_result(original_content, content_type, target_audience, additional_context, result)
+                logger.info(f"Single-call transformation succeeded - Length: {len(result[0])} chars")
+                return result
+            except ValueError as e:
+                metrics.count_parse_fallback('single_call')
+                logger.warning(f"Single-call response failed validation, falling back to two calls: {str(e)}")
+            except Exception as e:
+                logger.warning(f"Single-call transformation failed, falling back to two calls: {str(e)}")
+        
+        # Lookups already happened above, so go straight to the upstream calls
+        transformed_content = await self.atransform_content(
+            original_content, content_type, target_audience, additional_context, use_cache=False
+        )
+        justification = await self.agenerate_justification(
+            original_content, transformed_content, content_type, target_audience, use_cache=False
+        )
+        await self.aremember_result(original_content, content_type, target_audience, additional_context,
+                                    (transformed_content, justification))
+        return transformed_content, justification
+
+    async def agenerate_justification(self,
+                                      original_content: str,
+                                      transformed_content: str,
+                                      content_type: str,
+                                      target_audience: str,
+                                      use_cache: bool = True) -> dict:
+        """Generate justification using the async Azure OpenAI client"""
+        
+        try:
+            cache_key = self.justification_cache_key(original_content, transformed_content, content_type, target_audience)
+            if use_cache:
+                cached = await asyncio.to_thread(self.cache.get, cache_key, 'justification')
+                if cached is not None:
+                    return cached
+            
+            api_params = self.build_justification_params(
+                original_content, transformed_content, content_type, target_audience
+            )
+            
+            response = await self.acreate_completion('justification_call', api_params)
+            
+            justification_text = response.choices[0].message.content.strip()
+            justification = self.parse_justification(justification_text)
+            if justification is None:
+                return self.unstructured_justification(target_audience)
+            
+            await asyncio.to_thread(self.cache.set, cache_key, justification)
+            logger.info("Justification generated successfully")
+            return justification
+            
+        except Exception as e:
+            logger.error(f"Justification generation failed: {str(e)}")
+            return self.fallback_justification(target_audience)
+
+    async def astream_transform_content(self,
+                                        original_content: str,
+                                        content_type: str,
+                                        target_audience: str,
+                                        additional_context: str = "",
+                                        use_cache: bool = True) -> AsyncIterator[str]:
+        """Async variant of stream_transform_content"""
+        
+        try:
+            cache_key = self.transform_cache_key(original_content, content_type, target_audience, additional_context)
+            if use_cache:
+                cached = await asyncio.to_thread(self.cache.get, cache_key, 'transform')
+                if cached is not None:
+                    yield cached
+                    return
+            
+            api_params = self.build_transform_params(
+                original_content, content_type, target_audience, additional_context
+            )
+            
+            chunks = []
+            stream_start = time.perf_counter()
+            response = await openai.ChatCompletion.acreate(stream=True, **api_params)
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].get('delta', {}).get('content')
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+            
+            transformed_content = ''.join(chunks).strip()
+            metrics.observe_stage('transform_call', time.perf_counter() - stream_start, stream_start)
+            logger.info(f"Content streamed successfully - Length: {len(transformed_content)} chars")
+            await asyncio.to_thread(self.cache.set, cache_key, transformed_content)
+            
+        except Exception as e:
+            logger.error(f"Content transformation stream failed: {str(e)}")
+            metrics.count_upstream_error('transform_call', e)
+            raise
+
+    def build_transformation_row(self,
+                                 original_content: str,
+                                 transformed_content: str,
+                                 content_type: str,
+                                 target_audience: str,
+                                 additional_context: str,
+                                 justification: dict,
+                                 processing_time_ms: int,
+                                 user_email: str = None,
+                                 user_ip: str = None,
+                                 user_agent: str = None,
+                                 session_id: str = None,
+                                 transformation_id: str = None) -> Dict[str, Any]:
+        """Build a beforest_transformations row for a finished transformation"""
+        # Calculate metrics
+        original_length = len(original_content)
+        transformed_length = len(transformed_content)
+        length_change_percent = ((transformed_length - original_length) / original_length * 100) if original_length > 0 else 0
+        
+        transformation_data = {
+            'original_content': original_content,
+            'transformed_content': transformed_content,
+            'content_type': content_type,
+            'target_audience': target_audience,
+            'additional_context': additional_context or '',
+            'original_length': original_length,
+            'transformed_length': transformed_length,
+            'length_change_percent': round(length_change_percent, 2),
+            'justification': justification,
+            'processing_time_ms': processing_time_ms,
+            'api_model_used': self.deployment_name,
+            'user_email': user_email,
+            'user_ip': user_ip,
+            'user_agent': user_agent,
+            'session_id': session_id or str(uuid.uuid4())
+        }
+        
+        # Deferred justifications reuse the id handed out in the /transform response.
+        # Every row gets its id up front so a replayed write cannot duplicate it.
+        transformation_data['id'] = transformation_id or str(uuid.uuid4())
+        
+        return transformation_data
+
+    def save_transformation(self, 
+                          original_content: str,
+                          transformed_content: str,
+                          content_type: str,
+                          target_audience: str,
+                          additional_context: str,
+                          justification: dict,
+                          processing_time_ms: int,
+                          user_email: str = None,
+                          user_ip: str = None,
+                          user_agent: str = None,
+                          session_id: str = None,
+                          transformation_id: str = None) -> bool:
+        """Save transformation data to Supabase for analytics"""
+        return self.save_transformations([self.build_transformation_row(
+            original_content, transformed_content, content_type, target_audience, additional_context,
+            justification, processing_time_ms, user_email, user_ip, user_agent, session_id, transformation_id
+        )])
+
+    @metrics.timed('save')
+    def save_transformations(self, rows: list) -> bool:
+        """Save transformation rows to Supabase.
+
+        With the write-behind buffer this only queues the rows, and returns
+        True once they are accepted; otherwise they are inserted in a single
+        request before returning.
+        """
+        
+        if not self.supabase:
+            logger.debug("Supabase not configured, skipping analytics tracking")
+            return False
+        
+        if not rows:
+            return False
+        
+        if self.analytics_writer:
+            self.analytics_writer.submit(rows)
+            return True
+        
+        try:
+            # Insert into Supabase
+            result = self.supabase.table('beforest_transformations').insert(rows).execute()
+            
+            if result.data:
+                if len(rows) == 1:
+                    logger.info(f"Transformation saved successfully with ID: {result.data[0].get('id', 'unknown')}")
+                else:
+                    logger.info(f"{len(result.data)} transformations saved in one insert")
+                self.transformations_saved(len(result.data))
+                return True
+            else:
+                logger.warning("Failed to save transformation - no data returned")
+                return False
+                
+        except Exception as e:
+            logger.error(f"Failed to save transformation to Supabase: {str(e)}")
+            return False
+
+    @metrics.timed('save_flush')
+    def insert_transformations(self, rows: list):
+        """Write a batch of rows for the analytics buffer. Raises if the write fails."""
+        # Rows already present (a replay after a lost response) are skipped,
+        # and only the rows actually inserted come back
+        result = self.supabase.table('beforest_transformations').upsert(rows, ignore_duplicates=True).execute()
+        self.transformations_saved(len(result.data or []))
+
+    def transformations_saved(self, count: int):
+        """Keep cached history views in step with newly inserted rows"""
+        # Cached history pages no longer include the newest rows
+        self.history_cache.clear()
+        if count:
+            self.count_cache.incr('transformations', count)
+        # Bumped last: a request that reads the new version can no longer find an old page
+        self.versions.bump('transformations')
+
+    def count_transformations(self) -> int:
+        """Total rows in beforest_transformations, from the cache when possible"""
+        cached = self.count_cache.get('transformations', 'history_count')
+        if cached is not None:
+            return cached
+        
+        try:
+            # The count comes back in Content-Range, so one row is enough
+            with metrics.stage('history_count'):
+                result = self.supabase.table('beforest_transformations') \
+                    .select('id', count=HISTORY_COUNT_MODE).limit(1).execute()
+            total_count = result.count or 0
+        except Exception as e:
+            logger.warning(f"Failed to count transformations: {str(e)}")
+            return 0
+        
+        self.count_cache.set('transformations', total_count)
+        return total_count
+
+    def get_usage_stats(self, days_back: int = 7) -> Dict[str, Any]:
+        """Get usage statistics from Supabase.
+
+        Returns ``{'stats': ..., 'cached_at': ...}``, or ``{'error': ...}``.
+        Stale stats are returned at once while a background refresh runs.
+        """
+        
+        if not self.supabase:
+            return {"error": "Supabase not configured"}
+        
+        try:
+            cached = self.stats_cache.get(f'days:{days_back}', 'usage_stats')
+            if cached is not None:
+                if time.time() - cached['cached_at'] >= USAGE_STATS_CACHE_TTL:
+                    self.start_usage_stats_refresh(days_back)
+                return cached
+            
+            if not self.stats_cache.enabled:
+                # No shared cache to hold a lock or a result, so there is nothing to wait for
+                return self.refresh_usage_stats(days_back)
+            
+            # Nothing to serve: one worker runs the query and the rest wait for its result.
+            # The lock is released however the query ends, so if it fails the next
+            # waiter takes the lock and runs it instead of waiting out the timeout.
+            deadline = time.time() + USAGE_STATS_REFRESH_TIMEOUT
+            while True:
+                if self.stats_cache.add(f'refresh:{days_back}', os.getpid(), USAGE_STATS_REFRESH_TIMEOUT):
+                    try:
+                        return self.refresh_usage_stats(days_back)
+                    finally:
+                        self.stats_cache.delete(f'refresh:{days_back}')
+                if time.time() >= deadline:
+                    return self.refresh_usage_stats(days_back)
+                time.sleep(0.1)
+                cached = self.stats_cache.get(f'days:{days_back}', 'usage_stats')
+                if cached is not None:
+                    return cached
+                
+        except Exception as e:
+            logger.error(f"Failed to get usage stats from Supabase: {str(e)}")
+            return {"error": str(e)}
+
+    def refresh_usage_stats(self, days_back: int) -> Dict[str, Any]:
+        """Run the stats query and cache the result"""
+        # Call the stored function for usage stats
+        with metrics.stage('stats_query'):
+            result = self.supabase.rpc('get_beforest_usage_stats', {'days_back': days_back}).execute()
+        if not result.data:
+            return {"error": "No data returned"}
+        
+        entry = {'stats': result.data[0], 'cached_at': time.time()}
+        self.stats_cache.set(f'days:{days_back}', entry)
+        return entry
+
+    def start_usage_stats_refresh(self, days_back: int):
+        """Refresh stale stats in the background, unless any worker already is"""
+        # The lock expires on its own, so a worker that dies mid-refresh cannot wedge it
+        if not self.stats_cache.add(f'refresh:{days_back}', os.getpid(), USAGE_STATS_REFRESH_TIMEOUT):
+            return
+        
+        def refresh():
+            try:
+                self.refresh_usage_stats(days_back)
+            except Exception as e:
+                logger.warning(f"Background usage stats refresh failed, serving stale stats: {str(e)}")
+            finally:
+                self.stats_cache.delete(f'refresh:{days_back}')
+        
+        get_query_executor().submit(refresh)
 
 # Initialize the brand voice engine
 brand_voice = BeforestBrandVoice()
+observe_lookups(metrics.count_cache_lookup)
+
+# Deferred justification job table (shared by all workers) and this worker's pool
+justification_jobs = JustificationJobStore(os.path.join(STATE_DIR, 'jobs.sqlite3'))
+justification_jobs.purge(JOB_RETENTION_SECONDS)
+_justification_executor = None
+
+def get_justification_executor() -> ThreadPoolExecutor:
+    """Get the background pool for deferred justifications, created on first use"""
+    global _justification_executor
+    if _justification_executor is None:
+        _justification_executor = ThreadPoolExecutor(
+            max_workers=JUSTIFICATION_WORKERS,
+            thread_name_prefix='justification'
+        )
+    return _justification_executor
+
+def run_justification_job(job_id: str):
+    """Generate a deferred justification and save the transformation row"""
+    try:
+        job = justification_jobs.get(job_id)
+        if not job:
+            logger.warning(f"Justification job {job_id} not found")
+            return
+        
+        justification_jobs.mark_running(job_id)
+        payload = job['payload']
+        start_time = time.time()
+        
+        justification = brand_voice.generate_justification(
+            original_content=payload['original_content'],
+            transformed_content=payload['transformed_content'],
+            content_type=payload['content_type'],
+            target_audience=payload['target_audience']
+        )
+        
+        # Record the full pipeline time, as the synchronous path does
+        processing_time_ms = payload['processing_time_ms'] + int((time.time() - start_time) * 1000)
+        
+        saved = brand_voice.save_transformation(
+            original_content=payload['original_content'],
+            transformed_content=payload['transformed_content'],
+            content_type=payload['content_type'],
+            target_audience=payload['target_audience'],
+            additional_context=payload['additional_context'],
+            justification=justification,
+            processing_time_ms=processing_time_ms,
+            user_email=payload.get('user_email'),
+            user_ip=payload.get('user_ip'),
+            user_agent=payload.get('user_agent'),
+            session_id=payload.get('session_id'),
+            transformation_id=job_id
+        )
+        
+        brand_voice.remember_result(
+            payload['original_content'], payload['content_type'], payload['target_audience'],
+            payload['additional_context'], (payload['transformed_content'], justification), entry_id=job_id
+        )
+        justification_jobs.complete(job_id, justification, saved)
+        logger.info(f"Deferred justification {job_id} completed - Saved: {saved}")
+        
+    except Exception as e:
+        logger.error(f"Deferred justification {job_id} failed: {str(e)}")
+        justification_jobs.fail(job_id, str(e))
+
+def submit_justification_job(fields: Dict[str, str],
+                             transformed_content: str,
+                             processing_time_ms: int,
+                             client_info: Dict[str, Optional[str]]) -> str:
+    """Queue a justification for background processing and return its job id"""
+    job_id = str(uuid.uuid4())
+    justification_jobs.create(job_id, {
+        **fields,
+        **client_info,
+        'transformed_content': transformed_content,
+        'processing_time_ms': processing_time_ms
+    })
+    get_justification_executor().submit(run_justification_job, job_id)
+    return job_id
+
+def load_asset_table():
+    """Fingerprint and precompress the front-end assets once per process"""
+    if STATIC_ASSETS != 'memory':
+        return None
+    try:
+        start_time = time.time()
+        table = build_assets(os.path.dirname(os.path.abspath(__file__)))
+        logger.info(f"Built {len(table.manifest)} static assets ({table.size() // 1024} KB) "
+                    f"in {int((time.time() - start_time) * 1000)}ms")
+        return table
+    except Exception as e:
+        logger.error(f"Failed to build static assets, serving from disk: {str(e)}")
+        return None
+
+asset_table = load_asset_table()
+
+# The only files served from disk when the asset table is off. Anything else in
+# the directory (source, settings.json, .env) is never sent.
+PUBLIC_FILES = frozenset(ASSET_FILES + PAGE_FILES)
+
+def send_asset(filename: str):
+    """Serve a file from the asset table, or a public file from the directory"""
+    asset = asset_table.get(filename) if asset_table else None
+    if asset is None:
+        if filename not in PUBLIC_FILES:
+            abort(404)
+        return send_from_directory(STATIC_ROOT, filename)
+    
+    encoding, body = asset.select(request.headers.get('Accept-Encoding', ''))
+    response = Response(body, content_type=asset.content_type)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = asset_table.cache_control(filename)
+    response.set_etag(asset.etag(encoding))
+    return response.make_conditional(request)
+
+# Endpoints that send Server-Timing and write trace records
+TRACED_ENDPOINTS = {'transform_content', 'get_transformations', 'analytics'}
+trace_sink = TraceSink(TRACE_LOG, TRACE_LOG_MAX_BYTES, TRACE_LOG_BACKUPS) if TRACE_LOG else None
+
+@app.before_request
+def refresh_settings():
+    """Serve every request with the settings another worker may have just saved"""
+    brand_voice.refresh_settings()
+
+@app.before_request
+def start_request_trace():
+    if request.endpoint in TRACED_ENDPOINTS:
+        tracing.start_trace(request.path, request.headers.get('X-Request-ID'))
+
+# Registered before compress_response, so it runs after it and the total includes compression
+@app.after_request
+def finish_request_trace(response: Response) -> Response:
+    """Add Server-Timing and X-Request-ID, and queue the trace record"""
+    trace = tracing.current_trace()
+    if trace is None:
+        return response
+    response.headers['Server-Timing'] = trace.server_timing()
+    response.headers['X-Request-ID'] = trace.request_id
+    if trace_sink is not None:
+        record = trace.record(response.status_code)
+        # Written once the body has been sent, off the latency path
+        response.call_on_close(lambda: trace_sink.write(record))
+    return response
+
+@app.teardown_request
+def end_request_trace(error=None):
+    tracing.end_trace()
+
+def not_modified(etag: str) -> Response:
+    """304 for a conditional request that matched before any work was done"""
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def conditional_json(payload: Dict[str, Any], etag: Optional[str] = None) -> Response:
+    """JSON response with a weak ETag, or a 304 if the client already has it.
+
+    Without ``etag`` the payload itself is hashed, which suits data that is
+    already in memory or in the cache.
+    """
+    if etag is None:
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        etag = hashlib.sha256(encoded).hexdigest()[:32]
+    response = jsonify(payload)
+    # Weak, so the same tag covers the compressed and uncompressed representations
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    """Compress JSON bodies for clients that accept gzip or brotli"""
+    if not RESPONSE_COMPRESSION or response.mimetype != 'application/json':
+        return response
+    if response.status_code < 200 or response.status_code in (204, 206, 304) or response.direct_passthrough:
+        return response
+    if 'Content-Encoding' in response.headers:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    encoding = next((encoding for encoding in ENCODINGS if encoding in accepted), None)
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return response
+    
+    with metrics.stage('compress'):
+        response.set_data(compress(body, encoding, COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # A strong ETag names exact bytes, which compression just changed
+        response.set_etag(etag, weak=True)
+    return response
 
 @app.route('/')
 def index():
     """Serve the main application page"""
-    return send_from_directory('.', 'index.html')
+    return send_asset('index.html')
 
 @app.route('/<path:filename>')
 def serve_static(filename):
     """Serve static files (CSS, JS, etc.)"""
-    return send_from_directory('.', filename)
+    return send_asset(filename)
+
+@metrics.timed('validation')
+def validate_transform_request(data: Any):
+    """Validate a transform payload.
+
+    Returns a tuple of (fields, error) where exactly one is set. ``fields``
+    holds the normalized values that ``BeforestBrandVoice.transform_content``
+    expects.
+    """
+    if not isinstance(data, dict):
+        return None, 'Request must be JSON'
+    
+    # Required fields validation
+    required_fields = ['original_content', 'content_type', 'target_audience']
+    missing_fields = [field for field in required_fields if not data.get(field)]
+    
+    if missing_fields:
+        return None, f'Missing required fields: {", ".join(missing_fields)}'
+    
+    # A number or list here would fail later, outside the caller's error handling
+    text_fields = required_fields + ['additional_context']
+    wrong_types = [field for field in text_fields if data.get(field) is not None and not isinstance(data[field], str)]
+    
+    if wrong_types:
+        return None, f'Fields must be strings: {", ".join(wrong_types)}'
+    
+    # Extract data
+    original_content = data['original_content'].strip()
+    additional_context = (data.get('additional_context') or '').strip()
+    
+    # Validate content length
+    if len(original_content) < 10:
+        return None, 'Original content is too short (minimum 10 characters)'
+    
+    if len(original_content) > 5000:
+        return None, 'Original content is too long (maximum 5000 characters)'
+    
+    return {
+        'original_content': original_content,
+        'content_type': data['content_type'],
+        'target_audience': data['target_audience'],
+        'additional_context': additional_context
+    }, None
+
+def build_transform_response(fields: Dict[str, str],
+                             transformed_content: str,
+                             justification: dict,
+                             processing_time_ms: int,
+                             saved: bool,
+                             cache_lookups=None) -> Dict[str, Any]:
+    """Build the JSON body returned by the transform endpoints"""
+    body = {
+        'success': True,
+        'transformed_content': transformed_content,
+        'justification': justification,
+        'metadata': {
+            'timestamp': datetime.now().isoformat(),
+            'content_type': fields['content_type'],
+            'target_audience': fields['target_audience'],
+            'original_length': len(fields['original_content']),
+            'transformed_length': len(transformed_content),
+            'processing_time_ms': processing_time_ms,
+            'saved_to_analytics': saved
+        }
+    }
+    if cache_lookups is not None:
+        body['metadata']['cache'] = brand_voice.cache.request_metadata(cache_lookups)
+    return body
+
+def sse_event(event: str, data: Any) -> str:
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def get_client_info(data: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Get client information for analytics from the current request"""
+    return {
+        'user_ip': request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR')),
+        'user_agent': request.headers.get('User-Agent', ''),
+        'session_id': request.headers.get('X-Session-ID') or data.get('session_id'),
+        'user_email': (data.get('user_email') or '').strip()
+    }
+
+def validate_batch_request(data: Any):
+    """Validate a batch payload. Returns (items, error); items are validated one by one later."""
+    if not isinstance(data, dict):
+        return None, 'Request must be JSON'
+    
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return None, 'items must be a non-empty list'
+    
+    if len(items) > BATCH_MAX_ITEMS:
+        return None, f'Too many items (maximum {BATCH_MAX_ITEMS})'
+    
+    return items, None
+
+def batch_item_result(index: int,
+                      fields: Dict[str, str],
+                      transformed_content: str,
+                      justification: dict,
+                      processing_time_ms: int,
+                      cache_lookups,
+                      client_info: Dict[str, Optional[str]]):
+    """Build a batch item's response entry and its analytics row"""
+    result = {'index': index, **build_transform_response(
+        fields, transformed_content, justification, processing_time_ms, None, cache_lookups
+    )}
+    row = brand_voice.build_transformation_row(
+        justification=justification,
+        transformed_content=transformed_content,
+        processing_time_ms=processing_time_ms,
+        **fields,
+        **client_info
+    )
+    return result, row
+
+def batch_item_error(index: int, error: str) -> Dict[str, Any]:
+    return {'index': index, 'success': False, 'error': error}
+
+def build_batch_response(results: list, rows: list, start_time: float) -> Dict[str, Any]:
+    """Save the successful items in one insert and build the batch response body"""
+    saved = brand_voice.save_transformations(rows)
+    for result in results:
+        if result['success']:
+            result['metadata']['saved_to_analytics'] = saved
+    
+    succeeded = sum(1 for result in results if result['success'])
+    return {
+        'success': True,
+        'results': results,
+        'metadata': {
+            'timestamp': datetime.now().isoformat(),
+            'total': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'processing_time_ms': int((time.time() - start_time) * 1000),
+            'saved_to_analytics': saved
+        }
+    }
+
+_batch_executor = None
+
+def get_batch_executor() -> ThreadPoolExecutor:
+    """Get the pool that bounds this worker's batch calls to Azure OpenAI, created on first use"""
+    global _batch_executor
+    if _batch_executor is None:
+        _batch_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='batch')
+    return _batch_executor
+
+def run_batch_item(index: int, item: Any, use_cache: bool, client_info: Dict[str, Optional[str]]):
+    """Transform one batch item. Returns (result, row), with row None when the item failed."""
+    fields, error = validate_transform_request(item)
+    if error:
+        return batch_item_error(index, error), None
+    
+    try:
+        start_time = time.time()
+        cache_lookups = track_lookups()
+        transformed_content, justification = brand_voice.transform_with_justification(
+            **fields, use_cache=use_cache and not item.get('no_cache')
+        )
+        processing_time_ms = int((time.time() - start_time) * 1000)
+        return batch_item_result(index, fields, transformed_content, justification, processing_time_ms,
+                                 cache_lookups, client_info)
+    except Exception as e:
+        logger.error(f"Batch item {index} failed: {str(e)}")
+        return batch_item_error(index, f'Transformation failed: {str(e)}'), None
 
 @app.route('/transform', methods=['POST'])
 def transform_content():
@@ -632,35 +1984,15 @@ def transform_content():
             return jsonify({'success': False, 'error': 'Request must be JSON'}), 400
         
         data = request.get_json()
+        fields, error = validate_transform_request(data)
         
-        # Required fields validation
-        required_fields = ['original_content', 'content_type', 'target_audience']
-        missing_fields = [field for field in required_fields if not data.get(field)]
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
         
-        if missing_fields:
-            return jsonify({
-                'success': False, 
-                'error': f'Missing required fields: {", ".join(missing_fields)}'
-            }), 400
-        
-        # Extract data
-        original_content = data['original_content'].strip()
-        content_type = data['content_type']
-        target_audience = data['target_audience']
-        additional_context = data.get('additional_context', '').strip()
-        
-        # Validate content length
-        if len(original_content) < 10:
-            return jsonify({
-                'success': False, 
-                'error': 'Original content is too short (minimum 10 characters)'
-            }), 400
-        
-        if len(original_content) > 5000:
-            return jsonify({
-                'success': False, 
-                'error': 'Original content is too long (maximum 5000 characters)'
-            }), 400
+        original_content = fields['original_content']
+        content_type = fields['content_type']
+        target_audience = fields['target_audience']
+        additional_context = fields['additional_context']
         
         # Check if Azure OpenAI is configured
         if not brand_voice.azure_endpoint or not brand_voice.azure_key:
@@ -669,34 +2001,54 @@ def transform_content():
                 'error': 'Azure OpenAI is not configured. Please check your environment variables.'
             }), 500
         
-        # Track processing time
+        # Track processing time and cache usage
         start_time = time.time()
+        cache_lookups = track_lookups()
+        use_cache = not data.get('no_cache')
         
-        # Transform content
-        transformed_content = brand_voice.transform_content(
-            original_content=original_content,
-            content_type=content_type,
-            target_audience=target_audience,
-            additional_context=additional_context
-        )
+        # Deferred mode: transform now, hand the justification to the background pool.
+        # The exact cache is checked first and the near-duplicate index only on a
+        # miss; a complete result from either has its justification, so nothing is deferred.
+        deferred = data.get('defer_justification')
+        cached = brand_voice.cached_pair(**fields) if deferred and use_cache else None
+        complete = cached if cached and cached[1] is not None else None
+        if deferred and use_cache and not cached:
+            complete = brand_voice.near_duplicate_pair(**fields)
+        if deferred and not complete:
+            # The cache was already consulted above
+            transformed_content = cached[0] if cached else brand_voice.transform_content(
+                original_content=original_content,
+                content_type=content_type,
+                target_audience=target_audience,
+                additional_context=additional_context,
+                use_cache=False
+            )
+            
+            processing_time_ms = int((time.time() - start_time) * 1000)
+            job_id = submit_justification_job(fields, transformed_content, processing_time_ms, get_client_info(data))
+            
+            logger.info(f"Transformation completed - Type: {content_type}, Audience: {target_audience}, "
+                        f"Justification deferred: {job_id}")
+            
+            body = build_transform_response(fields, transformed_content, None, processing_time_ms, None,
+                                            cache_lookups)
+            body['transformation_id'] = job_id
+            body['justification_job_id'] = job_id
+            body['justification_url'] = f'/api/transformations/{job_id}/justification'
+            return jsonify(body), 202
         
-        # Generate transformation justification
-        justification = brand_voice.generate_justification(
+        # Transform content and generate the justification
+        transformed_content, justification = complete or brand_voice.transform_with_justification(
             original_content=original_content,
-            transformed_content=transformed_content,
             content_type=content_type,
-            target_audience=target_audience
+            target_audience=target_audience,
+            additional_context=additional_context,
+            use_cache=use_cache
         )
         
         # Calculate processing time
         processing_time_ms = int((time.time() - start_time) * 1000)
         
-        # Get client information for analytics
-        user_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR'))
-        user_agent = request.headers.get('User-Agent', '')
-        session_id = request.headers.get('X-Session-ID') or data.get('session_id')
-        user_email = data.get('user_email', '').strip()
-        
         # Save transformation to Supabase for analytics
         saved = brand_voice.save_transformation(
             original_content=original_content,
@@ -706,29 +2058,17 @@ def transform_content():
             additional_context=additional_context,
             justification=justification,
             processing_time_ms=processing_time_ms,
-            user_email=user_email,
-            user_ip=user_ip,
-            user_agent=user_agent,
-            session_id=session_id
+            **get_client_info(data)
         )
         
         # Log transformation for monitoring
         logger.info(f"Transformation completed - Type: {content_type}, Audience: {target_audience}, Saved: {saved}")
         
-        return jsonify({
-            'success': True,
-            'transformed_content': transformed_content,
-            'justification': justification,
-            'metadata': {
-                'timestamp': datetime.now().isoformat(),
-                'content_type': content_type,
-                'target_audience': target_audience,
-                'original_length': len(original_content),
-                'transformed_length': len(transformed_content),
-                'processing_time_ms': processing_time_ms,
-                'saved_to_analytics': saved
-            }
-        })
+        with metrics.stage('serialize'):
+            response = jsonify(build_transform_response(
+                fields, transformed_content, justification, processing_time_ms, saved, cache_lookups
+            ))
+        return response
         
     except Exception as e:
         logger.error(f"Transformation error: {str(e)}")
@@ -737,14 +2077,153 @@ def transform_content():
             'error': f'Transformation failed: {str(e)}'
         }), 500
 
+@app.route('/transform/batch', methods=['POST'])
+def transform_batch():
+    """Transform a list of items concurrently and save them in one insert"""
+    try:
+        if not request.is_json:
+            return jsonify({'success': False, 'error': 'Request must be JSON'}), 400
+        
+        data = request.get_json()
+        items, error = validate_batch_request(data)
+        
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        # Check if Azure OpenAI is configured
+        if not brand_voice.azure_endpoint or not brand_voice.azure_key:
+            return jsonify({
+                'success': False,
+                'error': 'Azure OpenAI is not configured. Please check your environment variables.'
+            }), 500
+        
+        start_time = time.time()
+        use_cache = not data.get('no_cache')
+        client_info = get_client_info(data)
+        
+        futures = [
+            get_batch_executor().submit(run_batch_item, index, item, use_cache, client_info)
+            for index, item in enumerate(items)
+        ]
+        outcomes = [future.result() for future in futures]
+        
+        body = build_batch_response(
+            [result for result, _ in outcomes],
+            [row for _, row in outcomes if row is not None],
+            start_time
+        )
+        
+        logger.info(f"Batch completed - Items: {body['metadata']['total']}, "
+                    f"Failed: {body['metadata']['failed']}, Saved: {body['metadata']['saved_to_analytics']}")
+        
+        return jsonify(body)
+        
+    except Exception as e:
+        logger.error(f"Batch transformation error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Batch transformation failed: {str(e)}'
+        }), 500
+
+@app.route('/transform/stream', methods=['POST'])
+def transform_content_stream():
+    """Server-Sent Events variant of /transform that forwards tokens as they arrive"""
+    # Clients opt in with Accept: text/event-stream; everyone else gets JSON
+    if 'text/event-stream' not in request.headers.get('Accept', ''):
+        return transform_content()
+    
+    if not request.is_json:
+        return jsonify({'success': False, 'error': 'Request must be JSON'}), 400
+    
+    data = request.get_json()
+    fields, error = validate_transform_request(data)
+    
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    if not brand_voice.azure_endpoint or not brand_voice.azure_key:
+        return jsonify({
+            'success': False,
+            'error': 'Azure OpenAI is not configured. Please check your environment variables.'
+        }), 500
+    
+    client_info = get_client_info(data)
+    use_cache = not data.get('no_cache')
+    
+    def generate():
+        start_time = time.time()
+        cache_lookups = track_lookups()
+        chunks = []
+        try:
+            for delta in brand_voice.stream_transform_content(**fields, use_cache=use_cache):
+                chunks.append(delta)
+                yield sse_event('token', {'content': delta})
+            
+            transformed_content = ''.join(chunks).strip()
+            
+            justification = brand_voice.generate_justification(
+                original_content=fields['original_content'],
+                transformed_content=transformed_content,
+                content_type=fields['content_type'],
+                target_audience=fields['target_audience'],
+                use_cache=use_cache
+            )
+            yield sse_event('justification', justification)
+            
+            processing_time_ms = int((time.time() - start_time) * 1000)
+            
+            saved = brand_voice.save_transformation(
+                transformed_content=transformed_content,
+                justification=justification,
+                processing_time_ms=processing_time_ms,
+                **fields,
+                **client_info
+            )
+            
+            logger.info(f"Streamed transformation completed - Type: {fields['content_type']}, "
+                        f"Audience: {fields['target_audience']}, Saved: {saved}")
+            
+            body = build_transform_response(fields, transformed_content, justification, processing_time_ms, saved,
+                                            cache_lookups)
+            yield sse_event('metadata', body['metadata'])
+            yield sse_event('done', {'success': True, 'transformed_content': transformed_content})
+            
+        except Exception as e:
+            logger.error(f"Streaming transformation error: {str(e)}")
+            yield sse_event('error', {'success': False, 'error': f'Transformation failed: {str(e)}'})
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    health = {
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'azure_configured': bool(brand_voice.azure_endpoint and brand_voice.azure_key)
-    })
+    }
+    if brand_voice.analytics_writer:
+        health['analytics_queue'] = brand_voice.analytics_writer.metrics()
+    return jsonify(health)
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness check: 503 until Supabase is connected (or given up on) and settings are reconciled"""
+    ready = brand_voice.ready.is_set()
+    body = {'ready': ready, **brand_voice.startup}
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint, aggregated across workers"""
+    rendered = metrics.render()
+    if rendered is None:
+        return jsonify({'success': False, 'error': 'prometheus_client is not installed'}), 503
+    body, content_type = rendered
+    return Response(body, content_type=content_type)
 
 @app.route('/analytics', methods=['GET'])
 def analytics():
@@ -753,19 +2232,23 @@ def analytics():
         days_back = int(request.args.get('days', 7))
         days_back = min(days_back, 90)  # Limit to 90 days max
         
-        stats = brand_voice.get_usage_stats(days_back)
+        result = brand_voice.get_usage_stats(days_back)
         
-        if 'error' in stats:
+        if 'error' in result:
             return jsonify({
                 'success': False,
-                'error': stats['error']
+                'error': result['error']
             }), 500
         
-        return jsonify({
+        # The tag follows the cached result, so an unchanged poll is a 304 without a query
+        etag = hashlib.sha256(f"{days_back}:{result['cached_at']}".encode('utf-8')).hexdigest()[:32]
+        return conditional_json({
             'success': True,
             'period_days': days_back,
-            'stats': stats
-        })
+            'stats': result['stats'],
+            'cached_at': datetime.fromtimestamp(result['cached_at']).isoformat(),
+            'age_seconds': int(time.time() - result['cached_at'])
+        }, etag)
         
     except Exception as e:
         logger.error(f"Analytics error: {str(e)}")
@@ -777,19 +2260,111 @@ def analytics():
 @app.route('/history')
 def history_page():
     """Serve the transformations history page"""
-    return send_from_directory('.', 'history.html')
+    return send_asset('history.html')
+
+# The history list reads slim rows from the preview view (add_history_previews.sql);
+# full records are fetched one at a time from /api/transformations/<id>
+HISTORY_PREVIEW_VIEW = 'beforest_transformation_previews'
+HISTORY_PREVIEW_CHARS = 200
+HISTORY_LIST_COLUMNS = (
+    'id, created_at, content_type, target_audience, original_preview, transformed_preview, '
+    'original_length, transformed_length, length_change_percent, processing_time_ms, api_model_used, user_email'
+)
+HISTORY_DETAIL_COLUMNS = (
+    'id, created_at, content_type, target_audience, original_content, transformed_content, additional_context, '
+    'original_length, transformed_length, length_change_percent, justification, processing_time_ms, api_model_used, user_email'
+)
+
+def select_history(build) -> list:
+    """Run a history list query against the preview view.
+
+    ``build`` adds filters, ordering and limits to a select. Databases
+    without the view are served from the table and truncated here instead.
+    """
+    try:
+        with metrics.stage('history_query'):
+            query = brand_voice.supabase.table(HISTORY_PREVIEW_VIEW).select(HISTORY_LIST_COLUMNS)
+            return build(query).execute().data or []
+    except Exception as e:
+        logger.warning(f"History preview view unavailable, reading full rows: {str(e)}")
+    
+    columns = HISTORY_LIST_COLUMNS.replace('original_preview', 'original_content') \
+        .replace('transformed_preview', 'transformed_content')
+    with metrics.stage('history_query'):
+        rows = build(brand_voice.supabase.table('beforest_transformations').select(columns)).execute().data or []
+    for row in rows:
+        row['original_preview'] = row.pop('original_content', '')[:HISTORY_PREVIEW_CHARS]
+        row['transformed_preview'] = row.pop('transformed_content', '')[:HISTORY_PREVIEW_CHARS]
+    return rows
+
+def encode_cursor(row: Dict[str, Any], direction: str) -> str:
+    """Opaque pagination token for the position of a row"""
+    payload = json.dumps({'c': row['created_at'], 'i': row['id'], 'd': direction}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token: str) -> Dict[str, str]:
+    """Decode a pagination token. Raises ValueError if it is malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(cursor, dict) or cursor.get('d') not in ('next', 'prev') \
+            or not isinstance(cursor.get('c'), str) or not isinstance(cursor.get('i'), str):
+        raise ValueError('Invalid cursor')
+    # Both values end up in a PostgREST filter, so only a real timestamp and id
+    # are accepted, and the filter is built from their normalized forms
+    try:
+        created_at = datetime.fromisoformat(cursor['c']).isoformat()
+        row_id = str(uuid.UUID(cursor['i']))
+    except ValueError:
+        raise ValueError('Invalid cursor')
+    return {'c': created_at, 'i': row_id, 'd': cursor['d']}
+
+def fetch_history_page(cursor: Optional[Dict[str, str]], per_page: int):
+    """Fetch one page in (created_at, id) order, newest first, starting after the cursor.
+
+    Returns (rows, has_next, has_prev).
+    """
+    if cursor is None:
+        rows = select_history(lambda query: query.order('created_at', desc=True).order('id', desc=True)
+                              .limit(per_page + 1))
+        return rows[:per_page], len(rows) > per_page, False
+    
+    created_at, row_id = f'"{cursor["c"]}"', cursor['i']
+    if cursor['d'] == 'next':
+        # Older rows: (created_at, id) < cursor
+        rows = select_history(lambda query: query
+                              .or_(f'created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{row_id})')
+                              .order('created_at', desc=True).order('id', desc=True).limit(per_page + 1))
+        return rows[:per_page], len(rows) > per_page, True
+    
+    # Newer rows: (created_at, id) > cursor, read upwards and flipped back to newest first
+    rows = select_history(lambda query: query
+                          .or_(f'created_at.gt.{created_at},and(created_at.eq.{created_at},id.gt.{row_id})')
+                          .order('created_at').order('id').limit(per_page + 1))
+    return list(reversed(rows[:per_page])), True, len(rows) > per_page
+
+_query_executor = None
+
+def get_query_executor() -> ThreadPoolExecutor:
+    """Get the pool for database queries that run alongside the request's own, created on first use"""
+    global _query_executor
+    if _query_executor is None:
+        _query_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='query')
+    return _query_executor
 
 @app.route('/api/transformations', methods=['GET'])
 def get_transformations():
-    """API endpoint for fetching transformation history with pagination"""
+    """API endpoint for fetching transformation history.
+
+    Pages are addressed by opaque cursors (``cursor``, from ``next_cursor`` or
+    ``prev_cursor``). ``page`` selects offset pagination for older clients.
+    """
     try:
-        # Get pagination parameters
-        page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 6))
         per_page = min(per_page, 50)  # Limit to 50 max per page
-        
-        # Calculate offset
-        offset = (page - 1) * per_page
+        page_mode = 'page' in request.args and 'cursor' not in request.args
         
         if not brand_voice.supabase:
             return jsonify({
@@ -797,38 +2372,52 @@ def get_transformations():
                 'error': 'Database not configured'
             }), 500
         
-        # Get total count
+        # The version moves on every save, so a matching poll is answered without a query
+        version = brand_voice.versions.current('transformations')
+        etag = hashlib.sha256(f'{version}:{request.full_path}'.encode('utf-8')).hexdigest()[:32] \
+            if version is not None else None
+        if etag and request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        
+        if page_mode:
+            return get_transformations_by_page(int(request.args.get('page', 1)), per_page, etag)
+        
+        token = request.args.get('cursor') or None
         try:
-            count_result = brand_voice.supabase.table('beforest_transformations').select('id', count='exact').execute()
-            total_count = count_result.count if hasattr(count_result, 'count') else 0
-        except:
-            total_count = 0
+            cursor = decode_cursor(token) if token else None
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        # Get transformations with pagination
-        result = brand_voice.supabase.table('beforest_transformations').select(
-            'id, created_at, content_type, target_audience, original_content, transformed_content, '
-            'original_length, transformed_length, length_change_percent, justification, processing_time_ms, api_model_used, user_email'
-        ).order('created_at', desc=True).range(offset, offset + per_page - 1).execute()
+        # The count is usually cached; when it is not, run it alongside the page query.
+        # copy_context() keeps the count's span in this request's trace.
+        count_future = get_query_executor().submit(copy_context().run, brand_voice.count_transformations)
         
-        transformations = result.data if result.data else []
+        # Pages are shared by every worker through the cache backend
+        cache_key = f'previews:{token or "first"}:{per_page}'
+        cached = brand_voice.history_cache.get(cache_key, 'history')
         
-        # Calculate pagination info
-        total_pages = (total_count + per_page - 1) // per_page
-        has_next = page < total_pages
-        has_prev = page > 1
+        if cached is None:
+            transformations, has_next, has_prev = fetch_history_page(cursor, per_page)
+            cached = {
+                'transformations': transformations,
+                'has_next': has_next,
+                'has_prev': has_prev
+            }
+            brand_voice.history_cache.set(cache_key, cached)
         
-        return jsonify({
+        transformations = cached['transformations']
+        return conditional_json({
             'success': True,
             'transformations': transformations,
             'pagination': {
-                'page': page,
                 'per_page': per_page,
-                'total_count': total_count,
-                'total_pages': total_pages,
-                'has_next': has_next,
-                'has_prev': has_prev
+                'total_count': count_future.result(),
+                'has_next': cached['has_next'],
+                'has_prev': cached['has_prev'],
+                'next_cursor': encode_cursor(transformations[-1], 'next') if cached['has_next'] and transformations else None,
+                'prev_cursor': encode_cursor(transformations[0], 'prev') if cached['has_prev'] and transformations else None
             }
-        })
+        }, etag)
         
     except Exception as e:
         logger.error(f"Error fetching transformations: {str(e)}")
@@ -837,10 +2426,141 @@ def get_transformations():
             'error': 'Failed to fetch transformation history'
         }), 500
 
+def get_transformations_by_page(page: int, per_page: int, etag: Optional[str] = None):
+    """Offset pagination, kept for clients that still send ``page``"""
+    # Calculate offset
+    offset = (page - 1) * per_page
+    
+    # Get total count alongside the page
+    count_future = get_query_executor().submit(copy_context().run, brand_voice.count_transformations)
+    
+    cache_key = f'previews-offset:{page}:{per_page}'
+    transformations = brand_voice.history_cache.get(cache_key, 'history')
+    
+    if transformations is None:
+        # Get transformations with pagination
+        transformations = select_history(lambda query: query.order('created_at', desc=True).order('id', desc=True)
+                                         .range(offset, offset + per_page - 1))
+        brand_voice.history_cache.set(cache_key, transformations)
+    
+    total_count = count_future.result()
+    
+    # Calculate pagination info
+    total_pages = (total_count + per_page - 1) // per_page
+    has_next = page < total_pages
+    has_prev = page > 1
+    
+    return conditional_json({
+        'success': True,
+        'transformations': transformations,
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total_count': total_count,
+            'total_pages': total_pages,
+            'has_next': has_next,
+            'has_prev': has_prev,
+            'next_cursor': encode_cursor(transformations[-1], 'next') if has_next and transformations else None,
+            'prev_cursor': encode_cursor(transformations[0], 'prev') if has_prev and transformations else None
+        }
+    }, etag)
+
+@app.route('/api/transformations/<transformation_id>', methods=['GET'])
+def get_transformation(transformation_id):
+    """Full record for one transformation, with ETag revalidation"""
+    try:
+        if not brand_voice.supabase:
+            return jsonify({
+                'success': False,
+                'error': 'Database not configured'
+            }), 500
+        
+        try:
+            uuid.UUID(transformation_id)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Transformation not found'}), 404
+        
+        # Saved rows do not change, so the record and its ETag are cached together
+        cached = brand_voice.record_cache.get(transformation_id, 'record')
+        if cached is None:
+            result = brand_voice.supabase.table('beforest_transformations').select(HISTORY_DETAIL_COLUMNS) \
+                .eq('id', transformation_id).limit(1).execute()
+            if not result.data:
+                return jsonify({'success': False, 'error': 'Transformation not found'}), 404
+            
+            record = result.data[0]
+            encoded = json.dumps(record, sort_keys=True, default=str).encode('utf-8')
+            cached = {'transformation': record, 'etag': hashlib.sha256(encoded).hexdigest()[:32]}
+            brand_voice.record_cache.set(transformation_id, cached)
+        
+        response = jsonify({'success': True, 'transformation': cached['transformation']})
+        response.set_etag(cached['etag'])
+        # Revalidate on every use; a match costs a 304 with no body
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        logger.error(f"Error fetching transformation {transformation_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to fetch transformation'
+        }), 500
+
+@app.route('/api/transformations/<transformation_id>/justification', methods=['GET'])
+def get_transformation_justification(transformation_id):
+    """Serve a deferred justification once the background job has finished"""
+    try:
+        job = justification_jobs.get(transformation_id)
+        
+        if job is None:
+            # Not a deferred job on this host; fall back to the saved row
+            if brand_voice.supabase:
+                result = brand_voice.supabase.table('beforest_transformations').select(
+                    'id, justification'
+                ).eq('id', transformation_id).limit(1).execute()
+                if result.data:
+                    return jsonify({
+                        'success': True,
+                        'status': COMPLETE,
+                        'justification': result.data[0].get('justification')
+                    })
+            return jsonify({'success': False, 'error': 'Transformation not found'}), 404
+        
+        if job['status'] == COMPLETE:
+            return jsonify({
+                'success': True,
+                'status': COMPLETE,
+                'justification': job['justification'],
+                'saved_to_analytics': job['saved_to_analytics']
+            })
+        
+        if job['status'] in (PENDING, RUNNING):
+            # The worker that owned this job may have died; pick it up here
+            if justification_jobs.claim_stale(transformation_id, JOB_STALE_SECONDS):
+                logger.warning(f"Re-running stale justification job {transformation_id}")
+                get_justification_executor().submit(run_justification_job, transformation_id)
+            
+            response = jsonify({'success': True, 'status': job['status']})
+            response.headers['Retry-After'] = '1'
+            return response, 202
+        
+        return jsonify({
+            'success': False,
+            'status': job['status'],
+            'error': job['error'] or 'Justification failed'
+        }), 500
+        
+    except Exception as e:
+        logger.error(f"Error fetching justification: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to fetch justification'
+        }), 500
+
 @app.route('/settings')
 def settings_page():
     """Serve the settings page"""
-    return send_from_directory('.', 'settings.html')
+    return send_asset('settings.html')
 
 @app.route('/api/settings', methods=['GET'])
 def get_settings():
@@ -856,9 +2576,10 @@ def get_settings():
         'model': brand_voice.settings.get('model', {})
     }
     
-    return jsonify({
+    return conditional_json({
         'success': True,
-        'settings': safe_settings
+        'settings': safe_settings,
+        'version': brand_voice.settings_version
     })
 
 @app.route('/api/settings/prompts', methods=['POST'])
@@ -877,8 +2598,16 @@ def update_prompts():
         if not prompts.get('main') or not prompts.get('transform'):
             return jsonify({'success': False, 'error': 'Main and transform prompts are required'}), 400
         
-        # Update settings
+        # Reject templates that cannot be rendered before they reach any request
+        try:
+            brand_voice.compile_prompts(dict(brand_voice.settings, prompts=prompts), 0)
+        except TemplateError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        # Update settings; results generated under the old prompts are dropped
         brand_voice.settings['prompts'] = prompts
+        brand_voice.cache.clear()
+        brand_voice.near_duplicates.clear()
         
         # Save to file
         if brand_voice.save_settings():
@@ -918,14 +2647,20 @@ def update_model_settings():
             if effort not in ['low', 'medium', 'high']:
                 return jsonify({'success': False, 'error': 'Reasoning effort must be low, medium, or high'}), 400
         
+        # Validate pipeline
+        if 'pipeline' in model_settings and model_settings['pipeline'] not in PIPELINES:
+            return jsonify({'success': False, 'error': f'Pipeline must be one of: {", ".join(PIPELINES)}'}), 400
+        
         # Validate max tokens
         if 'max_tokens' in model_settings:
             max_tokens = model_settings['max_tokens']
             if max_tokens < 100 or max_tokens > 4000:
                 return jsonify({'success': False, 'error': 'Max tokens must be between 100 and 4000'}), 400
         
-        # Update settings
+        # Update settings; results generated under the old model settings are dropped
         brand_voice.settings['model'].update(model_settings)
+        brand_voice.cache.clear()
+        brand_voice.near_duplicates.clear()
         
         # Save to file
         if brand_voice.save_settings():
@@ -981,8 +2716,14 @@ def api_info():
         'endpoints': {
             '/': 'Main application interface',
             '/transform': 'POST - Transform content',
+            '/transform/stream': 'POST - Transform content as Server-Sent Events (Accept: text/event-stream)',
+            '/transform/batch': 'POST - Transform a list of items (body: {"items": [...]})',
+            '/api/transformations': 'GET - Transformation history (query params: cursor, per_page; page for offset paging)',
+            '/api/transformations/<id>': 'GET - Full transformation record (ETag / If-None-Match)',
+            '/api/transformations/<id>/justification': 'GET - Deferred justification (202 while pending)',
             '/analytics': 'GET - Usage analytics (query param: days=7)',
             '/health': 'GET - Health check',
+            '/metrics': 'GET - Prometheus metrics',
             '/api/info': 'GET - API information'
         },
         'supported_content_types': [
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - ASGI entry point
+Serves POST /transform, /transform/batch and /transform/stream on an asyncio event loop so a
+single process can hold many in-flight Azure OpenAI calls. Every other route
+is delegated to the Flask app through a thread-pool bridge.
+
+Run with:
+    uvicorn asgi:app --port 8080
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+"""
+
+import asyncio
+import json
+import logging
+import time
+from contextvars import copy_context
+from typing import Any, Dict, Optional
+
+import aiohttp
+import openai
+from asgiref.wsgi import WsgiToAsgi
+
+from app import (app as flask_app, brand_voice, validate_transform_request, build_transform_response, sse_event,
+                 submit_justification_job, validate_batch_request, batch_item_result, batch_item_error,
+                 build_batch_response, trace_sink, BATCH_CONCURRENCY)
+from cache import track_lookups
+import metrics
+import tracing
+
+logger = logging.getLogger(__name__)
+
+# Flask handles everything except the async transform path
+wsgi_bridge = WsgiToAsgi(flask_app)
+
+# Shared keep-alive session for Azure OpenAI calls, created on first use
+_upstream_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_upstream_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session used by openai.ChatCompletion.acreate"""
+    global _upstream_session
+    if _upstream_session is None or _upstream_session.closed:
+        connector = aiohttp.TCPConnector(limit=0, keepalive_timeout=30)
+        _upstream_session = aiohttp.ClientSession(connector=connector)
+    return _upstream_session
+
+
+async def read_body(receive) -> bytes:
+    """Read the full request body from the ASGI receive channel"""
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return body
+
+
+async def send_json(send, payload: Dict[str, Any], status: int = 200):
+    """Send a JSON response, ending the request's trace if one is active"""
+    with metrics.stage('serialize'):
+        body = json.dumps(payload).encode('utf-8')
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode('ascii')),
+        (b'access-control-allow-origin', b'*'),
+    ]
+    trace = tracing.current_trace()
+    if trace is not None:
+        headers += [
+            (b'server-timing', trace.server_timing().encode('latin-1')),
+            (b'x-request-id', trace.request_id.encode('latin-1')),
+        ]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+    if trace is not None:
+        tracing.end_trace()
+        if trace_sink is not None:
+            # The write takes a file lock other workers contend for, so it runs in the pool.
+            # The response has already been sent and does not wait for it.
+            await asyncio.get_running_loop().run_in_executor(None, trace_sink.write, trace.record(status))
+
+
+def get_header(scope, name: str) -> str:
+    """Get a request header from the ASGI scope"""
+    key = name.lower().encode('latin-1')
+    for header_name, value in scope.get('headers', []):
+        if header_name == key:
+            return value.decode('latin-1')
+    return ''
+
+
+def get_client_info(scope, data: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Get client information for analytics from the ASGI scope"""
+    client = scope.get('client') or (None, None)
+    return {
+        'user_ip': get_header(scope, 'x-forwarded-for') or client[0],
+        'user_agent': get_header(scope, 'user-agent'),
+        'session_id': get_header(scope, 'x-session-id') or data.get('session_id'),
+        'user_email': (data.get('user_email') or '').strip()
+    }
+
+
+async def read_json_request(scope, receive, send, validate):
+    """Parse a JSON request body and run it through a validator returning (value, error).
+
+    Returns (data, value), or (None, None) after sending an error response.
+    """
+    if 'application/json' not in get_header(scope, 'content-type'):
+        await send_json(send, {'success': False, 'error': 'Request must be JSON'}, 400)
+        return None, None
+
+    try:
+        data = json.loads(await read_body(receive) or b'null')
+    except ValueError:
+        await send_json(send, {'success': False, 'error': 'Request must be JSON'}, 400)
+        return None, None
+
+    # Flask's before_request hook does not run for the native endpoints. Checking
+    # for a change is one stat(); the reload reads and parses the file, so it
+    # runs in the executor.
+    if brand_voice.settings_file.changed():
+        await asyncio.get_running_loop().run_in_executor(None, brand_voice.refresh_settings)
+    value, error = validate(data)
+    if error:
+        await send_json(send, {'success': False, 'error': error}, 400)
+        return None, None
+
+    # Check if Azure OpenAI is configured
+    if not brand_voice.azure_endpoint or not brand_voice.azure_key:
+        await send_json(send, {
+            'success': False,
+            'error': 'Azure OpenAI is not configured. Please check your environment variables.'
+        }, 500)
+        return None, None
+
+    # openai reads the session from a context variable, so set it per request
+    openai.aiosession.set(get_upstream_session())
+    return data, value
+
+
+async def read_transform_request(scope, receive, send):
+    """Parse and validate a transform request body.
+
+    Returns (data, fields), or (None, None) after sending an error response.
+    """
+    return await read_json_request(scope, receive, send, validate_transform_request)
+
+
+async def transform_endpoint(scope, receive, send):
+    """Async counterpart of the Flask /transform view"""
+    tracing.start_trace(scope['path'], get_header(scope, 'x-request-id'))
+    try:
+        data, fields = await read_transform_request(scope, receive, send)
+        if fields is None:
+            return
+
+        start_time = time.time()
+        cache_lookups = track_lookups()
+        use_cache = not data.get('no_cache')
+
+        # Deferred mode: transform now, hand the justification to the background pool.
+        # The exact cache is checked first and the near-duplicate index only on a
+        # miss; a complete result from either has its justification, so nothing is deferred.
+        deferred = data.get('defer_justification')
+        cached = await brand_voice.acached_pair(**fields) if deferred and use_cache else None
+        complete = cached if cached and cached[1] is not None else None
+        if deferred and use_cache and not cached:
+            complete = await brand_voice.anear_duplicate_pair(**fields)
+        if deferred and not complete:
+            # The cache was already consulted above
+            transformed_content = cached[0] if cached else await brand_voice.atransform_content(
+                **fields, use_cache=False
+            )
+            processing_time_ms = int((time.time() - start_time) * 1000)
+            # The job table is SQLite and the pool may need starting, so stay off the event loop
+            client_info = get_client_info(scope, data)
+            loop = asyncio.get_running_loop()
+            job_id = await loop.run_in_executor(None, copy_context().run, lambda: submit_justification_job(
+                fields, transformed_content, processing_time_ms, client_info
+            ))
+            body = build_transform_response(fields, transformed_content, None, processing_time_ms, None,
+                                            cache_lookups)
+            body['transformation_id'] = job_id
+            body['justification_job_id'] = job_id
+            body['justification_url'] = f'/api/transformations/{job_id}/justification'
+            await send_json(send, body, 202)
+            return
+
+        transformed_content, justification = complete or await brand_voice.atransform_with_justification(
+            **fields, use_cache=use_cache
+        )
+
+        processing_time_ms = int((time.time() - start_time) * 1000)
+
+        # The Supabase client is blocking, so keep it off the event loop.
+        # copy_context() keeps the save span in this request's trace.
+        client_info = get_client_info(scope, data)
+        loop = asyncio.get_running_loop()
+        saved = await loop.run_in_executor(None, copy_context().run, lambda: brand_voice.save_transformation(
+            justification=justification,
+            transformed_content=transformed_content,
+            processing_time_ms=processing_time_ms,
+            **fields,
+            **client_info
+        ))
+
+        logger.info(f"Transformation completed - Type: {fields['content_type']}, "
+                    f"Audience: {fields['target_audience']}, Saved: {saved}")
+
+        await send_json(send, build_transform_response(
+            fields, transformed_content, justification, processing_time_ms, saved, cache_lookups
+        ))
+
+    except Exception as e:
+        logger.error(f"Transformation error: {str(e)}")
+        await send_json(send, {
+            'success': False,
+            'error': f'Transformation failed: {str(e)}'
+        }, 500)
+
+
+async def transform_batch_endpoint(scope, receive, send):
+    """Async counterpart of the Flask /transform/batch view"""
+    try:
+        data, items = await read_json_request(scope, receive, send, validate_batch_request)
+        if items is None:
+            return
+
+        start_time = time.time()
+        use_cache = not data.get('no_cache')
+        client_info = get_client_info(scope, data)
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        async def run_item(index: int, item: Any):
+            fields, error = validate_transform_request(item)
+            if error:
+                return batch_item_error(index, error), None
+            async with semaphore:
+                try:
+                    # Each item runs in its own task, so lookups are tracked per item
+                    item_start = time.time()
+                    cache_lookups = track_lookups()
+                    transformed_content, justification = await brand_voice.atransform_with_justification(
+                        **fields, use_cache=use_cache and not item.get('no_cache')
+                    )
+                    processing_time_ms = int((time.time() - item_start) * 1000)
+                    return batch_item_result(index, fields, transformed_content, justification,
+                                             processing_time_ms, cache_lookups, client_info)
+                except Exception as e:
+                    logger.error(f"Batch item {index} failed: {str(e)}")
+                    return batch_item_error(index, f'Transformation failed: {str(e)}'), None
+
+        outcomes = await asyncio.gather(*(run_item(index, item) for index, item in enumerate(items)))
+
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(None, lambda: build_batch_response(
+            [result for result, _ in outcomes],
+            [row for _, row in outcomes if row is not None],
+            start_time
+        ))
+
+        logger.info(f"Batch completed - Items: {body['metadata']['total']}, "
+                    f"Failed: {body['metadata']['failed']}, Saved: {body['metadata']['saved_to_analytics']}")
+
+        await send_json(send, body)
+
+    except Exception as e:
+        logger.error(f"Batch transformation error: {str(e)}")
+        await send_json(send, {
+            'success': False,
+            'error': f'Batch transformation failed: {str(e)}'
+        }, 500)
+
+
+async def transform_stream_endpoint(scope, receive, send):
+    """Async counterpart of the Flask /transform/stream view"""
+    if 'text/event-stream' not in get_header(scope, 'accept'):
+        await transform_endpoint(scope, receive, send)
+        return
+
+    data, fields = await read_transform_request(scope, receive, send)
+    if fields is None:
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+            (b'access-control-allow-origin', b'*'),
+        ]
+    })
+
+    async def emit(event: str, payload: Any):
+        await send({'type': 'http.response.body', 'body': sse_event(event, payload).encode('utf-8'), 'more_body': True})
+
+    start_time = time.time()
+    cache_lookups = track_lookups()
+    use_cache = not data.get('no_cache')
+    chunks = []
+    try:
+        async for delta in brand_voice.astream_transform_content(**fields, use_cache=use_cache):
+            chunks.append(delta)
+            await emit('token', {'content': delta})
+
+        transformed_content = ''.join(chunks).strip()
+
+        justification = await brand_voice.agenerate_justification(
+            original_content=fields['original_content'],
+            transformed_content=transformed_content,
+            content_type=fields['content_type'],
+            target_audience=fields['target_audience'],
+            use_cache=use_cache
+        )
+        await emit('justification', justification)
+
+        processing_time_ms = int((time.time() - start_time) * 1000)
+
+        client_info = get_client_info(scope, data)
+        loop = asyncio.get_running_loop()
+        # The copied context carries the request's trace into the save
+        saved = await loop.run_in_executor(None, copy_context().run, lambda: brand_voice.save_transformation(
+            justification=justification,
+            transformed_content=transformed_content,
+            processing_time_ms=processing_time_ms,
+            **fields,
+            **client_info
+        ))
+
+        body = build_transform_response(fields, transformed_content, justification, processing_time_ms, saved,
+                                        cache_lookups)
+        await emit('metadata', body['metadata'])
+        await emit('done', {'success': True, 'transformed_content': transformed_content})
+
+    except Exception as e:
+        logger.error(f"Streaming transformation error: {str(e)}")
+        await emit('error', {'success': False, 'error': f'Transformation failed: {str(e)}'})
+
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def lifespan(receive, send):
+    """Handle ASGI lifespan events"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _upstream_session is not None and not _upstream_session.closed:
+                await _upstream_session.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+
+    if scope['type'] == 'http' and scope['method'] == 'POST':
+        if scope['path'] == '/transform':
+            await transform_endpoint(scope, receive, send)
+            return
+        if scope['path'] == '/transform/batch':
+            await transform_batch_endpoint(scope, receive, send)
+            return
+        if scope['path'] == '/transform/stream':
+            await transform_stream_endpoint(scope, receive, send)
+            return
+
+    await wsgi_bridge(scope, receive, send)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - Static asset pipeline
+Fingerprints the front-end assets with content hashes, rewrites the references
+in the HTML pages and stylesheet to the fingerprinted names, and precompresses
+text assets with gzip (and brotli when the package is installed). Everything is
+held in an in-memory table, so serving an asset is a dict lookup with no disk
+access or compression on the request path.
+
+Run it directly to write the same files to a directory for a CDN or a reverse
+proxy that serves precompressed files (nginx gzip_static / brotli_static):
+
+    python assets.py build/static
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Leaves first: a file's hash covers the fingerprinted names it references
+ASSET_FILES = [
+    'logo.png',
+    'fonts/ABCArizonaFlare-Regular-Trial.woff2',
+    'fonts/ABCArizonaFlare-Regular-Trial.woff',
+    'fonts/ABCArizonaFlare-Light-Trial.woff2',
+    'fonts/ABCArizonaFlare-Light-Trial.woff',
+    'fonts/ABCArizonaSans-Regular-Trial.woff2',
+    'fonts/ABCArizonaSans-Regular-Trial.woff',
+    'styles.css',
+    'script.js',
+    'history.js',
+    'settings.js'
+]
+PAGE_FILES = ['index.html', 'history.html', 'settings.html']
+
+TEXT_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+# Compressing tiny files costs more in headers than it saves
+MIN_COMPRESS_BYTES = 512
+
+# Codings this process can produce, best first
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+mimetypes.add_type('font/woff2', '.woff2')
+mimetypes.add_type('font/woff', '.woff')
+mimetypes.add_type('application/javascript', '.js')
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Content codings an Accept-Encoding header allows (q > 0)"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.partition(';')
+        quality = params.strip()[2:] if params.strip().startswith('q=') else '1'
+        try:
+            if float(quality) > 0:
+                accepted.add(name.strip().lower())
+        except ValueError:
+            pass
+    return accepted
+
+
+def compress(body: bytes, encoding: str, level: int = 9) -> bytes:
+    """Compress with gzip or br. level is gzip's 1-9, scaled to brotli's 0-11."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=round(level * 11 / 9))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def fingerprint(path: str, digest: str) -> str:
+    """styles.css -> styles.3f2a9c1b7e.css"""
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.{digest}{ext}'
+
+
+class Asset:
+    """One file, with every encoding it can be served in"""
+
+    def __init__(self, body: bytes, content_type: str):
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.encodings = {'identity': body}
+        if content_type.startswith(TEXT_TYPES) and len(body) >= MIN_COMPRESS_BYTES:
+            self.encodings['gzip'] = compress(body, 'gzip')
+            if brotli is not None:
+                self.encodings['br'] = compress(body, 'br')
+
+    def etag(self, encoding: str) -> str:
+        # Each encoding is a different representation and needs its own strong ETag
+        return self.digest[:16] if encoding == 'identity' else f'{self.digest[:16]}-{encoding}'
+
+    def select(self, accept_encoding: str):
+        """Pick the smallest encoding the client accepts. Returns (encoding, body)."""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in self.encodings and encoding in accepted:
+                return encoding, self.encodings[encoding]
+        return 'identity', self.encodings['identity']
+
+
+class AssetTable:
+    """In-memory table of fingerprinted assets and the pages that reference them"""
+
+    def __init__(self, root: str):
+        self.root = root
+        # Both the plain and the fingerprinted name map to the same Asset
+        self.assets: Dict[str, Asset] = {}
+        # Logical name -> fingerprinted name, e.g. styles.css -> styles.3f2a9c1b7e.css
+        self.manifest: Dict[str, str] = {}
+        self.fingerprinted = set()
+
+    def build(self) -> 'AssetTable':
+        for path in ASSET_FILES:
+            body = self._rewrite(path, self._read(path))
+            if body is None:
+                continue
+            asset = Asset(body, self._content_type(path))
+            hashed = fingerprint(path, asset.digest[:10])
+            self.manifest[path] = hashed
+            self.fingerprinted.add(hashed)
+            # Pages cached before a deploy still ask for the plain name
+            self.assets[path] = self.assets[hashed] = asset
+
+        for path in PAGE_FILES:
+            body = self._rewrite(path, self._read(path))
+            if body is not None:
+                self.assets[path] = Asset(body, 'text/html; charset=utf-8')
+        return self
+
+    def get(self, path: str) -> Optional[Asset]:
+        return self.assets.get(path.lstrip('/'))
+
+    def cache_control(self, path: str) -> str:
+        """Fingerprinted names never change content; everything else is revalidated"""
+        return IMMUTABLE if path.lstrip('/') in self.fingerprinted else REVALIDATE
+
+    def size(self) -> int:
+        unique = {id(asset): asset for asset in self.assets.values()}.values()
+        return sum(len(body) for asset in unique for body in asset.encodings.values())
+
+    def write(self, output_dir: str):
+        """Write fingerprinted files, their .gz/.br twins and manifest.json"""
+        for path, asset in self.assets.items():
+            target = os.path.join(output_dir, path)
+            os.makedirs(os.path.dirname(target) or output_dir, exist_ok=True)
+            suffixes = {'identity': '', 'gzip': '.gz', 'br': '.br'}
+            for encoding, body in asset.encodings.items():
+                with open(target + suffixes[encoding], 'wb') as f:
+                    f.write(body)
+        with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.root, path), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _rewrite(self, path: str, body: Optional[bytes]) -> Optional[bytes]:
+        if body is None or not self._content_type(path).startswith(TEXT_TYPES):
+            return body
+        text = body.decode('utf-8')
+        for name, hashed in self.manifest.items():
+            # Only quoted or url() references, optionally written as ./name
+            pattern = r'(?<=["\'(])(\./)?' + re.escape(name) + r'(?=["\')])'
+            text = re.sub(pattern, lambda match: (match.group(1) or '') + hashed, text)
+        return text.encode('utf-8')
+
+    @staticmethod
+    def _content_type(path: str) -> str:
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+        return content_type
+
+
+def build_assets(root: str) -> AssetTable:
+    return AssetTable(root).build()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    table = build_assets(os.path.dirname(os.path.abspath(__file__)))
+    table.write(sys.argv[1])
+    print(json.dumps(table.manifest, indent=2, sort_keys=True))
+    print(f"{len(table.assets)} assets, {table.size()} bytes including compressed copies"
+          f"{'' if brotli else ' (install brotli for .br files)'}")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Throughput comparison: sync vs async transform pipeline.
+
+Both modes run transform_content + generate_justification against the local
+mock upstream. The sync mode uses a thread pool sized like the gunicorn sync
+workers (one blocking request per slot). The async mode runs every request on
+a single event loop, which is what asgi.py does per process.
+
+    python benchmarks/bench_async_transform.py --requests 200 --latency-ms 800
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_upstream import start_in_thread
+
+SAMPLE = {
+    'original_content': 'Our AMAZING new collective is the best place ever to reconnect with nature!!!',
+    'content_type': 'email',
+    'target_audience': 'prospects',
+    'additional_context': ''
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(mode, latencies, elapsed):
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 1)
+    }
+
+
+def run_sync(brand_voice, total, workers):
+    def one():
+        start = time.perf_counter()
+        transformed = brand_voice.transform_content(**SAMPLE)
+        brand_voice.generate_justification(SAMPLE['original_content'], transformed,
+                                           SAMPLE['content_type'], SAMPLE['target_audience'])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(lambda _: one(), range(total)))
+    return summarize(f'sync ({workers} worker slots)', latencies, time.perf_counter() - start)
+
+
+async def run_async(brand_voice, total, concurrency):
+    import asgi
+    import openai
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            openai.aiosession.set(asgi.get_upstream_session())
+            start = time.perf_counter()
+            transformed = await brand_voice.atransform_content(**SAMPLE)
+            await brand_voice.agenerate_justification(SAMPLE['original_content'], transformed,
+                                                      SAMPLE['content_type'], SAMPLE['target_audience'])
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    await asgi.get_upstream_session().close()
+    return summarize(f'async (1 process, concurrency {concurrency})', latencies, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=800)
+    parser.add_argument('--sync-workers', type=int, default=4)
+    parser.add_argument('--async-concurrency', type=int, default=200)
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args()
+
+    start_in_thread(args.port, latency_ms=args.latency_ms)
+
+    # Point the engine at the mock before app.py configures openai
+    os.environ['AZURE_OPENAI_ENDPOINT'] = f'http://127.0.0.1:{args.port}'
+    os.environ['AZURE_OPENAI_KEY'] = 'mock-key'
+    os.environ.pop('SUPABASE_URL', None)
+    # Every request sends the same SAMPLE; with the result cache on, all but the first would be hits
+    os.environ['CACHE_MAX_ENTRIES'] = '0'
+    from app import brand_voice
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {
+        'upstream_latency_ms': args.latency_ms,
+        'runs': [
+            run_sync(brand_voice, args.requests, args.sync_workers),
+            asyncio.run(run_async(brand_voice, args.requests, args.async_concurrency))
+        ]
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: /transform, /api/transformations and /analytics under gunicorn.
+
+For each server configuration the benchmark starts the mock Azure OpenAI and
+Supabase servers, boots gunicorn with the app pointed at them, and sends a
+fixed request rate for --duration seconds. The load is open loop: requests
+go out on schedule whether or not earlier ones have finished, and latency is
+measured from the scheduled send time, so a saturated server shows up as
+queueing latency instead of quietly lowering the request rate.
+
+Configurations are worker_class:workers, with xthreads for gthread:
+
+    python benchmarks/bench_load.py --configs sync:4 gthread:4x8 uvicorn:4 --rps 20 --duration 30 \\
+        --upstream-latency-ms 800 --upstream-dist lognormal --output results/load.json
+
+Results are JSON: one run per configuration, with throughput, p50/p95/p99
+latency and error rate for each endpoint and overall.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from datetime import datetime
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.join(ROOT, 'benchmarks')
+
+# Any key works against the mocks; this one is shaped like a Supabase JWT
+MOCK_SUPABASE_KEY = 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.mock'
+
+WORKER_CLASSES = {
+    'sync': ['-k', 'sync', 'app:app'],
+    'gthread': ['-k', 'gthread', 'app:app'],
+    'gevent': ['-k', 'gevent', 'app:app'],
+    'uvicorn': ['-k', 'uvicorn.workers.UvicornWorker', 'asgi:app']
+}
+
+DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+CONTENT_TYPES = ['email', 'social-media', 'whatsapp', 'proposal', 'blog-post']
+AUDIENCES = ['existing-clients', 'prospects', 'partners', 'general-public']
+
+
+def parse_config(spec: str) -> dict:
+    """sync:4 -> {worker_class: sync, workers: 4, threads: 1}; gthread:4x8 adds 8 threads"""
+    worker_class, _, size = spec.partition(':')
+    if worker_class not in WORKER_CLASSES:
+        raise argparse.ArgumentTypeError(f'Unknown worker class {worker_class!r} in {spec!r}')
+    workers, _, threads = (size or '4').partition('x')
+    return {'config': spec, 'worker_class': worker_class, 'workers': int(workers), 'threads': int(threads or 1)}
+
+
+def parse_mix(items) -> dict:
+    """transform=2 history=6 analytics=2 -> relative weights"""
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition('=')
+        if name not in ('transform', 'history', 'analytics'):
+            raise argparse.ArgumentTypeError(f'Unknown endpoint {name!r} in --mix')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples, elapsed):
+    """samples are (latency_s, status) pairs; status 0 means the request never got a response"""
+    ok = [latency for latency, status in samples if 200 <= status < 400]
+    errors = len(samples) - len(ok)
+    summary = {
+        'requests': len(samples),
+        'ok': len(ok),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'throughput_rps': round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        'status_counts': dict(Counter(str(status) for _, status in samples))
+    }
+    if ok:
+        summary.update({
+            'p50_ms': round(percentile(ok, 50) * 1000, 1),
+            'p95_ms': round(percentile(ok, 95) * 1000, 1),
+            'p99_ms': round(percentile(ok, 99) * 1000, 1),
+            'mean_ms': round(sum(ok) / len(ok) * 1000, 1),
+            'max_ms': round(max(ok) * 1000, 1)
+        })
+    return summary
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def wait_for_ready(base_url: str, timeout: float) -> bool:
+    """Wait until a worker passes /ready, not just until the master has bound the port"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/ready', timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def log_tail(path: str, lines: int = 20) -> str:
+    try:
+        with open(path, 'rb') as f:
+            return b''.join(f.readlines()[-lines:]).decode('utf-8', 'replace')
+    except OSError:
+        return ''
+
+
+def fault_args(latency_ms, dist, spread, error_rate, seed):
+    return ['--latency-ms', str(latency_ms), '--latency-dist', dist, '--spread', str(spread),
+            '--error-rate', str(error_rate), '--seed', str(seed)]
+
+
+def start_process(cmd, log_path, env=None, cwd=ROOT):
+    with open(log_path, 'wb') as log:
+        # Own process group, so gunicorn's workers are stopped with it
+        return subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=env, cwd=cwd, start_new_session=True)
+
+
+def stop_process(process):
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+class Workload:
+    """Deterministic sequence of requests drawn from the endpoint mix"""
+
+    def __init__(self, mix: dict, repeat_ratio: float, seed: int):
+        self.random = random.Random(seed)
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.repeat_ratio = repeat_ratio
+        self.counter = 0
+
+    def next(self):
+        """Returns (endpoint name, method, path, json body or None)"""
+        name = self.random.choices(self.names, self.weights)[0]
+        if name == 'history':
+            return name, 'GET', '/api/transformations?per_page=6', None
+        if name == 'analytics':
+            return name, 'GET', '/analytics?days=7', None
+        self.counter += 1
+        # Repeats hit the result cache; the rest are new content
+        variant = self.random.randrange(5) if self.random.random() < self.repeat_ratio else f'unique {self.counter}'
+        return name, 'POST', '/transform', {
+            'original_content': f'Our AMAZING new collective ({variant}) is the best place ever to reconnect with nature!!!',
+            'content_type': self.random.choice(CONTENT_TYPES),
+            'target_audience': self.random.choice(AUDIENCES)
+        }
+
+
+async def drive(base_url, workload, rps, duration, timeout):
+    """Send rps requests per second for duration seconds. Returns ({endpoint: samples}, elapsed)."""
+    samples = {name: [] for name in workload.names}
+    connector = aiohttp.TCPConnector(limit=0)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+
+        async def one(scheduled, name, method, path, body):
+            try:
+                async with session.request(method, base_url + path, json=body) as response:
+                    await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                status = 0
+            samples[name].append((time.perf_counter() - scheduled, status))
+
+        loop_start = time.perf_counter()
+        tasks = []
+        for index in range(int(rps * duration)):
+            scheduled = loop_start + index / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(scheduled, *workload.next())))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - loop_start
+    return samples, elapsed
+
+
+def run_config(config, args, workdir):
+    """Boot the mocks and gunicorn for one configuration and measure it"""
+    upstream_port, database_port, app_port = free_port(), free_port(), free_port()
+    state_dir = os.path.join(workdir, config['config'].replace(':', '-'))
+    os.makedirs(os.path.join(state_dir, 'prometheus'), exist_ok=True)
+
+    processes = [
+        start_process([sys.executable, os.path.join(BENCHMARKS, 'mock_upstream.py'), '--port', str(upstream_port)]
+                      + fault_args(args.upstream_latency_ms, args.upstream_dist, args.upstream_spread,
+                                   args.upstream_error_rate, args.seed),
+                      os.path.join(state_dir, 'mock_upstream.log'), cwd=BENCHMARKS),
+        start_process([sys.executable, os.path.join(BENCHMARKS, 'mock_supabase.py'), '--port', str(database_port),
+                       '--seed-rows', str(args.seed_rows)]
+                      + fault_args(args.db_latency_ms, args.db_dist, args.db_spread, args.db_error_rate, args.seed),
+                      os.path.join(state_dir, 'mock_supabase.log'), cwd=BENCHMARKS)
+    ]
+    try:
+        if not (wait_for_port(upstream_port, 15) and wait_for_port(database_port, 15)):
+            return dict(config, error='mock servers did not start')
+
+        env = dict(os.environ,
+                   AZURE_OPENAI_ENDPOINT=f'http://127.0.0.1:{upstream_port}',
+                   AZURE_OPENAI_KEY='mock-key',
+                   SUPABASE_URL=f'http://127.0.0.1:{database_port}',
+                   SUPABASE_SERVICE_KEY=MOCK_SUPABASE_KEY,
+                   STATE_DIR=state_dir,
+                   PROMETHEUS_MULTIPROC_DIR=os.path.join(state_dir, 'prometheus'))
+        cmd = [sys.executable, '-m', 'gunicorn', '-w', str(config['workers']), '-b', f'127.0.0.1:{app_port}',
+               '--timeout', '120', '--log-level', 'warning']
+        if config['worker_class'] == 'gthread':
+            cmd += ['--threads', str(config['threads'])]
+        cmd += WORKER_CLASSES[config['worker_class']]
+        server_log = os.path.join(state_dir, 'gunicorn.log')
+        server = start_process(cmd, server_log, env=env)
+        processes.append(server)
+        base_url = f'http://127.0.0.1:{app_port}'
+        if not wait_for_ready(base_url, 60) or server.poll() is not None:
+            return dict(config, error='gunicorn did not start', log=log_tail(server_log))
+
+        if args.warmup:
+            asyncio.run(drive(base_url, Workload(args.mix, args.repeat_ratio, args.seed + 1), args.rps, args.warmup,
+                              args.timeout))
+        samples, elapsed = asyncio.run(drive(base_url, Workload(args.mix, args.repeat_ratio, args.seed), args.rps,
+                                             args.duration, args.timeout))
+        every = [sample for endpoint_samples in samples.values() for sample in endpoint_samples]
+        return dict(config,
+                    elapsed_s=round(elapsed, 3),
+                    endpoints={name: summarize(endpoint_samples, elapsed)
+                               for name, endpoint_samples in samples.items()},
+                    overall=summarize(every, elapsed))
+    finally:
+        for process in reversed(processes):
+            stop_process(process)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', type=parse_config, nargs='+',
+                        default=[parse_config(spec) for spec in ('sync:4', 'gthread:4x8', 'uvicorn:4')])
+    parser.add_argument('--rps', type=float, default=10, help='Requests per second across all endpoints')
+    parser.add_argument('--duration', type=float, default=30, help='Measured seconds per configuration')
+    parser.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds of load before measuring')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout')
+    parser.add_argument('--mix', nargs='+', default=['transform=2', 'history=6', 'analytics=2'],
+                        help='Relative weights of transform, history and analytics requests')
+    parser.add_argument('--repeat-ratio', type=float, default=0.0,
+                        help='Fraction of transforms that repeat earlier content (cache hits)')
+    parser.add_argument('--upstream-latency-ms', type=float, default=800)
+    parser.add_argument('--upstream-dist', choices=DISTRIBUTIONS, default='lognormal')
+    parser.add_argument('--upstream-spread', type=float, default=0.4)
+    parser.add_argument('--upstream-error-rate', type=float, default=0.0)
+    parser.add_argument('--db-latency-ms', type=float, default=15)
+    parser.add_argument('--db-dist', choices=DISTRIBUTIONS, default='lognormal')
+    parser.add_argument('--db-spread', type=float, default=0.5)
+    parser.add_argument('--db-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed-rows', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args()
+    args.mix = parse_mix(args.mix)
+
+    workdir = tempfile.mkdtemp(prefix='beforest-load-')
+    runs = []
+    try:
+        for config in args.configs:
+            print(f"Running {config['config']} at {args.rps} req/s for {args.duration}s", file=sys.stderr)
+            runs.append(run_config(config, args, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    parameters = {key: value for key, value in vars(args).items() if key not in ('configs', 'output')}
+    results = {
+        'benchmark': 'load',
+        'generated_at': datetime.now().isoformat(),
+        'git_commit': git_commit(),
+        'host': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'parameters': parameters,
+        'runs': runs
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
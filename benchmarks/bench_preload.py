@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Worker memory with and without gunicorn --preload.
+
+Boots gunicorn through gunicorn.conf.py against the local Azure OpenAI and
+Supabase stand-ins, once with GUNICORN_PRELOAD=true and once with false.
+Sends some warm-up traffic so each worker has served transforms, history
+and analytics, then reads /proc/<pid>/smaps_rollup for the master and every
+worker. Linux only.
+
+- rss_kb: resident memory, counting shared pages in full in every process
+- pss_kb: shared pages divided between the processes that share them
+- uss_kb: pages only this process has, i.e. what killing it would free
+
+    python benchmarks/bench_preload.py --workers 4 --requests 200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_load import MOCK_SUPABASE_KEY, free_port, log_tail, start_process, stop_process, wait_for_ready
+from mock_supabase import start_in_thread as start_supabase
+from mock_upstream import start_in_thread as start_upstream
+
+SAMPLE = {
+    'original_content': 'Our AMAZING new collective is the best place ever to reconnect with nature!!!',
+    'content_type': 'email',
+    'target_audience': 'prospects'
+}
+
+
+def memory(pid: int) -> dict:
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_kb': fields['Rss'],
+        'pss_kb': fields['Pss'],
+        'uss_kb': fields['Private_Clean'] + fields['Private_Dirty']
+    }
+
+
+def children(pid: int) -> list:
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def request(url: str, body: dict = None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    headers = {'Content-Type': 'application/json'} if data else {}
+    with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers), timeout=30) as response:
+        response.read()
+
+
+def run(preload: bool, args, upstream_port: int, database_port: int) -> dict:
+    state_dir = tempfile.mkdtemp(prefix='preload-bench-')
+    app_port = free_port()
+    env = dict(os.environ,
+               PORT=str(app_port),
+               GUNICORN_PRELOAD='true' if preload else 'false',
+               GUNICORN_WORKERS=str(args.workers),
+               GUNICORN_LOG_LEVEL='warning',
+               AZURE_OPENAI_ENDPOINT=f'http://127.0.0.1:{upstream_port}',
+               AZURE_OPENAI_KEY='mock-key',
+               SUPABASE_URL=f'http://127.0.0.1:{database_port}',
+               SUPABASE_SERVICE_KEY=MOCK_SUPABASE_KEY,
+               STATE_DIR=state_dir,
+               PROMETHEUS_MULTIPROC_DIR=os.path.join(state_dir, 'prometheus'))
+    # gunicorn's own worker class flags are left to gunicorn.conf.py
+    server_log = os.path.join(state_dir, 'gunicorn.log')
+    server = start_process([sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'], server_log, env=env)
+    try:
+        base_url = f'http://127.0.0.1:{app_port}'
+        if not wait_for_ready(base_url, 60) or server.poll() is not None:
+            return {'preload': preload, 'error': 'gunicorn did not start', 'log': log_tail(server_log)}
+        for index in range(args.requests):
+            request(f'{base_url}/transform', dict(SAMPLE, original_content=f"{SAMPLE['original_content']} #{index}"))
+            request(f'{base_url}/api/transformations?per_page=20')
+            request(f'{base_url}/analytics')
+        time.sleep(1)
+
+        workers = [memory(pid) for pid in children(server.pid)]
+        return {
+            'preload': preload,
+            'master': memory(server.pid),
+            'workers': len(workers),
+            'per_worker': {key: round(statistics.mean(worker[key] for worker in workers))
+                           for key in ('rss_kb', 'pss_kb', 'uss_kb')},
+            'total_pss_kb': memory(server.pid)['pss_kb'] + sum(worker['pss_kb'] for worker in workers)
+        }
+    finally:
+        stop_process(server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=100, help='Warm-up rounds of transform, history and analytics')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args()
+
+    upstream_port, database_port = free_port(), free_port()
+    start_upstream(upstream_port, latency_ms=5)
+    start_supabase(database_port, latency_ms=2, seed_rows=500)
+
+    runs = [run(preload, args, upstream_port, database_port) for preload in (False, True)]
+    results = {'workers': args.workers, 'requests': args.requests, 'runs': runs}
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
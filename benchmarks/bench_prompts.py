@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Per-request prompt cost: formatting templates and hashing settings on every
+request vs. templates compiled once per settings version.
+
+The legacy path is the code the app ran before prompts.py: str.format on the
+stored template, a fresh parameter dict, and a cache key that serialized the
+full prompts and model settings. The compiled path is what
+build_transform_params, build_justification_params and the cache key methods
+do now. No network calls are made.
+
+    python benchmarks/bench_prompts.py --iterations 20000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import normalize_content
+
+SAMPLE = {
+    'original_content': 'Our AMAZING new collective is the best place ever to reconnect with nature!!! ' * 8,
+    'content_type': 'email',
+    'target_audience': 'prospects',
+    'additional_context': 'Launch announcement for the monsoon season'
+}
+TRANSFORMED = 'Beforest collectives restore land using proven, measured practices. ' * 10
+
+
+def legacy_key(kind, settings, **fields):
+    """make_cache_key as it was: the whole prompts and model settings hashed per request"""
+    material = {
+        'kind': kind,
+        'fields': {name: normalize_content(value) for name, value in fields.items()},
+        'prompts': settings.get('prompts', {}),
+        'model': settings.get('model', {})
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return f"{kind}:{hashlib.sha256(encoded).hexdigest()}"
+
+
+def legacy_request(brand_voice):
+    settings = brand_voice.settings
+    model_settings = settings.get('model', {})
+    deployment = model_settings.get('deployment', brand_voice.deployment_name)
+
+    legacy_key('transform', settings, **SAMPLE)
+    transform = {
+        'engine': deployment,
+        'messages': [
+            {'role': 'system', 'content': settings['prompts'].get('main', brand_voice.brand_voice_prompt)},
+            {'role': 'user', 'content': settings['prompts']['transform'].format(**SAMPLE)}
+        ],
+        'max_completion_tokens': model_settings.get('max_tokens', 2000)
+    }
+    transform.update(brand_voice._model_params(deployment, model_settings))
+
+    fields = dict(original_content=SAMPLE['original_content'], transformed_content=TRANSFORMED,
+                  content_type=SAMPLE['content_type'], target_audience=SAMPLE['target_audience'])
+    legacy_key('justification', settings, **fields)
+    justification = {
+        'engine': deployment,
+        'messages': [
+            {'role': 'system', 'content': 'analyst'},
+            {'role': 'user', 'content': settings['prompts']['justification'].format(**fields)}
+        ],
+        'max_completion_tokens': 800
+    }
+    justification.update(brand_voice._model_params(deployment, model_settings, justification=True))
+    return transform, justification
+
+
+def compiled_request(brand_voice):
+    brand_voice.transform_cache_key(**SAMPLE)
+    transform = brand_voice.build_transform_params(**SAMPLE)
+    fields = dict(original_content=SAMPLE['original_content'], transformed_content=TRANSFORMED,
+                  content_type=SAMPLE['content_type'], target_audience=SAMPLE['target_audience'])
+    brand_voice.justification_cache_key(**fields)
+    justification = brand_voice.build_justification_params(**fields)
+    return transform, justification
+
+
+def measure(function, brand_voice, iterations):
+    for _ in range(min(iterations, 500)):
+        function(brand_voice)
+    samples = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            function(brand_voice)
+        samples.append((time.perf_counter() - start) / iterations * 1e6)
+    return {'median_us': round(statistics.median(samples), 2), 'min_us': round(min(samples), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000, help='Requests per timed round (5 rounds)')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args()
+
+    # The app writes settings.json to the working directory; keep it out of the tree
+    os.chdir(tempfile.mkdtemp(prefix='prompt-bench-'))
+    os.environ.pop('SUPABASE_URL', None)
+    from app import brand_voice
+
+    # Both paths must send the same messages
+    legacy, compiled = legacy_request(brand_voice), compiled_request(brand_voice)
+    assert legacy[0]['messages'][1] == compiled[0]['messages'][1]
+    assert legacy[1]['messages'][1] == compiled[1]['messages'][1]
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        brand_voice.compile_prompts(brand_voice.settings, brand_voice.settings_version)
+    compile_us = (time.perf_counter() - start) / 1000 * 1e6
+
+    legacy_cost = measure(legacy_request, brand_voice, args.iterations)
+    compiled_cost = measure(compiled_request, brand_voice, args.iterations)
+    results = {
+        'iterations': args.iterations,
+        'compile_once_us': round(compile_us, 2),
+        'per_request': {'legacy': legacy_cost, 'compiled': compiled_cost},
+        'speedup': round(legacy_cost['median_us'] / compiled_cost['median_us'], 2)
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Hit rate and lookup latency: per-worker memory cache vs shared SQLite cache.
+
+Simulates gunicorn workers as separate processes. Requests for a skewed
+(Zipf-like) set of payloads are dealt round-robin to the workers, as the
+kernel's accept queue would. Each worker looks the payload up, and on a miss
+stores a result of realistic size, as the app does after calling Azure.
+
+    python benchmarks/bench_shared_cache.py --workers 4 16 --requests 8000
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import MemoryCacheBackend, SQLiteCacheBackend, ResultCache
+
+RESULT_VALUE = {
+    'transformed_content': 'Beforest collectives restore land using proven, measured practices. ' * 20,
+    'justification': {'key_changes': ['Removed superlatives'] * 3, 'overall_strategy': 'State the facts plainly.'}
+}
+
+
+def build_workload(requests: int, distinct: int, seed: int):
+    """Zipf-distributed payload ids: a few pieces of copy are resubmitted constantly"""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(distinct)]
+    return rng.choices(range(distinct), weights=weights, k=requests)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def worker(backend_kind, db_path, keys, max_entries, queue):
+    backend = MemoryCacheBackend(max_entries) if backend_kind == 'memory' else SQLiteCacheBackend(db_path, max_entries)
+    cache = ResultCache(backend, 'results', 3600)
+    latencies = []
+    for key in keys:
+        start = time.perf_counter()
+        value = cache.get(f'transform:{key}')
+        latencies.append(time.perf_counter() - start)
+        if value is None:
+            cache.set(f'transform:{key}', RESULT_VALUE)
+    queue.put((cache.hits, cache.misses, latencies))
+
+
+def run(backend_kind, workers, workload, max_entries):
+    state_dir = tempfile.mkdtemp(prefix='cache-bench-')
+    db_path = os.path.join(state_dir, 'cache.sqlite3')
+    if backend_kind == 'sqlite':
+        SQLiteCacheBackend(db_path, max_entries)  # create the schema once
+
+    queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(backend_kind, db_path, workload[i::workers], max_entries, queue))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+    hits = sum(r[0] for r in results)
+    misses = sum(r[1] for r in results)
+    latencies = [latency for r in results for latency in r[2]]
+    return {
+        'backend': backend_kind,
+        'workers': workers,
+        'lookups': hits + misses,
+        'hit_rate': round(hits / (hits + misses), 4),
+        'upstream_calls': misses,
+        'p50_lookup_us': round(percentile(latencies, 50) * 1e6, 1),
+        'p99_lookup_us': round(percentile(latencies, 99) * 1e6, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 16])
+    parser.add_argument('--requests', type=int, default=8000)
+    parser.add_argument('--distinct', type=int, default=2000, help='Distinct payloads in the workload')
+    parser.add_argument('--max-entries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args()
+
+    workload = build_workload(args.requests, args.distinct, args.seed)
+    runs = [
+        run(backend_kind, workers, workload, args.max_entries)
+        for workers in args.workers
+        for backend_kind in ('memory', 'sqlite')
+    ]
+
+    results = {'requests': args.requests, 'distinct_payloads': args.distinct, 'runs': runs}
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
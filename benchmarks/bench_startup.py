@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Cold start: time for a fresh worker process to import app.py, and time until
+its /ready check would pass, with Supabase at a given round-trip latency.
+
+Each trial is a new Python process, as a gunicorn worker is. "import" is
+the time until the module is loaded and the worker could take requests;
+"ready" adds the background Supabase connection and settings sync. Run it
+on an older checkout too for a before/after comparison: there the two
+times are the same, since everything happens during import.
+
+    python benchmarks/bench_startup.py --latency-ms 0 50 200 --trials 5
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_supabase import start_in_thread
+from mock_upstream import FaultInjector, LatencyModel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process; prints one JSON line
+TRIAL = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import app
+imported = time.perf_counter()
+ready = getattr(app.brand_voice, 'ready', None)
+if ready is not None:
+    ready.wait(120)
+print(json.dumps({{'import_ms': (imported - start) * 1000, 'ready_ms': (time.perf_counter() - start) * 1000,
+                  'startup': getattr(app.brand_voice, 'startup', None)}}))
+"""
+
+
+def trial(port: int, snapshot: str = None):
+    """Start one worker process. Returns its timings and the settings.json it left behind."""
+    workdir = tempfile.mkdtemp(prefix='startup-bench-')
+    if snapshot:
+        # The settings.json an earlier run left, as on any restart
+        shutil.copy(snapshot, workdir)
+    env = dict(os.environ,
+               SUPABASE_URL=f'http://127.0.0.1:{port}', SUPABASE_SERVICE_KEY='mock-key',
+               AZURE_OPENAI_ENDPOINT='http://127.0.0.1:9', AZURE_OPENAI_KEY='mock-key',
+               STATE_DIR=os.path.join(workdir, 'state'))
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    output = subprocess.run([sys.executable, '-c', TRIAL.format(root=ROOT)], cwd=workdir, env=env,
+                            capture_output=True, text=True, timeout=180)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr[-2000:])
+    return json.loads(output.stdout.strip().splitlines()[-1]), os.path.join(workdir, 'settings.json')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency-ms', type=float, nargs='+', default=[0, 50, 200])
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of Supabase requests that fail')
+    parser.add_argument('--trials', type=int, default=5)
+    parser.add_argument('--port', type=int, default=9290)
+    parser.add_argument('--no-snapshot', action='store_true', help='Start without a settings.json')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args()
+
+    mock = start_in_thread(args.port, latency_ms=0, error_rate=args.error_rate)
+    # The first start finds no settings anywhere and saves the defaults
+    _, snapshot = trial(args.port)
+    if args.no_snapshot or not os.path.exists(snapshot):
+        snapshot = None
+    runs = []
+    for latency_ms in args.latency_ms:
+        mock.latency = LatencyModel(latency_ms, 'fixed', 0.0, None)
+        mock.faults = FaultInjector(args.error_rate, (500, 503), None)
+        trials = [trial(args.port, snapshot)[0] for _ in range(args.trials)]
+        runs.append({
+            'supabase_latency_ms': latency_ms,
+            'import_ms': round(statistics.median(t['import_ms'] for t in trials), 1),
+            'ready_ms': round(statistics.median(t['ready_ms'] for t in trials), 1),
+            'supabase': trials[-1]['startup'] and trials[-1]['startup'].get('supabase')
+        })
+
+    results = {'trials': args.trials, 'error_rate': args.error_rate, 'snapshot': snapshot is not None, 'runs': runs}
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
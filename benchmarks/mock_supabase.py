@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Supabase REST API (PostgREST) the app talks to.
+Keeps beforest_transformations in memory and answers the queries app.py
+makes: inserts and upserts, the history list (view or table) with cursor and
+offset pagination and counts, single-record reads, settings, and the
+get_beforest_usage_stats / update_setting RPCs. Both supabase-py and
+SupabaseRestClient work against it.
+
+Latency and errors are injected like mock_upstream.py:
+
+    python benchmarks/mock_supabase.py --port 9200 --latency-ms 15 --latency-dist lognormal --seed-rows 2000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from aiohttp import web
+
+from mock_upstream import FaultInjector, LatencyModel, TRANSFORM_REPLY, JUSTIFICATION_REPLY, add_fault_arguments
+
+TABLE = 'beforest_transformations'
+PREVIEW_VIEW = 'beforest_transformation_previews'
+PREVIEW_CHARS = 200
+
+CONTENT_TYPES = ['email', 'social-media', 'whatsapp', 'proposal', 'blog-post', 'press-release']
+AUDIENCES = ['existing-clients', 'prospects', 'internal-team', 'partners', 'general-public']
+
+# PostgREST filter operators. Values compare as text, which orders ISO timestamps and UUIDs correctly.
+OPERATORS = {
+    'eq': lambda value, arg: value == arg,
+    'neq': lambda value, arg: value != arg,
+    'gt': lambda value, arg: value is not None and value > arg,
+    'gte': lambda value, arg: value is not None and value >= arg,
+    'lt': lambda value, arg: value is not None and value < arg,
+    'lte': lambda value, arg: value is not None and value <= arg,
+    'ilike': lambda value, arg: value is not None and re.fullmatch(
+        re.escape(arg.lower()).replace('%', '.*').replace(r'\*', '.*'), str(value).lower()) is not None,
+    'in': lambda value, arg: str(value) in arg
+}
+
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'or', 'on_conflict'}
+
+
+def parse_value(raw: str) -> str:
+    return raw[1:-1] if len(raw) >= 2 and raw[0] == raw[-1] == '"' else raw
+
+
+def split_top_level(text: str) -> List[str]:
+    """Split on commas that are outside parentheses and quotes"""
+    parts, depth, quoted, current = [], 0, False, ''
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == ',' and depth == 0 and not quoted:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def compile_condition(expression: str):
+    """column.op.value, or and(...) / or(...) of conditions, as a predicate on a row"""
+    for combinator, combine in (('and(', all), ('or(', any)):
+        if expression.startswith(combinator) and expression.endswith(')'):
+            conditions = [compile_condition(part) for part in split_top_level(expression[len(combinator):-1])]
+            return lambda row: combine(condition(row) for condition in conditions)
+    column, operator, raw = expression.split('.', 2)
+    return compile_filter(column, f'{operator}.{raw}')
+
+
+def compile_filter(column: str, spec: str):
+    operator, _, raw = spec.partition('.')
+    if operator == 'in':
+        arg = {parse_value(value) for value in split_top_level(raw.strip('()'))}
+    else:
+        arg = parse_value(raw)
+    compare = OPERATORS[operator]
+    return lambda row: compare(None if row.get(column) is None else str(row[column]), arg)
+
+
+class MockSupabase:
+    """aiohttp application emulating the PostgREST endpoints under /rest/v1"""
+
+    def __init__(self,
+                 latency_ms: float = 10,
+                 latency_dist: str = 'fixed',
+                 spread: float = 0.5,
+                 error_rate: float = 0.0,
+                 error_status: Sequence[int] = (500, 503),
+                 seed: Optional[int] = None,
+                 seed_rows: int = 0):
+        self.latency = LatencyModel(latency_ms, latency_dist, spread, seed)
+        self.faults = FaultInjector(error_rate, error_status, seed)
+        self.rows: List[Dict[str, Any]] = []
+        self.ids = set()
+        self.settings: Dict[str, Any] = {}
+        self.requests_served = 0
+        self.errors_served = 0
+        self.seed(seed_rows, seed)
+        self.app = web.Application(client_max_size=16 * 1024 * 1024)
+        self.app.router.add_route('*', '/rest/v1/rpc/{function}', self.rpc)
+        self.app.router.add_route('*', '/rest/v1/{table}', self.table)
+
+    def seed(self, count: int, seed: Optional[int] = None):
+        """Fill the table with ``count`` rows spread over the last 30 days"""
+        rng = random.Random(seed)
+        now = datetime.now(timezone.utc)
+        rows = []
+        for index in range(count):
+            original = f'Our AMAZING collective #{index} is the best place ever to reconnect with nature!!! ' * 3
+            rows.append({
+                'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'created_at': (now - timedelta(seconds=rng.uniform(0, 30 * 86400))).isoformat(),
+                'original_content': original,
+                'transformed_content': TRANSFORM_REPLY,
+                'content_type': rng.choice(CONTENT_TYPES),
+                'target_audience': rng.choice(AUDIENCES),
+                'additional_context': '',
+                'justification': JUSTIFICATION_REPLY,
+                'processing_time_ms': int(rng.lognormvariate(7, 0.4)),
+                'session_id': f'session-{rng.randrange(max(count // 5, 1))}',
+                'api_model_used': 'o3-mini'
+            })
+        self.insert(rows, ignore_duplicates=True)
+
+    def insert(self, rows: List[Dict[str, Any]], ignore_duplicates: bool = False) -> List[Dict[str, Any]]:
+        inserted = []
+        for row in rows:
+            row = dict(row)
+            row.setdefault('id', str(uuid.uuid4()))
+            row.setdefault('created_at', datetime.now(timezone.utc).isoformat())
+            if row['id'] in self.ids:
+                if ignore_duplicates:
+                    continue
+                raise web.HTTPConflict(text=json.dumps({'message': 'duplicate key value violates unique constraint'}),
+                                       content_type='application/json')
+            row['original_length'] = len(row.get('original_content') or '')
+            row['transformed_length'] = len(row.get('transformed_content') or '')
+            if row['original_length']:
+                row['length_change_percent'] = round(
+                    (row['transformed_length'] - row['original_length']) * 100.0 / row['original_length'], 2)
+            self.ids.add(row['id'])
+            self.rows.append(row)
+            inserted.append(row)
+        return inserted
+
+    async def respond(self, request, handler):
+        """Wait out the sampled latency, or fail, before running the handler"""
+        latency = self.latency.sample()
+        status = self.faults.pick()
+        await asyncio.sleep(latency)
+        if status is not None:
+            self.errors_served += 1
+            return web.json_response({'message': f'Mock database error ({status})'}, status=status)
+        self.requests_served += 1
+        return await handler(request)
+
+    async def table(self, request):
+        return await self.respond(request, self.handle_table)
+
+    async def rpc(self, request):
+        return await self.respond(request, self.handle_rpc)
+
+    async def handle_table(self, request):
+        name = request.match_info['table']
+        prefer = request.headers.get('Prefer', '')
+        if request.method == 'POST':
+            body = await request.json()
+            if name == 'beforest_settings':
+                rows = body if isinstance(body, list) else [body]
+                self.settings.update((row['setting_key'], row['setting_value']) for row in rows)
+                return web.json_response(rows, status=201)
+            rows = self.insert(body if isinstance(body, list) else [body], 'ignore-duplicates' in prefer)
+            if 'return=minimal' in prefer:
+                return web.Response(status=201)
+            return web.json_response(rows, status=201, dumps=lambda data: json.dumps(data, default=str))
+        if request.method != 'GET':
+            return web.json_response({'message': f'{request.method} is not supported by the mock'}, status=405)
+
+        if name == 'beforest_settings':
+            rows = [{'setting_key': key, 'setting_value': value} for key, value in self.settings.items()]
+            return web.json_response(rows)
+        if name not in (TABLE, PREVIEW_VIEW):
+            return web.json_response({'message': f'relation "{name}" does not exist'}, status=404)
+        return self.select(request, preview=name == PREVIEW_VIEW)
+
+    def select(self, request, preview: bool):
+        query = request.rel_url.query
+        rows = self.rows
+        for column, spec in query.items():
+            if column == 'or':
+                condition = compile_condition(f'or{spec}')
+                rows = [row for row in rows if condition(row)]
+            elif column not in RESERVED_PARAMS:
+                condition = compile_filter(column, spec)
+                rows = [row for row in rows if condition(row)]
+
+        for term in reversed(query.get('order', '').split(',') if query.get('order') else []):
+            column, _, direction = term.partition('.')
+            rows = sorted(rows, key=lambda row: str(row.get(column) or ''), reverse=direction.startswith('desc'))
+
+        total = len(rows)
+        offset = int(query.get('offset', 0))
+        limit = int(query['limit']) if 'limit' in query else total
+        page = rows[offset:offset + limit]
+
+        columns = [column for column in query.get('select', '*').split(',') if column]
+        page = [self.project(row, columns, preview) for row in page]
+
+        headers = {}
+        count = 'count=' in request.headers.get('Prefer', '')
+        if page:
+            headers['Content-Range'] = f'{offset}-{offset + len(page) - 1}/{total if count else "*"}'
+        else:
+            headers['Content-Range'] = f'*/{total if count else "*"}'
+        return web.json_response(page, headers=headers, dumps=lambda data: json.dumps(data, default=str))
+
+    @staticmethod
+    def project(row: Dict[str, Any], columns: List[str], preview: bool) -> Dict[str, Any]:
+        if preview:
+            row = dict(row, original_preview=(row.get('original_content') or '')[:PREVIEW_CHARS],
+                       transformed_preview=(row.get('transformed_content') or '')[:PREVIEW_CHARS])
+        if columns == ['*']:
+            return dict(row)
+        return {column: row.get(column) for column in columns}
+
+    async def handle_rpc(self, request):
+        function = request.match_info['function']
+        params = await request.json() if request.can_read_body else {}
+        if function == 'get_beforest_usage_stats':
+            return web.json_response([self.usage_stats(int(params.get('days_back', 7)))])
+        if function == 'update_setting':
+            self.settings[params.get('p_key')] = params.get('p_value')
+            return web.json_response(None)
+        return web.json_response({'message': f'function {function} does not exist'}, status=404)
+
+    def usage_stats(self, days_back: int) -> Dict[str, Any]:
+        """The aggregate the rollup function returns, computed by a full scan"""
+        since = (datetime.now(timezone.utc) - timedelta(days=days_back)).isoformat()
+        rows = [row for row in self.rows if str(row['created_at']) >= since]
+        count = len(rows) or 1
+        processing = [row.get('processing_time_ms') or 0 for row in rows]
+        return {
+            'total_transformations': len(rows),
+            'unique_sessions': len({row.get('session_id') for row in rows}),
+            'most_common_content_type': Counter(row['content_type'] for row in rows).most_common(1)[0][0]
+            if rows else None,
+            'most_common_audience': Counter(row['target_audience'] for row in rows).most_common(1)[0][0]
+            if rows else None,
+            'avg_original_length': round(sum(row['original_length'] for row in rows) / count, 2),
+            'avg_transformed_length': round(sum(row['transformed_length'] for row in rows) / count, 2),
+            'total_processing_time_hours': round(sum(processing) / 3600000.0, 2),
+            'avg_processing_time_ms': round(sum(processing) / count, 2),
+            'processing_time_histogram': []
+        }
+
+
+def start_in_thread(port: int, **kwargs) -> MockSupabase:
+    """Start the mock on its own event loop in a daemon thread"""
+    mock = MockSupabase(**kwargs)
+    started = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(mock.app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port, backlog=2048).start())
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return mock
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=9200)
+    parser.add_argument('--seed-rows', type=int, default=1000, help='Rows to preload into beforest_transformations')
+    add_fault_arguments(parser, latency_ms=10, error_status=[500, 503])
+    args = parser.parse_args()
+    mock = MockSupabase(args.latency_ms, args.latency_dist, args.spread, args.error_rate, args.error_status,
+                        args.seed, args.seed_rows)
+    web.run_app(mock.app, host='127.0.0.1', port=args.port, access_log=None, print=None)
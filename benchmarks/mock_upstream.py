@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Azure OpenAI chat completions API.
+Lets the benchmarks exercise BeforestBrandVoice without spending Azure quota.
+
+Latency is drawn from a fixed, uniform or lognormal distribution around
+--latency-ms, and --error-rate of the calls fail with one of --error-status
+(429 carries Retry-After). Streamed replies spread the latency across tokens.
+
+Run standalone:
+    python benchmarks/mock_upstream.py --port 9100 --latency-ms 800
+    python benchmarks/mock_upstream.py --latency-ms 800 --latency-dist lognormal --spread 0.6 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from typing import Optional, Sequence
+
+from aiohttp import web
+
+JUSTIFICATION_REPLY = {
+    "key_changes": ["Removed superlatives", "Shortened sentences", "Led with data"],
+    "brand_voice_improvements": ["Calm tone", "No hype", "Respects the reader"],
+    "audience_adaptation": "Kept the language direct for the selected audience",
+    "overall_strategy": "Stated the facts plainly and let them carry the message"
+}
+
+
+TRANSFORM_REPLY = "Beforest collectives restore land using proven, measured practices."
+
+
+def completion_text(messages) -> str:
+    """Pick a canned reply based on the prompt being answered"""
+    system = messages[0].get('content', '') if messages else ''
+    user = messages[-1].get('content', '') if messages else ''
+    if 'content analyst' in system:
+        return json.dumps(JUSTIFICATION_REPLY)
+    if '"transformed_content"' in user:
+        return json.dumps({'transformed_content': TRANSFORM_REPLY, **JUSTIFICATION_REPLY})
+    return TRANSFORM_REPLY
+
+
+class LatencyModel:
+    """Response latency in seconds: fixed, uniform or lognormal around a median"""
+
+    DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+    def __init__(self, median_ms: float, distribution: str = 'fixed', spread: float = 0.5,
+                 seed: Optional[int] = None):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f'Unknown latency distribution: {distribution}')
+        self.median_ms = median_ms
+        self.distribution = distribution
+        # uniform: +/- spread as a fraction of the median; lognormal: sigma of the log
+        self.spread = spread
+        self.random = random.Random(seed)
+
+    def sample(self) -> float:
+        if self.distribution == 'uniform':
+            latency_ms = self.median_ms * self.random.uniform(1 - self.spread, 1 + self.spread)
+        elif self.distribution == 'lognormal':
+            latency_ms = self.median_ms * math.exp(self.random.gauss(0, self.spread))
+        else:
+            latency_ms = self.median_ms
+        return max(latency_ms, 0.0) / 1000.0
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser, latency_ms: float, error_status: Sequence[int] = (429, 500)):
+    """Latency and error options shared by the stand-in servers"""
+    parser.add_argument('--latency-ms', type=float, default=latency_ms, help='Median response latency')
+    parser.add_argument('--latency-dist', choices=LatencyModel.DISTRIBUTIONS, default='fixed')
+    parser.add_argument('--spread', type=float, default=0.5,
+                        help='uniform: +/- fraction of the median; lognormal: sigma')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, nargs='+', default=list(error_status),
+                        help='Statuses returned for failed requests, picked at random')
+    parser.add_argument('--seed', type=int, default=None)
+
+
+class FaultInjector:
+    """Decides which requests fail, and with which status"""
+
+    def __init__(self, error_rate: float = 0.0, error_statuses: Sequence[int] = (429, 500),
+                 seed: Optional[int] = None):
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.random = random.Random(seed)
+
+    def pick(self) -> Optional[int]:
+        """A status to fail with, or None to answer normally"""
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self.random.choice(self.error_statuses)
+        return None
+
+
+class MockAzureOpenAI:
+    """aiohttp application emulating /openai/deployments/<name>/chat/completions"""
+
+    def __init__(self,
+                 latency_ms: float = 800,
+                 latency_dist: str = 'fixed',
+                 spread: float = 0.5,
+                 error_rate: float = 0.0,
+                 error_status: Sequence[int] = (429, 500),
+                 seed: Optional[int] = None):
+        self.latency = LatencyModel(latency_ms, latency_dist, spread, seed)
+        self.faults = FaultInjector(error_rate, error_status, seed)
+        self.requests_served = 0
+        self.errors_served = 0
+        self.app = web.Application()
+        self.app.router.add_post('/openai/deployments/{deployment}/chat/completions', self.chat_completions)
+
+    async def chat_completions(self, request):
+        payload = await request.json()
+        content = completion_text(payload.get('messages', []))
+        latency = self.latency.sample()
+        status = self.faults.pick()
+        if status is not None:
+            return await self.error_response(status, latency)
+        if payload.get('stream'):
+            return await self.stream_completion(request, content, latency)
+        await asyncio.sleep(latency)
+        self.requests_served += 1
+        return web.json_response({
+            'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.match_info['deployment'],
+            'choices': [{
+                'index': 0,
+                'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': content}
+            }],
+            'usage': {'prompt_tokens': 600, 'completion_tokens': 60, 'total_tokens': 660}
+        })
+
+    async def error_response(self, status: int, latency: float):
+        """Fail the way Azure does: rate limits quickly, server errors after the wait"""
+        await asyncio.sleep(latency / 10 if status == 429 else latency)
+        self.errors_served += 1
+        headers = {'Retry-After': '1'} if status == 429 else None
+        code = 'RateLimitReached' if status == 429 else 'InternalServerError'
+        return web.json_response({'error': {'code': code, 'message': f'Mock upstream error ({status})'}},
+                                 status=status, headers=headers)
+
+    async def stream_completion(self, request, content, latency: float):
+        """Send the reply as SSE chunks, spreading the latency across tokens"""
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        tokens = content.split(' ')
+        delay = latency / len(tokens)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(delay)
+            chunk = {
+                'object': 'chat.completion.chunk',
+                'choices': [{'index': 0, 'delta': {'content': token if i == 0 else ' ' + token}}]
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        await response.write(b"data: [DONE]\n\n")
+        self.requests_served += 1
+        return response
+
+
+def start_in_thread(port: int, **kwargs) -> MockAzureOpenAI:
+    """Start the mock on its own event loop in a daemon thread"""
+    mock = MockAzureOpenAI(**kwargs)
+    started = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(mock.app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port, backlog=2048).start())
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return mock
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=9100)
+    add_fault_arguments(parser, latency_ms=800)
+    args = parser.parse_args()
+    mock = MockAzureOpenAI(args.latency_ms, args.latency_dist, args.spread, args.error_rate, args.error_status,
+                           args.seed)
+    web.run_app(mock.app, host='127.0.0.1', port=args.port, access_log=None, print=None)
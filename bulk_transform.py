@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Bulk transform a JSONL or CSV archive offline with BeforestBrandVoice.
+
+Rows are read lazily and transformed by a worker pool. Results are appended to
+an output JSONL file as they finish, and a checkpoint next to it records which
+rows are done, so a rerun after a crash or rate-limit storm picks up where the
+last run stopped.
+
+Each row needs original_content; content_type, target_audience and
+additional_context may come from the row or from the command line defaults.
+
+    python bulk_transform.py archive.csv voiced.jsonl --content-type email --target-audience prospects
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import sys
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Iterator, Tuple
+
+import openai
+
+logger = logging.getLogger('bulk_transform')
+
+# Upstream errors worth retrying; if they persist the run stops and can be resumed
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+    openai.error.APIError
+)
+# Errors every other row would hit as well
+FATAL_ERRORS = (openai.error.AuthenticationError, openai.error.PermissionError)
+
+
+class RunAborted(Exception):
+    """Raised for a row that must stay pending so the next run retries it"""
+
+
+class RowIncomplete(Exception):
+    """Raised for a row left pending for the next run while this run carries on"""
+
+
+def read_rows(path: str, input_format: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (index, row) pairs without loading the file into memory.
+
+    Rows that cannot be parsed are yielded as the error message string.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if input_format == 'csv':
+            for index, row in enumerate(csv.DictReader(f)):
+                yield index, row
+            return
+
+        index = 0
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield index, f'Invalid JSON: {str(e)}'
+            index += 1
+
+
+class Checkpoint:
+    """Which rows are done, and how much of the output file they account for.
+
+    Done rows are stored as a watermark (every row below next_index is done)
+    plus the few rows above it that finished out of order, so the checkpoint
+    stays small however long the input is. Rows left incomplete do not hold
+    the watermark back; they are listed under retry, which grows only with
+    the number of such rows, and the next run picks them up again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.input_path = None
+        self.next_index = 0
+        self.done_above = set()
+        self.retry = set()
+        self.output_offset = 0
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            state = json.load(f)
+        self.input_path = state['input']
+        self.next_index = state['next_index']
+        self.done_above = set(state['done_above'])
+        self.retry = set(state.get('retry', []))
+        self.output_offset = state['output_offset']
+        return True
+
+    def is_done(self, index: int) -> bool:
+        return index not in self.retry and (index < self.next_index or index in self.done_above)
+
+    def mark_done(self, index: int):
+        self.retry.discard(index)
+        if index < self.next_index:
+            # A retried row the watermark has already passed
+            return
+        self.done_above.add(index)
+        while self.next_index in self.done_above:
+            self.done_above.remove(self.next_index)
+            self.next_index += 1
+
+    def mark_incomplete(self, index: int):
+        """Let the watermark pass a row that the next run must try again"""
+        self.mark_done(index)
+        self.retry.add(index)
+
+    def save(self, output_offset: int):
+        self.output_offset = output_offset
+        state = {
+            'input': self.input_path,
+            'next_index': self.next_index,
+            'done_above': sorted(self.done_above),
+            'retry': sorted(self.retry),
+            'output_offset': output_offset,
+            'updated_at': time.time()
+        }
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+
+def transform_row(brand_voice, validate, index: int, row: Any, defaults: Dict[str, str],
+                  use_cache: bool, retries: int) -> Dict[str, Any]:
+    """Transform one row and build its output record"""
+    if isinstance(row, str):
+        return {'index': index, 'success': False, 'error': row}
+    if not isinstance(row, dict):
+        return {'index': index, 'success': False, 'error': 'Row must be a JSON object'}
+
+    try:
+        data = {**defaults, **{key: value for key, value in row.items() if value not in (None, '')}}
+        fields, error = validate(data)
+    except Exception as e:
+        fields, error = None, f'Invalid row: {str(e)}'
+    if error:
+        return {'index': index, 'id': row.get('id'), 'success': False, 'error': error}
+
+    for attempt in range(retries + 1):
+        try:
+            start_time = time.time()
+            transformed_content, justification = brand_voice.transform_with_justification(
+                **fields, use_cache=use_cache
+            )
+            # A failed analysis comes back as the stock fallback rather than an error.
+            # Retry it; with the cache on, only the justification call runs again.
+            if justification == brand_voice.fallback_justification(fields['target_audience']):
+                if attempt == retries:
+                    raise RowIncomplete('justification failed')
+                delay = min(60, 2 ** attempt) * (0.5 + random.random())
+                logger.warning(f"Row {index} justification failed, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            return {
+                'index': index,
+                'id': row.get('id'),
+                'success': True,
+                **fields,
+                'transformed_content': transformed_content,
+                'justification': justification,
+                'processing_time_ms': int((time.time() - start_time) * 1000)
+            }
+        except RowIncomplete:
+            raise
+        except FATAL_ERRORS as e:
+            raise RunAborted(str(e))
+        except RETRYABLE_ERRORS as e:
+            if attempt == retries:
+                raise RunAborted(str(e))
+            delay = min(60, 2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"Row {index} failed ({str(e)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+        except Exception as e:
+            return {'index': index, 'id': row.get('id'), 'success': False, 'error': f'Transformation failed: {str(e)}'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='Input .jsonl or .csv file')
+    parser.add_argument('output', help='Output .jsonl file, appended to as rows finish')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='Input format (default: from the file extension)')
+    parser.add_argument('--content-type', help='content_type for rows that do not set one')
+    parser.add_argument('--target-audience', help='target_audience for rows that do not set one')
+    parser.add_argument('--additional-context', help='additional_context for rows that do not set one')
+    parser.add_argument('--workers', type=int, default=8, help='Rows transformed concurrently (default 8)')
+    parser.add_argument('--retries', type=int, default=4, help='Retries per row for rate limits and 5xx (default 4)')
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: <output>.checkpoint)')
+    parser.add_argument('--restart', action='store_true', help='Ignore any checkpoint and overwrite the output')
+    parser.add_argument('--no-cache', action='store_true', help='Skip the result cache')
+    args = parser.parse_args()
+
+    # Importing app configures Azure OpenAI and the shared result cache
+    from app import brand_voice, validate_transform_request
+
+    if not brand_voice.azure_endpoint or not brand_voice.azure_key:
+        logger.error("Azure OpenAI is not configured. Please check your environment variables.")
+        return 1
+
+    input_format = args.format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+    defaults = {
+        'content_type': args.content_type,
+        'target_audience': args.target_audience,
+        'additional_context': args.additional_context
+    }
+    defaults = {key: value for key, value in defaults.items() if value}
+
+    checkpoint = Checkpoint(args.checkpoint or f'{args.output}.checkpoint')
+    resumed = not args.restart and checkpoint.load()
+    if resumed and checkpoint.input_path != os.path.abspath(args.input):
+        logger.error(f"Checkpoint {checkpoint.path} belongs to {checkpoint.input_path}; pass --restart to start over")
+        return 1
+    checkpoint.input_path = os.path.abspath(args.input)
+
+    output = open(args.output, 'a+' if resumed else 'w', encoding='utf-8')
+    # Drop anything written after the last checkpoint; those rows run again
+    output.truncate(checkpoint.output_offset if resumed else 0)
+    output.seek(0, os.SEEK_END)
+    if resumed:
+        # Rows listed for retry come before the watermark, so the scan reaches them first
+        logger.info(f"Resuming from row {checkpoint.next_index}, retrying {len(checkpoint.retry)} earlier rows")
+
+    # Bound the rows in flight so memory stays flat and the checkpoint stays small
+    max_in_flight = args.workers * 4
+    counts = {'succeeded': 0, 'failed': 0, 'skipped': 0, 'pending': 0}
+    aborted = None
+    rows = read_rows(args.input, input_format)
+    pending = {}
+
+    def finish(future):
+        nonlocal aborted
+        index = pending.pop(future)
+        try:
+            record = future.result()
+        except CancelledError:
+            return
+        except RunAborted as e:
+            if aborted is None:
+                logger.error(f"Stopping at row {index}: {str(e)}")
+            aborted = aborted or str(e)
+            return
+        except RowIncomplete as e:
+            # Nothing is written; the checkpoint lists the row for the next run
+            logger.warning(f"Leaving row {index} for the next run: {str(e)}")
+            checkpoint.mark_incomplete(index)
+            checkpoint.save(output.tell())
+            counts['pending'] += 1
+            return
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        output.flush()
+        os.fsync(output.fileno())
+        checkpoint.mark_done(index)
+        checkpoint.save(output.tell())
+        counts['succeeded' if record['success'] else 'failed'] += 1
+        done = counts['succeeded'] + counts['failed']
+        if done % 100 == 0:
+            logger.info(f"{done} rows transformed, {counts['failed']} failed")
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='bulk') as executor:
+        for index, row in rows:
+            if aborted:
+                break
+            if checkpoint.is_done(index):
+                counts['skipped'] += 1
+                continue
+            while len(pending) >= max_in_flight:
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    finish(future)
+            future = executor.submit(
+                transform_row, brand_voice, validate_transform_request, index, row, defaults,
+                not args.no_cache, args.retries
+            )
+            pending[future] = index
+
+        if aborted:
+            # Rows that have not started yet stay pending for the next run
+            for future in pending:
+                future.cancel()
+
+        while pending:
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                finish(future)
+
+    checkpoint.save(output.tell())
+    output.close()
+
+    logger.info(f"Done in {time.time() - start_time:.1f}s - Succeeded: {counts['succeeded']}, "
+                f"Failed: {counts['failed']}, Already done: {counts['skipped']}, Pending: {counts['pending']}")
+    if aborted:
+        logger.error("Run stopped early; rerun the same command to resume")
+        return 2
+    if counts['pending']:
+        logger.warning("Some rows are still pending; rerun the same command to retry them")
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - Result cache
+Content-addressed LRU + TTL cache for transformation results, usage stats and
+history pages. Storage is pluggable: the SQLite backend is shared by every
+gunicorn worker on the host, the memory backend is private to one process.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, Optional, List, Tuple
+
+# Cache lookups made while handling the current request, as (kind, hit) pairs
+_lookups: ContextVar[Optional[List[Tuple[str, bool]]]] = ContextVar('cache_lookups', default=None)
+# Callbacks told about every lookup, tracked or not (e.g. metrics counters)
+_observers: List[Callable[[str, bool], None]] = []
+
+
+def normalize_content(text: str) -> str:
+    """Normalize text so whitespace-only edits map to the same key"""
+    return re.sub(r'\s+', ' ', (text or '').strip())
+
+
+def settings_fingerprint(settings: Dict[str, Any]) -> str:
+    """Hash of the prompts and model settings, computed once per settings version"""
+    material = {
+        'prompts': settings.get('prompts', {}),
+        'model': settings.get('model', {})
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def make_cache_key(kind: str, fingerprint: str, **fields) -> str:
+    """Hash the request fields together with the settings fingerprint.
+
+    Any change to a prompt or model parameter changes the fingerprint and so
+    the key, so results generated under old settings are never served.
+    """
+    material = {
+        'kind': kind,
+        'fields': {name: normalize_content(value) for name, value in fields.items()},
+        'settings': fingerprint
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return f"{kind}:{hashlib.sha256(encoded).hexdigest()}"
+
+
+def track_lookups() -> List[Tuple[str, bool]]:
+    """Start recording cache lookups for the current request"""
+    lookups = []
+    _lookups.set(lookups)
+    return lookups
+
+
+def observe_lookups(callback: Callable[[str, bool], None]):
+    """Call callback(kind, hit) for every cache lookup in this process"""
+    _observers.append(callback)
+
+
+def record_lookup(kind: str, hit: bool):
+    for callback in _observers:
+        callback(kind, hit)
+    lookups = _lookups.get()
+    if lookups is not None:
+        lookups.append((kind, hit))
+
+
+class MemoryCacheBackend:
+    """Process-local LRU store. Used in tests and when CACHE_BACKEND=memory."""
+
+    shared = False
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def add(self, key: str, value: Any, ttl_seconds: float) -> bool:
+        """Set the key only if it is absent or expired. Returns True if it was set."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                return False
+            self._entries[key] = (time.time() + ttl_seconds, value)
+            return True
+
+    def incr(self, key: str, delta: int) -> bool:
+        """Add to a cached number if it is present. Returns True if it was."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                return False
+            self._entries[key] = (entry[0], entry[1] + delta)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """LRU store in a SQLite WAL database shared by all processes on the host.
+
+    Values are stored as JSON. Recency is only rewritten when it is more than
+    ACCESS_RESOLUTION seconds stale, so a hot hit costs a single indexed read.
+    """
+
+    ACCESS_RESOLUTION = 30
+    shared = True
+
+    def __init__(self, path: str, max_entries: int = 1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed_at ON cache_entries(accessed_at)')
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute('SELECT value, expires_at, accessed_at FROM cache_entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute('DELETE FROM cache_entries WHERE key = ? AND expires_at <= ?', (key, now))
+            return None
+        if now - row[2] > self.ACCESS_RESOLUTION:
+            conn.execute('UPDATE cache_entries SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+            (key, json.dumps(value), now + ttl_seconds, now)
+        )
+        self._evict(conn)
+
+    def add(self, key: str, value: Any, ttl_seconds: float) -> bool:
+        """Set the key only if it is absent or expired. Returns True if it was set."""
+        now = time.time()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT expires_at FROM cache_entries WHERE key = ?', (key,)).fetchone()
+            if row is not None and row[0] > now:
+                return False
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), now + ttl_seconds, now)
+            )
+            return True
+        finally:
+            conn.execute('COMMIT')
+
+    def incr(self, key: str, delta: int) -> bool:
+        """Add to a cached number if it is present. Returns True if it was."""
+        # A single UPDATE is atomic across processes; JSON numbers are valid SQL numbers
+        cursor = self._connection().execute(
+            'UPDATE cache_entries SET value = CAST(value AS INTEGER) + ? WHERE key = ? AND expires_at > ?',
+            (delta, key, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str):
+        self._connection().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+
+    def delete_prefix(self, prefix: str):
+        # Range scan on the primary key instead of LIKE, which cannot use the index
+        self._connection().execute(
+            'DELETE FROM cache_entries WHERE key >= ? AND key < ?',
+            (prefix, prefix + '\uffff')
+        )
+
+    def size(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection):
+        overflow = self.size() - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                'DELETE FROM cache_entries WHERE key IN '
+                '(SELECT key FROM cache_entries ORDER BY accessed_at ASC LIMIT ?)',
+                (overflow,)
+            )
+            self.evictions += overflow
+
+
+def create_backend(kind: str, state_dir: str, max_entries: int):
+    """Build the cache backend named by CACHE_BACKEND"""
+    if kind == 'memory':
+        return MemoryCacheBackend(max_entries)
+    return SQLiteCacheBackend(os.path.join(state_dir, 'cache.sqlite3'), max_entries)
+
+
+class ResultCache:
+    """A namespace of cached values with its own TTL and hit/miss counters"""
+
+    def __init__(self, backend, namespace: str, ttl_seconds: float):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.backend.max_entries > 0 and self.ttl_seconds > 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str, kind: str = 'result') -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        if not self.enabled:
+            return None
+
+        value = self.backend.get(self._key(key))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_lookup(kind, value is not None)
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        if self.enabled:
+            self.backend.set(self._key(key), value, ttl_seconds or self.ttl_seconds)
+
+    def add(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        """Set the key only if no live entry holds it; doubles as a cross-worker lock"""
+        return self.enabled and self.backend.add(self._key(key), value, ttl_seconds or self.ttl_seconds)
+
+    def incr(self, key: str, delta: int = 1) -> bool:
+        """Adjust a cached counter in place; a missing counter is left to be recomputed"""
+        return self.enabled and self.backend.incr(self._key(key), delta)
+
+    def delete(self, key: str):
+        if self.enabled:
+            self.backend.delete(self._key(key))
+
+    def clear(self):
+        """Drop every entry in this namespace, in every worker sharing the backend"""
+        if self.enabled:
+            self.backend.delete_prefix(f"{self.namespace}:")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def request_metadata(self, lookups: List[Tuple[str, bool]]) -> Dict[str, Any]:
+        """Summarize this request's lookups plus the cache counters for response metadata"""
+        metadata = {kind: 'hit' if hit else 'miss' for kind, hit in lookups}
+        metadata.update(self.stats())
+        return metadata
+
+
+class VersionCounter:
+    """Cheap content versions for conditional requests.
+
+    A version is bumped whenever its content changes, so comparing ETags built
+    from it needs no database query. A missing version is seeded with the
+    current time in microseconds, so an ETag issued before an eviction or
+    expiry can never match again; expiry bounds how long changes made outside
+    the app go unnoticed.
+    """
+
+    def __init__(self, backend, ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.backend.max_entries > 0 and self.ttl_seconds > 0
+
+    def current(self, name: str) -> Optional[int]:
+        """The current version, or None when versions are disabled"""
+        if not self.enabled:
+            return None
+        key = f"versions:{name}"
+        version = self.backend.get(key)
+        if version is None:
+            # add() lets exactly one worker seed the version
+            self.backend.add(key, time.time_ns() // 1000, self.ttl_seconds)
+            version = self.backend.get(key)
+        return version
+
+    def bump(self, name: str):
+        # A missing version needs no bump; the next read seeds a fresh one
+        if self.enabled:
+            self.backend.incr(f"versions:{name}", 1)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - gunicorn configuration
+gunicorn reads this file from the working directory, so run.py and start.sh
+start the server with a bare `gunicorn`. Everything is set from the
+environment:
+
+- GUNICORN_WORKERS (or WEB_CONCURRENCY) - worker processes (default 4)
+- GUNICORN_WORKER_CLASS - sync, gthread, gevent or uvicorn.workers.UvicornWorker
+  (default sync, or the uvicorn worker with SERVER_MODE=async)
+- GUNICORN_THREADS - threads per worker (default 1; more than 1 makes sync workers gthread)
+- GUNICORN_PRELOAD - load the app once in the master before forking (default true)
+- GUNICORN_TIMEOUT, GUNICORN_LOG_LEVEL, PORT
+
+With preloading, the master imports the app, loads settings, compiles the
+prompts and builds the static asset table. The workers inherit all of that
+copy-on-write instead of each building their own. The master opens no
+network connections and starts no threads (CONNECT_AFTER_FORK). Each
+worker builds its Supabase client and background threads in post_fork.
+"""
+
+import gc
+import os
+
+# Workers write Prometheus samples here and /metrics merges them. This must be
+# set before prometheus_client is imported, which the preloaded app does.
+# STATE_DIR defaults as in app.py, outside the served directory.
+state_dir = os.environ.get('STATE_DIR') or os.path.join(
+    os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state'), 'beforest-brand-voice'
+)
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(state_dir, 'prometheus'))
+
+import metrics  # noqa: E402
+
+# Samples from the previous run are cleared before the workers start
+metrics.reset_multiprocess_dir(metrics_dir)
+
+server_mode = os.environ.get('SERVER_MODE', 'sync')
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('GUNICORN_WORKERS', os.environ.get('WEB_CONCURRENCY', 4)))
+worker_class = os.environ.get(
+    'GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker' if server_mode == 'async' else 'sync'
+)
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# The uvicorn worker serves /transform from the asyncio entry point (asgi.py)
+wsgi_app = 'asgi:app' if 'uvicorn' in worker_class.lower() else 'app:app'
+
+if preload_app:
+    os.environ['CONNECT_AFTER_FORK'] = 'true'
+
+
+def when_ready(server):
+    if preload_app:
+        # Move everything the preload built out of the collector's reach. Collections
+        # write to every tracked object, which would copy those pages into each worker.
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        # Sockets and threads do not survive a fork, so each worker makes its own
+        from app import brand_voice
+        brand_voice.start()
+
+
+def child_exit(server, worker):
+    metrics.mark_process_dead(worker.pid)
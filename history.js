@@ -5,10 +5,13 @@
 
 class TransformationHistory {
     constructor() {
-        this.currentPage = 1;
         this.perPage = 6;
-        this.totalPages = 0;
+        this.pagination = null;
+        // Position of the first card on the page, for the "Showing x-y" line
+        this.startIndex = 0;
         this.transformations = [];
+        // Full records fetched for the modal, keyed by id; list rows only carry previews
+        this.details = new Map();
         this.init();
     }
 
@@ -26,11 +29,16 @@ class TransformationHistory {
         });
     }
 
-    async loadTransformations(page = 1) {
+    async loadTransformations(cursor = null) {
         try {
             this.showLoading();
             
-            const response = await fetch(`/api/transformations?page=${page}&per_page=${this.perPage}`);
+            const params = new URLSearchParams({ per_page: this.perPage });
+            if (cursor) {
+                params.set('cursor', cursor);
+            }
+            
+            const response = await fetch(`/api/transformations?${params}`);
             const data = await response.json();
             
             if (!data.success) {
@@ -38,10 +46,12 @@ class TransformationHistory {
             }
             
             this.transformations = data.transformations;
-            this.currentPage = data.pagination.page;
-            this.totalPages = data.pagination.total_pages;
+            this.pagination = data.pagination;
+            if (!data.pagination.has_prev) {
+                this.startIndex = 0;
+            }
             
-            if (this.transformations.length === 0 && page === 1) {
+            if (this.transformations.length === 0 && !cursor) {
                 this.showEmptyState();
             } else {
                 this.renderTransformations();
@@ -109,9 +119,10 @@ class TransformationHistory {
         const changeText = lengthChange > 0 ? `+${lengthChange}%` : `${lengthChange}%`;
         
         // Truncate preview text
-        const previewText = transformation.transformed_content.length > 150 
-            ? transformation.transformed_content.substring(0, 150) + '...'
-            : transformation.transformed_content;
+        const preview = transformation.transformed_preview || '';
+        const previewText = preview.length > 150 || transformation.transformed_length > preview.length
+            ? preview.substring(0, 150) + '...'
+            : preview;
 
         return `
             <div class="transformation-card" data-id="${transformation.id}">
@@ -154,7 +165,7 @@ class TransformationHistory {
     renderPagination(pagination) {
         const paginationContainer = document.getElementById('pagination');
         
-        if (pagination.total_pages <= 1) {
+        if (!pagination.has_prev && !pagination.has_next) {
             paginationContainer.style.display = 'none';
             return;
         }
@@ -164,51 +175,24 @@ class TransformationHistory {
         // Previous button
         paginationHTML += `
             <button class="pagination-btn ${!pagination.has_prev ? 'disabled' : ''}" 
-                    onclick="transformationHistory.goToPage(${pagination.page - 1})"
+                    onclick="transformationHistory.previousPage()"
                     ${!pagination.has_prev ? 'disabled' : ''}>
                 ← Previous
             </button>
         `;
         
-        // Page numbers
-        const startPage = Math.max(1, pagination.page - 2);
-        const endPage = Math.min(pagination.total_pages, pagination.page + 2);
-        
-        if (startPage > 1) {
-            paginationHTML += `<button class="pagination-btn" onclick="transformationHistory.goToPage(1)">1</button>`;
-            if (startPage > 2) {
-                paginationHTML += `<span class="pagination-ellipsis">...</span>`;
-            }
-        }
-        
-        for (let i = startPage; i <= endPage; i++) {
-            paginationHTML += `
-                <button class="pagination-btn ${i === pagination.page ? 'current' : ''}" 
-                        onclick="transformationHistory.goToPage(${i})">
-                    ${i}
-                </button>
-            `;
-        }
-        
-        if (endPage < pagination.total_pages) {
-            if (endPage < pagination.total_pages - 1) {
-                paginationHTML += `<span class="pagination-ellipsis">...</span>`;
-            }
-            paginationHTML += `<button class="pagination-btn" onclick="transformationHistory.goToPage(${pagination.total_pages})">${pagination.total_pages}</button>`;
-        }
-        
         // Next button
         paginationHTML += `
             <button class="pagination-btn ${!pagination.has_next ? 'disabled' : ''}" 
-                    onclick="transformationHistory.goToPage(${pagination.page + 1})"
+                    onclick="transformationHistory.nextPage()"
                     ${!pagination.has_next ? 'disabled' : ''}>
                 Next →
             </button>
         `;
         
         // Pagination info
-        const start = (pagination.page - 1) * pagination.per_page + 1;
-        const end = Math.min(pagination.page * pagination.per_page, pagination.total_count);
+        const start = this.startIndex + 1;
+        const end = this.startIndex + this.transformations.length;
         paginationHTML += `
             <div class="pagination-info">
                 Showing ${start}-${end} of ${pagination.total_count} transformations
@@ -219,17 +203,63 @@ class TransformationHistory {
         paginationContainer.style.display = 'flex';
     }
 
-    goToPage(page) {
-        if (page >= 1 && page <= this.totalPages && page !== this.currentPage) {
-            this.loadTransformations(page);
-            // Scroll to top
-            window.scrollTo({ top: 0, behavior: 'smooth' });
+    nextPage() {
+        if (this.pagination && this.pagination.next_cursor) {
+            this.startIndex += this.transformations.length;
+            this.goToCursor(this.pagination.next_cursor);
         }
     }
 
-    openModal(transformation) {
+    previousPage() {
+        if (this.pagination && this.pagination.prev_cursor) {
+            this.startIndex = Math.max(0, this.startIndex - this.perPage);
+            this.goToCursor(this.pagination.prev_cursor);
+        }
+    }
+
+    goToCursor(cursor) {
+        this.loadTransformations(cursor);
+        // Scroll to top
+        window.scrollTo({ top: 0, behavior: 'smooth' });
+    }
+
+    async openModal(summary) {
         const modal = document.getElementById('detail-modal');
+        this.openId = summary.id;
+
+        // Show the list row straight away, then swap in the full record
+        this.renderModal(this.details.get(summary.id) || summary);
+        modal.style.display = 'flex';
+        document.body.style.overflow = 'hidden';
+
+        if (this.details.has(summary.id)) return;
+        try {
+            const detail = await this.fetchDetail(summary.id);
+            if (this.openId === summary.id && modal.style.display !== 'none') {
+                this.renderModal(detail);
+            }
+        } catch (error) {
+            console.error('Error loading transformation:', error);
+        }
+    }
+
+    async fetchDetail(transformationId) {
+        if (this.details.has(transformationId)) {
+            return this.details.get(transformationId);
+        }
+        const response = await fetch(`/api/transformations/${encodeURIComponent(transformationId)}`);
+        const data = await response.json();
+        if (!data.success) {
+            throw new Error(data.error || 'Failed to load transformation');
+        }
+        this.details.set(transformationId, data.transformation);
+        return data.transformation;
+    }
+
+    renderModal(transformation) {
         const modalContent = document.getElementById('modal-content');
+        const originalContent = transformation.original_content ?? `${transformation.original_preview || ''}...`;
+        const transformedContent = transformation.transformed_content ?? `${transformation.transformed_preview || ''}...`;
         
         const date = new Date(transformation.created_at).toLocaleDateString('en-US', {
             year: 'numeric',
@@ -268,7 +298,7 @@ class TransformationHistory {
                             📝 Original Content
                         </h4>
                         <div style="background: var(--surface-tertiary); padding: var(--space-4); border-radius: var(--radius-md); font-size: 0.9rem; line-height: 1.6; white-space: pre-wrap; max-height: 300px; overflow-y: auto;">
-                            ${this.escapeHtml(transformation.original_content)}
+                            ${this.escapeHtml(originalContent)}
                         </div>
                         <div style="margin-top: var(--space-2); font-size: 0.875rem; color: var(--text-secondary);">
                             ${transformation.original_length} characters
@@ -280,7 +310,7 @@ class TransformationHistory {
                             ✨ Transformed Content
                         </h4>
                         <div style="background: rgba(52, 71, 54, 0.05); padding: var(--space-4); border-radius: var(--radius-md); font-size: 0.9rem; line-height: 1.6; white-space: pre-wrap; max-height: 300px; overflow-y: auto; border: 1px solid rgba(52, 71, 54, 0.2);">
-                            ${this.escapeHtml(transformation.transformed_content)}
+                            ${this.escapeHtml(transformedContent)}
                         </div>
                         <div style="margin-top: var(--space-2); font-size: 0.875rem; color: var(--text-secondary);">
                             ${transformation.transformed_length} characters
@@ -308,9 +338,6 @@ class TransformationHistory {
                 </div>
             </div>
         `;
-        
-        modal.style.display = 'flex';
-        document.body.style.overflow = 'hidden';
     }
 
     renderJustification(justification) {
@@ -368,11 +395,10 @@ class TransformationHistory {
     }
 
     copyTransformedContent(transformationId) {
-        const transformation = this.transformations.find(t => t.id === transformationId);
-        if (transformation) {
+        const button = event.target;
+        this.fetchDetail(transformationId).then(transformation => {
             navigator.clipboard.writeText(transformation.transformed_content).then(() => {
                 // Simple feedback - you could enhance this with a proper notification
-                const button = event.target;
                 const originalText = button.textContent;
                 button.textContent = 'Copied!';
                 button.style.background = 'var(--forest-green)';
@@ -384,7 +410,10 @@ class TransformationHistory {
                 console.error('Failed to copy text: ', err);
                 alert('Failed to copy content to clipboard');
             });
-        }
+        }).catch(err => {
+            console.error('Failed to load transformation: ', err);
+            alert('Failed to copy content to clipboard');
+        });
     }
 
     escapeHtml(text) {
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - Background justification jobs
+SQLite-backed job table so every gunicorn worker on the host can report the
+status of a justification computed by any other worker.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETE = 'complete'
+FAILED = 'failed'
+
+
+class JustificationJobStore:
+    """Job table for deferred justifications"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS justification_jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    justification TEXT,
+                    saved_to_analytics INTEGER,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call keeps this safe across threads and forks
+        return sqlite3.connect(self.path, timeout=10)
+
+    def create(self, job_id: str, payload: Dict[str, Any]):
+        """Record a new pending job with everything needed to (re)run it"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO justification_jobs (id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (job_id, PENDING, json.dumps(payload), now, now)
+            )
+
+    def mark_running(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute('UPDATE justification_jobs SET status = ?, updated_at = ? WHERE id = ?',
+                         (RUNNING, time.time(), job_id))
+
+    def complete(self, job_id: str, justification: dict, saved: bool):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE justification_jobs SET status = ?, justification = ?, saved_to_analytics = ?, updated_at = ? '
+                'WHERE id = ?',
+                (COMPLETE, json.dumps(justification), int(saved), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str):
+        with self._connect() as conn:
+            conn.execute('UPDATE justification_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?',
+                         (FAILED, error, time.time(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by id, or None if it does not exist"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT id, status, payload, justification, saved_to_analytics, error, created_at, updated_at '
+                'FROM justification_jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return {
+            'id': row[0],
+            'status': row[1],
+            'payload': json.loads(row[2]),
+            'justification': json.loads(row[3]) if row[3] else None,
+            'saved_to_analytics': bool(row[4]) if row[4] is not None else None,
+            'error': row[5],
+            'created_at': row[6],
+            'updated_at': row[7]
+        }
+
+    def claim_stale(self, job_id: str, stale_after_seconds: float) -> bool:
+        """Take over an unfinished job whose worker has gone quiet.
+
+        Returns True if this caller claimed it and should run it again.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'UPDATE justification_jobs SET status = ?, updated_at = ? '
+                'WHERE id = ? AND status IN (?, ?) AND updated_at < ?',
+                (RUNNING, now, job_id, PENDING, RUNNING, now - stale_after_seconds)
+            )
+            return cursor.rowcount == 1
+
+    def purge(self, older_than_seconds: float) -> int:
+        """Delete finished jobs older than the retention window"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'DELETE FROM justification_jobs WHERE status IN (?, ?) AND created_at < ?',
+                (COMPLETE, FAILED, time.time() - older_than_seconds)
+            )
+            return cursor.rowcount
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - Prometheus metrics
+Latency histograms for each stage of a transform request, plus counters for
+upstream errors, justification parse fallbacks and cache lookups.
+
+Under gunicorn each worker is a separate process. run.py and start.sh point
+PROMETHEUS_MULTIPROC_DIR at an empty directory before the workers start, each
+worker writes its samples there, and /metrics merges them. prometheus_client is
+optional: without it every metric is a no-op and /metrics reports 503.
+
+Every stage timed here is also added as a span to the request's trace, if
+one is active (see tracing.py).
+"""
+
+import functools
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional, Tuple
+
+import tracing
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+    )
+except ImportError:
+    Counter = Histogram = None
+
+# Stages of a transform request. LLM calls take seconds, validation microseconds.
+# save is the time a request spends handing rows over; save_flush is the
+# write-behind buffer's batched insert. The history and analytics endpoints
+# time their Supabase queries, and compress covers response compression.
+# startup is observed once per worker, from engine creation to /ready.
+STAGES = ('validation', 'prompt', 'transform_call', 'justification_call', 'single_call', 'save', 'save_flush',
+          'serialize', 'history_query', 'history_count', 'stats_query', 'compress', 'startup')
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+enabled = Histogram is not None
+
+if enabled:
+    STAGE_SECONDS = Histogram(
+        'beforest_stage_seconds', 'Time spent in each stage of a transform request',
+        ['stage'], buckets=STAGE_BUCKETS
+    )
+    UPSTREAM_ERRORS = Counter(
+        'beforest_upstream_errors_total', 'Azure OpenAI calls that raised, by stage and error type',
+        ['stage', 'error']
+    )
+    PARSE_FALLBACKS = Counter(
+        'beforest_parse_fallbacks_total', 'Model responses that failed to parse and fell back',
+        ['kind']
+    )
+    CACHE_LOOKUPS = Counter(
+        'beforest_cache_lookups_total', 'Cache lookups by kind and result',
+        ['kind', 'result']
+    )
+
+
+def observe_stage(name: str, seconds: float, start: Optional[float] = None):
+    """Record a stage that took ``seconds`` and began at perf_counter() value ``start``"""
+    if enabled:
+        STAGE_SECONDS.labels(stage=name).observe(seconds)
+    tracing.record_span(name, start if start is not None else time.perf_counter() - seconds, seconds)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as one stage"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start_time, start_time)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of stage() for functions that are a stage on their own"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count_upstream_error(stage_name: str, error: Exception):
+    if enabled:
+        UPSTREAM_ERRORS.labels(stage=stage_name, error=type(error).__name__).inc()
+
+
+def count_parse_fallback(kind: str):
+    if enabled:
+        PARSE_FALLBACKS.labels(kind=kind).inc()
+
+
+def count_cache_lookup(kind: str, hit: bool):
+    if enabled:
+        CACHE_LOOKUPS.labels(kind=kind, result='hit' if hit else 'miss').inc()
+
+
+def render() -> Optional[Tuple[bytes, str]]:
+    """Exposition body and content type for /metrics, or None without prometheus_client"""
+    if not enabled:
+        return None
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # A fresh registry per scrape, merged from every worker's files
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def reset_multiprocess_dir(path: str):
+    """Empty the multiprocess directory; run before the workers start"""
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith('.db'):
+            os.remove(os.path.join(path, name))
+
+
+def mark_process_dead(pid: int):
+    """Drop a dead worker's live gauge files; call from gunicorn's child_exit"""
+    if enabled and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - Compiled prompt templates
+Prompt templates are parsed once per settings version instead of on every
+request. Parsing checks the placeholders, so a template with a typo such as
+{orignal_content} or an unbalanced brace is rejected when it is saved, not
+when the first transform trips over it. Everything else that depends only on
+the settings (system messages, model parameters, the settings fingerprint in
+cache keys) is built alongside and reused by every request.
+"""
+
+import string
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+TRANSFORM_FIELDS = ('original_content', 'content_type', 'target_audience', 'additional_context')
+JUSTIFICATION_FIELDS = ('original_content', 'transformed_content', 'content_type', 'target_audience')
+
+JUSTIFICATION_SYSTEM_PROMPT = ("You are an expert content analyst specializing in Beforest's brand voice. "
+                               "Provide precise, factual analysis in the requested JSON format.")
+
+
+class TemplateError(ValueError):
+    """A prompt template that cannot be rendered"""
+
+
+class PromptTemplate:
+    """A str.format-style template, parsed into literal text and placeholders"""
+
+    def __init__(self, name: str, source: str, fields: Iterable[str], required: Iterable[str] = ()):
+        self.name = name
+        self.source = source
+        fields = tuple(fields)
+        try:
+            parsed = list(string.Formatter().parse(source))
+        except ValueError as e:
+            raise TemplateError(f"The {name} prompt is malformed: {str(e)}. Write a literal brace as {{{{ or }}}}.")
+
+        pieces, literal, used = [], '', set()
+        for text, field, format_spec, conversion in parsed:
+            literal += text
+            if field is None:
+                continue
+            if field not in fields:
+                raise TemplateError(f"The {name} prompt uses an unknown placeholder {{{field}}}. "
+                                    f"Available: {', '.join('{' + option + '}' for option in fields)}")
+            if format_spec or conversion:
+                raise TemplateError(f"The {name} prompt formats {{{field}}}; use the plain placeholder")
+            pieces.append((literal, field))
+            literal = ''
+            used.add(field)
+
+        missing = [field for field in required if field not in used]
+        if missing:
+            raise TemplateError(f"The {name} prompt must include "
+                                f"{', '.join('{' + field + '}' for field in missing)}")
+
+        # (literal text, placeholder) pairs, then the trailing text
+        self.pieces: Tuple[Tuple[str, str], ...] = tuple(pieces)
+        self.suffix = literal
+
+    def render(self, **values: str) -> str:
+        """Fill in the placeholders. Same result as str.format on the source."""
+        return ''.join([literal + values[field] for literal, field in self.pieces]) + self.suffix
+
+
+class CompiledPrompts:
+    """Everything about one settings version that does not depend on the request.
+
+    The message dicts are shared between requests and must not be modified.
+    """
+
+    def __init__(self,
+                 version: int,
+                 fingerprint: str,
+                 transform: PromptTemplate,
+                 justification: PromptTemplate,
+                 system_message: Dict[str, str],
+                 transform_params: Dict[str, Any],
+                 justification_params: Dict[str, Any],
+                 pipeline: Optional[str] = None):
+        self.version = version
+        self.fingerprint = fingerprint
+        self.transform = transform
+        self.justification = justification
+        self.system_message = system_message
+        self.justification_system_message = {'role': 'system', 'content': JUSTIFICATION_SYSTEM_PROMPT}
+        self.transform_params = transform_params
+        self.justification_params = justification_params
+        self.pipeline = pipeline
@@ -4,22 +4,14 @@ Railway startup script - handles PORT environment variable properly
 """
 import os
 import sys
-import subprocess
 
-# Get port from environment
+# Workers, worker class, preloading and the Prometheus directory are all
+# set in gunicorn.conf.py, which gunicorn reads from the working directory
 port = os.environ.get('PORT', '8080')
+server_mode = os.environ.get('SERVER_MODE', 'sync')
 
-print(f"Starting Beforest Brand Voice Transformer on port {port}")
+print(f"Starting Beforest Brand Voice Transformer on port {port} ({server_mode} mode)")
+sys.stdout.flush()
 
-# Build the gunicorn command
-cmd = [
-    'gunicorn',
-    '-w', '4',
-    '-b', f'0.0.0.0:{port}',
-    '--timeout', '120',
-    '--log-level', 'info',
-    'app:app'
-]
-
-# Execute gunicorn
-subprocess.run(cmd)
\ No newline at end of file
+# Replace this process with gunicorn, so it receives the platform's signals directly
+os.execvp('gunicorn', ['gunicorn', '--config', 'gunicorn.conf.py'])
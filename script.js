@@ -6,7 +6,9 @@ class BrandVoiceTransformer {
         this.bindEvents();
         this.setupKeyboardShortcuts();
         this.apiEndpoint = '/transform';
+        this.streamEndpoint = '/transform/stream';
         this.isTransforming = false;
+        this.isRegenerating = false;
         this.sessionId = this.generateSessionId();
     }
 
@@ -190,13 +192,22 @@ class BrandVoiceTransformer {
                 content_type: this.contentTypeSelect.value,
                 target_audience: this.targetAudienceSelect.value,
                 user_email: this.userEmailInput.value.trim(),
-                additional_context: this.additionalContextInput.value.trim()
+                additional_context: this.additionalContextInput.value.trim(),
+                // Regenerate must produce a fresh version, not the cached one
+                no_cache: this.isRegenerating
             };
 
-            const response = await this.callTransformAPI(transformData);
+            const response = this.supportsStreaming()
+                ? await this.callTransformStreamAPI(transformData)
+                : await this.callTransformAPI(transformData);
             
             if (response.success) {
-                this.displayOutput(response.transformed_content, response.metadata, response.justification);
+                this.displayOutput(response.transformed_content, response.metadata, response.justification, !response.streamed);
+                
+                // Justification is computed in the background on the JSON path
+                if (response.justification_url) {
+                    this.pollJustification(response.justification_url);
+                }
                 this.showNotification('Content transformed successfully', 'success');
                 
                 // Track analytics (if needed)
@@ -228,17 +239,20 @@ class BrandVoiceTransformer {
         const originalContext = this.additionalContextInput.value;
         this.additionalContextInput.value = regenerateContext;
         
+        this.isRegenerating = true;
         await this.handleTransform();
+        this.isRegenerating = false;
         
         // Restore original context
         this.additionalContextInput.value = originalContext;
     }
 
     async callTransformAPI(data) {
-        // Add session ID to the request
+        // Add session ID to the request and ask for the justification separately
         const requestData = {
             ...data,
-            session_id: this.sessionId
+            session_id: this.sessionId,
+            defer_justification: true
         };
 
         const response = await fetch(this.apiEndpoint, {
@@ -258,7 +272,130 @@ class BrandVoiceTransformer {
         return await response.json();
     }
 
-    displayOutput(content, metadata = {}, justification = null) {
+    async pollJustification(url, attempts = 60) {
+        for (let i = 0; i < attempts; i++) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            
+            try {
+                const response = await fetch(url);
+                const data = await response.json();
+                
+                if (response.status === 202) continue;
+                if (data.success && data.justification) {
+                    this.updateJustification(data.justification);
+                }
+                return;
+            } catch (error) {
+                console.error('Justification polling error:', error);
+                return;
+            }
+        }
+    }
+
+    supportsStreaming() {
+        return !!(window.ReadableStream && window.TextDecoder);
+    }
+
+    async callTransformStreamAPI(data) {
+        // Same request as callTransformAPI, but the server sends Server-Sent Events
+        const requestData = {
+            ...data,
+            session_id: this.sessionId
+        };
+
+        const response = await fetch(this.streamEndpoint, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+                'X-Session-ID': this.sessionId
+            },
+            body: JSON.stringify(requestData)
+        });
+
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            throw new Error(errorData.error || `HTTP ${response.status}: ${response.statusText}`);
+        }
+
+        // Server fell back to a plain JSON response
+        if (!(response.headers.get('Content-Type') || '').includes('text/event-stream')) {
+            return await response.json();
+        }
+
+        const result = { success: false, streamed: true, transformed_content: '' };
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        this.startStreamingOutput();
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+
+            events.forEach(rawEvent => this.handleStreamEvent(rawEvent, result));
+        }
+
+        return result;
+    }
+
+    handleStreamEvent(rawEvent, result) {
+        let eventName = 'message';
+        let payload = '';
+
+        rawEvent.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                eventName = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                payload += line.slice(5).trim();
+            }
+        });
+
+        if (!payload) return;
+        const data = JSON.parse(payload);
+
+        switch (eventName) {
+            case 'token':
+                result.transformed_content += data.content;
+                this.outputText.textContent += data.content;
+                break;
+            case 'justification':
+                result.justification = data;
+                this.updateJustification(data);
+                break;
+            case 'metadata':
+                result.metadata = data;
+                this.updateTransformationStats(data);
+                break;
+            case 'done':
+                result.success = true;
+                result.transformed_content = data.transformed_content;
+                break;
+            case 'error':
+                result.error = data.error;
+                break;
+        }
+    }
+
+    startStreamingOutput() {
+        this.outputPlaceholder.style.display = 'none';
+        this.outputText.style.display = 'block';
+        this.outputText.style.transition = '';
+        this.outputText.style.opacity = '1';
+        this.outputText.style.transform = 'translateY(0)';
+        this.outputText.textContent = '';
+        this.transformationStats.style.display = 'none';
+        if (this.transformationJustification) {
+            this.transformationJustification.style.display = 'none';
+        }
+    }
+
+    displayOutput(content, metadata = {}, justification = null, animate = true) {
         // Show output content
         this.outputPlaceholder.style.display = 'none';
         this.outputText.style.display = 'block';
@@ -276,15 +413,17 @@ class BrandVoiceTransformer {
         this.regenerateBtn.disabled = false;
         this.copyBtn.disabled = false;
         
-        // Add smooth scroll animation
-        this.outputText.style.opacity = '0';
-        this.outputText.style.transform = 'translateY(10px)';
-        
-        requestAnimationFrame(() => {
-            this.outputText.style.transition = 'opacity 0.3s ease, transform 0.3s ease';
-            this.outputText.style.opacity = '1';
-            this.outputText.style.transform = 'translateY(0)';
-        });
+        // Add smooth scroll animation (streamed output is already on screen)
+        if (animate) {
+            this.outputText.style.opacity = '0';
+            this.outputText.style.transform = 'translateY(10px)';
+            
+            requestAnimationFrame(() => {
+                this.outputText.style.transition = 'opacity 0.3s ease, transform 0.3s ease';
+                this.outputText.style.opacity = '1';
+                this.outputText.style.transform = 'translateY(0)';
+            });
+        }
         
         // Scroll to output on mobile
         if (window.innerWidth <= 768) {
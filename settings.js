@@ -171,6 +171,7 @@ class SettingsManager {
             document.getElementById('deploymentName').value = settings.model.deployment || 'o3-mini';
             document.getElementById('maxTokens').value = settings.model.max_tokens || 2000;
             document.getElementById('reasoningEffort').value = settings.model.reasoning_effort || 'medium';
+            document.getElementById('pipeline').value = settings.model.pipeline || 'two_call';
             document.getElementById('apiVersion').value = settings.model.api_version || '2025-01-01-preview';
         }
     }
@@ -332,6 +333,7 @@ Please transform this content to perfectly match Beforest's brand voice while ma
             deployment: document.getElementById('deploymentName').value,
             max_tokens: parseInt(document.getElementById('maxTokens').value),
             reasoning_effort: document.getElementById('reasoningEffort').value,
+            pipeline: document.getElementById('pipeline').value,
             api_version: document.getElementById('apiVersion').value
         };
 
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - Shared settings file
+settings.json is shared by every worker on the host and carries a monotonic
+version. A save takes an exclusive lock, bumps the version past whatever is
+on disk and atomically replaces the file. Other workers notice the change
+with one stat() per request and reload only then, so a prompt edited
+through one worker reaches all of them on their next request.
+"""
+
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SettingsFile:
+    """settings.json plus its version, safe to share between processes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = f'{path}.lock'
+        self._seen = None
+
+    def _signature(self) -> Optional[Tuple[int, int, int]]:
+        # The file is replaced, never rewritten, so a new inode marks every change
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def changed(self) -> bool:
+        """Whether the file differs from the last one read or written here. One stat() call."""
+        return self._signature() != self._seen
+
+    def read(self) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Returns (settings, version), or (None, 0) if there is no file"""
+        signature = self._signature()
+        try:
+            with open(self.path, 'r') as f:
+                settings = json.load(f)
+        except FileNotFoundError:
+            self._seen = None
+            return None, 0
+        self._seen = signature
+        # Files written before versioning have no version
+        version = int(settings.pop('version', 0) or 0)
+        return settings, version
+
+    @contextmanager
+    def locked(self):
+        """Hold the settings lock, so saves from different workers are ordered"""
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def write(self, settings: Dict[str, Any], version: int):
+        """Atomically replace the file. Call while holding locked()."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        temp_path = os.path.join(directory, f'.{os.path.basename(self.path)}.{os.getpid()}.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump({**settings, 'version': version}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._seen = self._signature()
+
+    def disk_version(self) -> int:
+        """The version currently on disk, 0 if there is none"""
+        try:
+            with open(self.path, 'r') as f:
+                return int(json.load(f).get('version', 0) or 0)
+        except (OSError, ValueError, AttributeError):
+            return 0
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - Near-duplicate detection
+MinHash signatures over character shingles with an LSH band table, so a
+lightly edited resubmission can reuse the result of the original request.
+"""
+
+import hashlib
+import random
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+BANDS = 16  # 4 rows per band: pairs above ~0.5 Jaccard become candidates
+MAX_HASH = (1 << 32) - 1
+
+# (a * h + b) mod 2**32 with odd a permutes the 32-bit hash space. The seed is
+# fixed so signatures are comparable across processes and restarts.
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.getrandbits(32) | 1, _rng.getrandbits(32)) for _ in range(NUM_PERMUTATIONS)]
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r'\s+', ' ', (text or '').strip().lower())
+
+
+def shingles(text: str) -> set:
+    """Character shingles of the normalized text"""
+    text = normalize_text(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """MinHash signature of the text's shingle set"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'big')
+        for shingle in shingles(text)
+    ]
+    return tuple(
+        min([(a * h + b) & MAX_HASH for h in hashes])
+        for a, b in _PERMUTATIONS
+    )
+
+
+def estimated_similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity from two signatures"""
+    return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+
+def band_keys(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    rows = len(signature) // BANDS
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    """Bounded similarity index over recent inputs, kept per (content_type, target_audience).
+
+    Entries are evicted oldest first once max_entries is reached, so memory
+    stays flat however long the process runs.
+    """
+
+    def __init__(self, threshold: float = 0.9, max_entries: int = 5000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._bands: Dict[Tuple[str, str], Dict[Tuple[int, Tuple[int, ...]], set]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, entry_id: str, original_content: str, content_type: str, target_audience: str,
+            additional_context: str, transformed_content: str, justification: dict,
+            signature: Optional[Tuple[int, ...]] = None):
+        """Index a finished transformation"""
+        if self.max_entries <= 0:
+            return
+
+        signature = signature or minhash(original_content)
+        group = (content_type, target_audience)
+
+        with self._lock:
+            if entry_id in self._entries:
+                self._remove(entry_id)
+
+            self._entries[entry_id] = {
+                'group': group,
+                'signature': signature,
+                'additional_context': normalize_text(additional_context),
+                'transformed_content': transformed_content,
+                'justification': justification
+            }
+            bands = self._bands.setdefault(group, {})
+            for key in band_keys(signature):
+                bands.setdefault(key, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def find(self, original_content: str, content_type: str, target_audience: str,
+             additional_context: str = "") -> Optional[Dict[str, Any]]:
+        """Return the most similar prior result above the threshold, or None"""
+        if self.max_entries <= 0 or not self._entries:
+            return None
+
+        signature = minhash(original_content)
+        context = normalize_text(additional_context)
+
+        with self._lock:
+            bands = self._bands.get((content_type, target_audience))
+            if not bands:
+                return None
+
+            candidates = set()
+            for key in band_keys(signature):
+                candidates.update(bands.get(key, ()))
+
+            best, best_score = None, 0.0
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry['additional_context'] != context:
+                    continue
+                score = estimated_similarity(signature, entry['signature'])
+                if score > best_score:
+                    best, best_score = entry_id, score
+
+            if best is None or best_score < self.threshold:
+                return None
+
+            entry = self._entries[best]
+            return {
+                'id': best,
+                'similarity': round(best_score, 3),
+                'transformed_content': entry['transformed_content'],
+                'justification': entry['justification']
+            }
+
+    def rebuild(self, rows: List[Dict[str, Any]]):
+        """Replace the index contents with saved rows from beforest_transformations, newest first"""
+        signed = [(row, minhash(row['original_content'])) for row in reversed(rows[:self.max_entries])]
+        with self._lock:
+            self._entries.clear()
+            self._bands.clear()
+        for row, signature in signed:
+            self.add(
+                str(row['id']), row['original_content'], row['content_type'], row['target_audience'],
+                row.get('additional_context') or '', row['transformed_content'], row.get('justification'),
+                signature=signature
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bands.clear()
+
+    def _remove(self, entry_id: str):
+        entry = self._entries.pop(entry_id)
+        bands = self._bands.get(entry['group'], {})
+        for key in band_keys(entry['signature']):
+            ids = bands.get(key)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del bands[key]
+        if not bands:
+            self._bands.pop(entry['group'], None)
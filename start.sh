@@ -3,10 +3,11 @@
 
 # Get port from environment or use default
 if [ -z "$PORT" ]; then
-    PORT=8080
+    export PORT=8080
 fi
 
-echo "Starting Beforest Brand Voice Transformer on port $PORT"
+echo "Starting Beforest Brand Voice Transformer on port $PORT (${SERVER_MODE:-sync} mode)"
 
-# Start Gunicorn with the PORT
-exec gunicorn -w 4 -b 0.0.0.0:$PORT --timeout 120 --log-level info app:app
\ No newline at end of file
+# Workers, worker class, preloading and the Prometheus directory are all set
+# in gunicorn.conf.py (SERVER_MODE=async serves /transform from asgi.py)
+exec gunicorn --config gunicorn.conf.py
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - Lightweight Supabase REST client
+Fallback for when the supabase package cannot create a client. Speaks
+PostgREST directly over one pooled keep-alive session per process, retries
+429 and 5xx responses with jittered backoff (other failures only for requests
+that are safe to repeat), and supports the subset of the
+supabase-py query builder the app uses.
+
+    client = SupabaseRestClient('http://127.0.0.1:54321', 'service-key')
+    client.table('beforest_transformations').select('id, created_at') \\
+        .order('created_at', desc=True).range(0, 19).execute()
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A retried POST or PATCH could apply twice if the first attempt reached the
+# database; upserts are the exception, as a repeat resolves to the same rows
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'DELETE'}
+
+
+class SupabaseRestError(Exception):
+    """A PostgREST request that failed after any retries"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class RestResponse:
+    """Result of an executed query, shaped like supabase-py's APIResponse"""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data if isinstance(data, list) else [data] if data else []
+        self.count = count
+
+
+class SupabaseRestClient:
+    """Minimal Supabase client over PostgREST"""
+
+    def __init__(self,
+                 url: str,
+                 key: str,
+                 timeout: float = 10.0,
+                 max_retries: int = 3,
+                 backoff: float = 0.25,
+                 pool_size: int = 10):
+        self.url = url.rstrip('/')
+        self.key = key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.headers = {
+            'apikey': key,
+            'Authorization': f'Bearer {key}',
+            'Content-Type': 'application/json'
+        }
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        # Pooled sockets must not be shared with a forked child, so each process gets its own session
+        if self._session is None or self._session_pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._session_pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    session.headers.update(self.headers)
+                    self._session = session
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def table(self, table_name: str) -> 'RestQuery':
+        return RestQuery(self, f'/rest/v1/{table_name}')
+
+    def from_(self, table_name: str) -> 'RestQuery':
+        return self.table(table_name)
+
+    def rpc(self, function_name: str, params: Optional[Dict[str, Any]] = None) -> 'RestQuery':
+        query = RestQuery(self, f'/rest/v1/rpc/{function_name}')
+        query.method = 'POST'
+        query.body = params or {}
+        return query
+
+    def request(self,
+                method: str,
+                path: str,
+                params: Optional[List[Tuple[str, str]]] = None,
+                body: Any = None,
+                headers: Optional[Dict[str, str]] = None,
+                idempotent: Optional[bool] = None) -> requests.Response:
+        """Send a request, retrying with jittered backoff.
+
+        Idempotent requests (by default GET, HEAD, PUT and DELETE) are retried
+        on connection errors, timeouts, 429 and 5xx. Others are retried only on
+        429, which is returned before the request is processed.
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_statuses = RETRY_STATUSES if idempotent else {429}
+        url = f'{self.url}{path}'
+        data = json.dumps(body) if body is not None else None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(
+                    method, url, params=params, data=data, headers=headers, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # A connect timeout means nothing was sent, so any request can go again
+                if attempt == self.max_retries or not (idempotent or isinstance(e, requests.ConnectTimeout)):
+                    raise
+                delay = self._retry_delay(attempt)
+                logger.debug(f"Supabase {method} {path} failed ({str(e)}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in retry_statuses or attempt == self.max_retries:
+                return response
+            delay = self._retry_delay(attempt, response.headers.get('Retry-After'))
+            logger.debug(f"Supabase {method} {path} returned {response.status_code}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        # Full jitter, so workers that failed together do not retry together
+        delay = random.uniform(0, self.backoff * 2 ** attempt)
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), 30.0))
+            except ValueError:
+                pass
+        return delay
+
+
+class RestQuery:
+    """Chainable PostgREST query. Nothing is sent until execute()."""
+
+    def __init__(self, client: SupabaseRestClient, path: str):
+        self.client = client
+        self.path = path
+        self.method = 'GET'
+        self.params: List[Tuple[str, str]] = []
+        self.body = None
+        self.prefer: List[str] = []
+        self.idempotent: Optional[bool] = None
+        self._order: List[str] = []
+
+    # Operations
+
+    def select(self, columns: str = '*', count: Optional[str] = None) -> 'RestQuery':
+        self.method = 'GET'
+        self.params.append(('select', ''.join(columns.split())))
+        if count:
+            self.prefer.append(f'count={count}')
+        return self
+
+    def insert(self, data: Any, returning: str = 'representation') -> 'RestQuery':
+        self.method = 'POST'
+        self.body = data
+        self.prefer.append(f'return={returning}')
+        return self
+
+    def upsert(self, data: Any, ignore_duplicates: bool = False, on_conflict: str = '',
+               returning: str = 'representation') -> 'RestQuery':
+        self.method = 'POST'
+        self.body = data
+        # Repeating an upsert lands on the same rows, so it is safe to retry
+        self.idempotent = True
+        resolution = 'ignore-duplicates' if ignore_duplicates else 'merge-duplicates'
+        self.prefer += [f'resolution={resolution}', f'return={returning}']
+        if on_conflict:
+            self.params.append(('on_conflict', on_conflict))
+        return self
+
+    def update(self, data: Dict[str, Any], returning: str = 'representation') -> 'RestQuery':
+        self.method = 'PATCH'
+        self.body = data
+        self.prefer.append(f'return={returning}')
+        return self
+
+    def delete(self, returning: str = 'representation') -> 'RestQuery':
+        self.method = 'DELETE'
+        self.prefer.append(f'return={returning}')
+        return self
+
+    # Filters
+
+    def _filter(self, column: str, operator: str, value: Any) -> 'RestQuery':
+        self.params.append((column, f'{operator}.{value}'))
+        return self
+
+    def eq(self, column: str, value: Any) -> 'RestQuery':
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column: str, value: Any) -> 'RestQuery':
+        return self._filter(column, 'neq', value)
+
+    def gt(self, column: str, value: Any) -> 'RestQuery':
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column: str, value: Any) -> 'RestQuery':
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column: str, value: Any) -> 'RestQuery':
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column: str, value: Any) -> 'RestQuery':
+        return self._filter(column, 'lte', value)
+
+    def ilike(self, column: str, pattern: str) -> 'RestQuery':
+        return self._filter(column, 'ilike', pattern)
+
+    def in_(self, column: str, values: List[Any]) -> 'RestQuery':
+        return self._filter(column, 'in', f"({','.join(str(value) for value in values)})")
+
+    def or_(self, filters: str) -> 'RestQuery':
+        self.params.append(('or', f'({filters})'))
+        return self
+
+    # Modifiers
+
+    def order(self, column: str, desc: bool = False) -> 'RestQuery':
+        self._order.append(f"{column}.{'desc' if desc else 'asc'}")
+        return self
+
+    def limit(self, count: int) -> 'RestQuery':
+        self.params = [param for param in self.params if param[0] != 'limit']
+        self.params.append(('limit', str(count)))
+        return self
+
+    def range(self, start: int, end: int) -> 'RestQuery':
+        self.params = [param for param in self.params if param[0] not in ('offset', 'limit')]
+        self.params += [('offset', str(start)), ('limit', str(end - start + 1))]
+        return self
+
+    def execute(self) -> RestResponse:
+        params = list(self.params)
+        if self._order:
+            params.append(('order', ','.join(self._order)))
+        headers = {'Prefer': ','.join(self.prefer)} if self.prefer else None
+
+        response = self.client.request(self.method, self.path, params, self.body, headers, self.idempotent)
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            # PostgREST errors are objects; a proxy may send anything
+            message = body.get('message', response.text) if isinstance(body, dict) else response.text
+            raise SupabaseRestError(response.status_code, message)
+
+        data = response.json() if response.content else []
+        return RestResponse(data, self._count(response))
+
+    @staticmethod
+    def _count(response: requests.Response) -> Optional[int]:
+        # Content-Range: 0-19/3573, or */3573 for an empty page
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        return int(total) if total.isdigit() else None
@@ -41,7 +41,10 @@ CREATE TABLE IF NOT EXISTS public.beforest_transformations (
 );
 
 -- Create indexes for better query performance (only if they don't exist)
-CREATE INDEX IF NOT EXISTS idx_beforest_transformations_created_at ON public.beforest_transformations(created_at DESC);
+-- History pages are read in (created_at, id) order; the composite index serves
+-- cursor pagination and every created_at range query
+DROP INDEX IF EXISTS public.idx_beforest_transformations_created_at;
+CREATE INDEX IF NOT EXISTS idx_beforest_transformations_created_at_id ON public.beforest_transformations(created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_beforest_transformations_content_type ON public.beforest_transformations(content_type);
 CREATE INDEX IF NOT EXISTS idx_beforest_transformations_target_audience ON public.beforest_transformations(target_audience);
 CREATE INDEX IF NOT EXISTS idx_beforest_transformations_session ON public.beforest_transformations(session_id);
@@ -88,6 +91,7 @@ CREATE POLICY "Allow all operations on beforest_transformations" ON public.befor
     FOR ALL USING (true);
 
 -- Create a function to get usage statistics (fixed - no MODE function)
+-- add_usage_rollup.sql replaces it with a version that reads a daily rollup
 CREATE OR REPLACE FUNCTION public.get_beforest_usage_stats(days_back INTEGER DEFAULT 7)
 RETURNS TABLE (
     total_transformations BIGINT,
@@ -0,0 +1,47 @@
+"""
+Shared fixtures. The app is imported once per session, against the mock
+Supabase from benchmarks/, with its state and settings.json in a temporary
+directory.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_load import MOCK_SUPABASE_KEY, free_port  # noqa: E402
+
+HISTORY_ROWS = 23
+
+
+@pytest.fixture(scope='session')
+def supabase_mock():
+    from mock_supabase import start_in_thread
+    port = free_port()
+    os.environ['SUPABASE_URL'] = f'http://127.0.0.1:{port}'
+    os.environ['SUPABASE_SERVICE_KEY'] = MOCK_SUPABASE_KEY
+    return start_in_thread(port, latency_ms=0, seed=1, seed_rows=HISTORY_ROWS)
+
+
+@pytest.fixture(scope='session')
+def app_module(supabase_mock):
+    state_dir = tempfile.mkdtemp(prefix='brand-voice-tests-')
+    os.environ['STATE_DIR'] = os.path.join(state_dir, 'state')
+    os.environ['ANALYTICS_WRITE_BEHIND'] = 'false'
+    os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    # The app keeps settings.json in the working directory; keep it out of the tree
+    os.chdir(state_dir)
+    import app
+    assert app.brand_voice.ready.wait(30), 'the app did not finish starting'
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    app_module.brand_voice.history_cache.clear()
+    return app_module.app.test_client()
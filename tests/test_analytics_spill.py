@@ -0,0 +1,52 @@
+"""Replay of the analytics spill file"""
+
+import os
+import stat
+
+from analytics import SpillFile
+
+
+def spill_with_rows(tmp_path, count):
+    spill = SpillFile(str(tmp_path / 'state' / 'analytics-spill.jsonl'))
+    spill.append([{'id': f'row-{index}', 'user_email': 'someone@example.com'} for index in range(count)])
+    return spill
+
+
+def test_replay_writes_everything_and_empties_the_file(tmp_path):
+    spill = spill_with_rows(tmp_path, 7)
+    written = []
+    assert spill.replay(written.extend, batch_size=3) == 7
+    assert [row['id'] for row in written] == [f'row-{index}' for index in range(7)]
+    assert spill.size() == 0
+
+
+def test_partial_failure_keeps_the_unreplayed_tail(tmp_path):
+    spill = spill_with_rows(tmp_path, 7)
+    written = []
+
+    def write_rows(rows):
+        if len(written) >= 3:
+            raise ConnectionError('database down')
+        written.extend(rows)
+
+    assert spill.replay(write_rows, batch_size=3) == 3
+    # The failed batch and everything after it stay, in order, ready for the next replay
+    remaining = []
+    assert spill.replay(remaining.extend, batch_size=3) == 4
+    assert [row['id'] for row in written + remaining] == [f'row-{index}' for index in range(7)]
+
+
+def test_torn_line_is_skipped(tmp_path):
+    spill = spill_with_rows(tmp_path, 2)
+    with open(spill.path, 'ab') as f:
+        f.write(b'{"id": "torn\n')
+    spill.append([{'id': 'after'}])
+    replayed = []
+    spill.replay(replayed.extend, batch_size=10)
+    assert [row['id'] for row in replayed] == ['row-0', 'row-1', 'after']
+
+
+def test_spill_file_is_private(tmp_path):
+    spill = spill_with_rows(tmp_path, 1)
+    assert stat.S_IMODE(os.stat(spill.path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(spill.path)).st_mode) == 0o700
@@ -0,0 +1,95 @@
+"""Checkpoint and resume in bulk_transform.py"""
+
+import json
+import sys
+
+import pytest
+
+import bulk_transform
+from bulk_transform import Checkpoint
+
+
+def test_checkpoint_watermark_and_reload(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / 'out.jsonl.checkpoint'))
+    checkpoint.input_path = 'input.jsonl'
+    for index in (0, 2, 3, 1, 5):
+        checkpoint.mark_done(index)
+    assert checkpoint.next_index == 4
+    assert checkpoint.done_above == {5}
+    checkpoint.save(123)
+
+    reloaded = Checkpoint(checkpoint.path)
+    assert reloaded.load()
+    assert (reloaded.next_index, reloaded.done_above, reloaded.output_offset) == (4, {5}, 123)
+    assert [reloaded.is_done(index) for index in range(7)] == [True] * 4 + [False, True, False]
+
+
+def test_incomplete_row_does_not_hold_the_watermark(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / 'out.jsonl.checkpoint'))
+    checkpoint.mark_done(0)
+    checkpoint.mark_incomplete(1)
+    for index in range(2, 1000):
+        checkpoint.mark_done(index)
+    assert checkpoint.next_index == 1000
+    assert checkpoint.done_above == set()
+    assert checkpoint.retry == {1}
+    assert not checkpoint.is_done(1)
+
+    checkpoint.mark_done(1)
+    assert checkpoint.retry == set()
+    assert checkpoint.is_done(1)
+    assert checkpoint.next_index == 1000
+
+
+@pytest.fixture
+def bulk_run(app_module, tmp_path, monkeypatch):
+    """Run the CLI against a stand-in transform that fails rows while they are listed in `failing`"""
+    brand_voice = app_module.brand_voice
+    calls, failing = [], set()
+
+    def transform_with_justification(original_content, content_type, target_audience, additional_context='',
+                                     use_cache=True):
+        calls.append(original_content)
+        if original_content in failing:
+            return 'voiced', brand_voice.fallback_justification(target_audience)
+        return f'voiced {original_content}', {'overall_strategy': 'calm'}
+
+    monkeypatch.setattr(brand_voice, 'transform_with_justification', transform_with_justification)
+    monkeypatch.setattr(brand_voice, 'azure_endpoint', 'http://127.0.0.1:9')
+    monkeypatch.setattr(brand_voice, 'azure_key', 'test-key')
+
+    input_path, output_path = tmp_path / 'input.jsonl', tmp_path / 'output.jsonl'
+    rows = [{'id': f'row-{index}', 'original_content': f'Content number {index}'} for index in range(6)]
+    input_path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+
+    def run():
+        calls.clear()
+        monkeypatch.setattr(sys, 'argv', ['bulk_transform.py', str(input_path), str(output_path),
+                                          '--content-type', 'email', '--target-audience', 'prospects',
+                                          '--retries', '0', '--workers', '2'])
+        code = bulk_transform.main()
+        records = [json.loads(line) for line in output_path.read_text().splitlines()]
+        with open(f'{output_path}.checkpoint') as f:
+            return code, records, json.load(f), list(calls)
+
+    return run, failing
+
+
+def test_resume_retries_only_incomplete_rows(bulk_run):
+    run, failing = bulk_run
+    failing.add('Content number 2')
+
+    code, records, state, _ = run()
+    assert code == 2
+    assert sorted(record['index'] for record in records) == [0, 1, 3, 4, 5]
+    assert state['next_index'] == 6
+    assert state['retry'] == [2]
+
+    failing.clear()
+    code, records, state, calls = run()
+    assert code == 0
+    assert calls == ['Content number 2']
+    assert sorted(record['index'] for record in records) == list(range(6))
+    assert all(record['success'] for record in records)
+    assert state['retry'] == []
+    assert state['next_index'] == 6
@@ -0,0 +1,30 @@
+"""ETag revalidation for /api/transformations"""
+
+
+def test_matching_etag_is_answered_without_a_query(client, supabase_mock):
+    first = client.get('/api/transformations?per_page=5')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag.startswith('W/')
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    served = supabase_mock.requests_served
+    repeat = client.get('/api/transformations?per_page=5', headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert repeat.data == b''
+    assert repeat.headers['ETag'] == etag
+    assert supabase_mock.requests_served == served
+
+
+def test_etag_depends_on_the_url(client):
+    etag = client.get('/api/transformations?per_page=5').headers['ETag']
+    other = client.get('/api/transformations?per_page=6', headers={'If-None-Match': etag})
+    assert other.status_code == 200
+
+
+def test_save_invalidates_the_etag(client, app_module):
+    etag = client.get('/api/transformations?per_page=5').headers['ETag']
+    app_module.brand_voice.transformations_saved(1)
+    after = client.get('/api/transformations?per_page=5', headers={'If-None-Match': etag})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != etag
@@ -0,0 +1,68 @@
+"""Keyset pagination for /api/transformations"""
+
+import base64
+import json
+
+import pytest
+
+from conftest import HISTORY_ROWS
+
+
+def make_token(payload) -> str:
+    encoded = json.dumps(payload).encode('utf-8')
+    return base64.urlsafe_b64encode(encoded).decode('ascii').rstrip('=')
+
+
+VALID = {'c': '2024-05-01T10:00:00.123450+00:00', 'i': '3f1c9b9e-1d2a-4c6e-9f00-0a1b2c3d4e5f', 'd': 'next'}
+
+
+def test_cursor_round_trip(app_module):
+    token = app_module.encode_cursor({'created_at': VALID['c'], 'id': VALID['i']}, 'next')
+    assert app_module.decode_cursor(token) == VALID
+
+
+@pytest.mark.parametrize('token', [
+    'not base64 at all!',
+    make_token(['a', 'list']),
+    make_token(dict(VALID, d='sideways')),
+    make_token(dict(VALID, c=12345)),
+    # Extra filter terms smuggled into the or=() filter
+    make_token(dict(VALID, i='0),or(id.neq.0')),
+    make_token(dict(VALID, c='2024-05-01T10:00:00"),or(id.neq.0')),
+    make_token(dict(VALID, c='yesterday')),
+])
+def test_decode_cursor_rejects_tampered_tokens(app_module, token):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        app_module.decode_cursor(token)
+
+
+def test_tampered_cursor_is_a_bad_request(client):
+    response = client.get(f"/api/transformations?cursor={make_token(dict(VALID, i='0),or(id.neq.0'))}")
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+
+def get_page(client, cursor=None, per_page=5):
+    query = f'/api/transformations?per_page={per_page}' + (f'&cursor={cursor}' if cursor else '')
+    response = client.get(query)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_cursor_pages_walk_forward_and_back(client):
+    pages = [get_page(client)]
+    while pages[-1]['pagination']['has_next']:
+        pages.append(get_page(client, pages[-1]['pagination']['next_cursor']))
+
+    ids = [row['id'] for page in pages for row in page['transformations']]
+    assert len(ids) == len(set(ids)) == HISTORY_ROWS
+    keys = [(row['created_at'], row['id']) for page in pages for row in page['transformations']]
+    assert keys == sorted(keys, reverse=True)
+    assert not pages[0]['pagination']['has_prev']
+
+    # Walking back from the last page returns exactly the pages seen going forward
+    for index in range(len(pages) - 1, 0, -1):
+        previous = get_page(client, pages[index]['pagination']['prev_cursor'])
+        assert [row['id'] for row in previous['transformations']] == \
+            [row['id'] for row in pages[index - 1]['transformations']]
+        assert previous['pagination']['has_next']
@@ -0,0 +1,52 @@
+"""Compiled prompt templates"""
+
+import pytest
+
+from prompts import JUSTIFICATION_FIELDS, TRANSFORM_FIELDS, PromptTemplate, TemplateError
+
+VALUES = {
+    'original_content': 'Our AMAZING new collective {is} the best!!!',
+    'content_type': 'email',
+    'target_audience': 'prospects',
+    'additional_context': '',
+    'transformed_content': 'Beforest collectives restore land.'
+}
+
+
+@pytest.mark.parametrize('source', [
+    'Rewrite this: {original_content}',
+    '{original_content}',
+    'Type {content_type} for {target_audience}:\n{original_content}\n{original_content}\nContext: {additional_context}',
+    'Literal braces {{like this}} around {original_content} and a trailing }}',
+    'No trailing text {original_content}{content_type}',
+])
+def test_render_matches_str_format(source):
+    template = PromptTemplate('transform', source, TRANSFORM_FIELDS, required=('original_content',))
+    values = {field: VALUES[field] for field in TRANSFORM_FIELDS}
+    assert template.render(**values) == source.format(**values)
+
+
+def test_default_templates_render_like_str_format(app_module):
+    brand_voice = app_module.brand_voice
+    for name, source, fields in [
+        ('transform', brand_voice.get_default_transform_prompt(), TRANSFORM_FIELDS),
+        ('justification', brand_voice.get_default_justification_prompt(), JUSTIFICATION_FIELDS)
+    ]:
+        values = {field: VALUES[field] for field in fields}
+        assert PromptTemplate(name, source, fields).render(**values) == source.format(**values)
+
+
+def test_unknown_placeholder_is_rejected():
+    with pytest.raises(TemplateError, match=r'unknown placeholder \{orignal_content\}'):
+        PromptTemplate('transform', 'Rewrite: {orignal_content}', TRANSFORM_FIELDS)
+
+
+@pytest.mark.parametrize('source, message', [
+    ('Rewrite: {original_content', 'malformed'),
+    ('Rewrite: {original_content!r}', 'plain placeholder'),
+    ('Rewrite: {original_content:>10}', 'plain placeholder'),
+    ('Rewrite the content for {target_audience}', r'must include \{original_content\}'),
+])
+def test_invalid_templates_are_rejected(source, message):
+    with pytest.raises(TemplateError, match=message):
+        PromptTemplate('transform', source, TRANSFORM_FIELDS, required=('original_content',))
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Beforest Brand Voice Transformer - Request tracing
+Collects the stage spans of one request for its Server-Timing header, and
+optionally appends one JSON trace record per request to a local JSONL file
+that rotates by size, for offline latency analysis.
+
+Spans come from metrics.stage(), so every timed stage is traced with no
+extra calls. The active trace lives in a context variable; work handed to
+a thread pool joins it only when submitted through copy_context().run.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Server-Timing metric names are HTTP tokens
+_TOKEN = re.compile(r'[^A-Za-z0-9!#$%&\'*+.^_`|~-]')
+# Request ids from a proxy or client are kept if they are short and plain
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+_trace: ContextVar[Optional['Trace']] = ContextVar('request_trace', default=None)
+
+
+class Trace:
+    """Spans and upstream calls of one request"""
+
+    def __init__(self, route: str, request_id: Optional[str] = None):
+        self.request_id = request_id if request_id and _REQUEST_ID.match(request_id) else uuid.uuid4().hex
+        self.route = route
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        # (name, offset_ms, duration_ms); spans from worker threads may overlap
+        self.spans: List[tuple] = []
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, seconds: float):
+        """Record a span that began at perf_counter() value ``start``"""
+        with self._lock:
+            self.spans.append((name, (start - self._start) * 1000, seconds * 1000))
+
+    def add_call(self, stage: str, model: Optional[str], usage: Optional[Dict[str, Any]]):
+        usage = usage or {}
+        with self._lock:
+            self.calls.append({
+                'stage': stage,
+                'model': model,
+                'prompt_tokens': usage.get('prompt_tokens'),
+                'completion_tokens': usage.get('completion_tokens')
+            })
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: one entry per stage, summed, then the total"""
+        durations: Dict[str, float] = {}
+        with self._lock:
+            for name, _, duration_ms in self.spans:
+                durations[name] = durations.get(name, 0.0) + duration_ms
+        entries = [f'{_TOKEN.sub("_", name)};dur={duration_ms:.1f}' for name, duration_ms in durations.items()]
+        entries.append(f'total;dur={self.elapsed_ms():.1f}')
+        return ', '.join(entries)
+
+    def record(self, status: int) -> Dict[str, Any]:
+        """The trace as one JSON-ready record"""
+        with self._lock:
+            spans = [{'name': name, 'start_ms': round(offset_ms, 2), 'duration_ms': round(duration_ms, 2)}
+                     for name, offset_ms, duration_ms in self.spans]
+            calls = list(self.calls)
+        return {
+            'request_id': self.request_id,
+            'route': self.route,
+            'status': status,
+            'started_at': self.started_at,
+            'duration_ms': round(self.elapsed_ms(), 2),
+            'spans': spans,
+            'upstream_calls': calls,
+            'prompt_tokens': sum(call['prompt_tokens'] or 0 for call in calls),
+            'completion_tokens': sum(call['completion_tokens'] or 0 for call in calls),
+            'pid': os.getpid()
+        }
+
+
+def start_trace(route: str, request_id: Optional[str] = None) -> Trace:
+    """Start tracing the current request"""
+    trace = Trace(route, request_id)
+    _trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+def end_trace():
+    """Stop tracing, so a reused thread does not add to a finished request"""
+    _trace.set(None)
+
+
+def record_span(name: str, start: float, seconds: float):
+    trace = _trace.get()
+    if trace is not None:
+        trace.add_span(name, start, seconds)
+
+
+def record_call(stage: str, api_params: Dict[str, Any], response: Any):
+    """Note the model and token usage of a completed Azure OpenAI call"""
+    trace = _trace.get()
+    if trace is None:
+        return
+    try:
+        model = response.get('model') or api_params.get('engine')
+        usage = response.get('usage')
+    except AttributeError:
+        model, usage = api_params.get('engine'), None
+    trace.add_call(stage, model, usage)
+
+
+class TraceSink:
+    """Append-only JSONL file of trace records, rotated by size, shared by all workers on the host"""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, record: Dict[str, Any]):
+        data = (json.dumps(record, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+        try:
+            with open(self.path, 'ab') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    # Another worker may have rotated the file while we waited for the lock
+                    if os.fstat(f.fileno()).st_ino != self._inode():
+                        return self.write(record)
+                    f.write(data)
+                    f.flush()
+                    if self.max_bytes and f.tell() >= self.max_bytes:
+                        self._rotate()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        except OSError as e:
+            logger.warning(f"Failed to write trace record: {str(e)}")
+
+    def _inode(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_ino
+        except OSError:
+            return None
+
+    def _rotate(self):
+        # traces.jsonl -> traces.jsonl.1 -> ... -> traces.jsonl.<backups>, oldest dropped
+        for index in range(self.backups - 1, 0, -1):
+            source = f'{self.path}.{index}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{index + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.truncate(self.path, 0)